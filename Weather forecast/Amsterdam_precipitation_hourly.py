@@ -1,140 +1,110 @@
 # amsterdam_weather_hourly_full.py
 
-import requests
 import pandas as pd
 import numpy as np
 from datetime import date, timedelta
-from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
 from sklearn.metrics import accuracy_score, roc_auc_score, mean_absolute_error, mean_squared_error
 
+from features import horizon_block
+from learners import learner
+from model_store import fit_or_load
+from pipelines import HOURLY_PRECIPITATION as pipeline
+
 # -------------------------------------------
 # 1. Fetch Hourly Data
 # -------------------------------------------
 latitude = 52.37
 longitude = 4.89
 today = date.today()
-start_date = "2024-01-01"
+start_date = pipeline.start_date
 end_date = today.isoformat()
 
-url = (
-    f"https://archive-api.open-meteo.com/v1/archive?"
-    f"latitude={latitude}&longitude={longitude}"
-    f"&start_date={start_date}&end_date={end_date}"
-    "&hourly=temperature_2m,precipitation,cloudcover,relative_humidity_2m,wind_speed_10m"
-    "&timezone=Europe%2FAmsterdam"
-)
-
 print(f"📡 Fetching hourly data from {start_date} to {end_date} ...")
-response = requests.get(url)
-data = response.json()
-
-df = pd.DataFrame({
-    "time": data["hourly"]["time"],
-    "temp": data["hourly"]["temperature_2m"],
-    "precip": data["hourly"]["precipitation"],
-    "cloud": data["hourly"]["cloudcover"],
-    "humidity": data["hourly"]["relative_humidity_2m"],
-    "wind": data["hourly"]["wind_speed_10m"],
-})
-
-df["time"] = pd.to_datetime(df["time"])
-df = df.set_index("time").sort_index()
+# Also derives rain_flag (precip > 0.05 mm)
+df = pipeline.load(latitude, longitude, end_date)
 
 print(f"✅ Data downloaded: {len(df)} hourly samples (~{len(df)/24:.1f} days)")
 
 # -------------------------------------------
 # 2. Feature Engineering
 # -------------------------------------------
-df["rain_flag"] = (df["precip"] > 0.05).astype(int)
-
-# Lag features
-for lag in range(1, 6):
-    for col in ["precip", "rain_flag", "temp", "cloud", "humidity", "wind"]:
-        df[f"{col}_lag{lag}"] = df[col].shift(lag)
-
-# Rolling features
-df["precip_roll6"] = df["precip"].rolling(6).mean()
-df["precip_roll12"] = df["precip"].rolling(12).mean()
-df["wind_roll6"] = df["wind"].rolling(6).mean()
-df["cloud_roll6"] = df["cloud"].rolling(6).mean()
-
-# Time features
-df["hour"] = df.index.hour
-df["dayofyear"] = df.index.day_of_year
-
-df = df.dropna()
+# Lag, rolling and time features: see pipelines.HOURLY_PRECIPITATION
+spec = pipeline.spec
+fm = pipeline.features(df)
+y = fm.targets
 
 # -------------------------------------------
 # 3. Train/Test Split
 # -------------------------------------------
-train_end = df.index[-int(len(df) * 0.2)]
-train = df[df.index < train_end]
-test = df[df.index >= train_end]
+split = len(fm) - int(len(fm) * 0.2)
 
-features = [c for c in df.columns if c not in ["precip", "rain_flag", "wind", "cloud"]]
+# The four models share one prepared matrix: with ECO_LEARNER=hgb it is
+# binned once here instead of once per model, with bin edges from the
+# training rows only (see learners.py).
+learn = learner()
+X = learn.matrix(fm.X, split)
+X_train, X_test = X[:split], X[split:]
 
 # Targets
-y_train_cls = train["rain_flag"]
-y_test_cls = test["rain_flag"]
+y_train_cls = y["rain_flag"][:split]
+y_test_cls = y["rain_flag"][split:]
+
+# Stored models are reused, or refreshed with a few extra trees when only
+# new hours arrived since the last run (see model_store.py).
+params = learn.params(pipeline)
+site = f"{latitude}_{longitude}"
 
 # -------------------------------------------
 # 4. Rain Probability (Classifier)
 # -------------------------------------------
-clf = RandomForestClassifier(n_estimators=200, random_state=42, n_jobs=-1)
-clf.fit(train[features], y_train_cls)
-y_proba_cls = clf.predict_proba(test[features])[:, 1]
-print(f"🌧️ Rain classifier — AUC: {roc_auc_score(y_test_cls, y_proba_cls):.2f}")
+clf, how = fit_or_load(f"hourly_rain_flag_{site}", learn.classifier,
+                       X_train, y_train_cls, spec, params)
+y_proba_cls = clf.predict_proba(X_test)[:, 1]
+print(f"🌧️ Rain classifier ({learn.name}, {how}) — AUC: {roc_auc_score(y_test_cls, y_proba_cls):.2f}")
 
 # -------------------------------------------
 # 5. Rain Amount (Regressor)
 # -------------------------------------------
-rainy_hours = df[df["precip"] > 0.05]
-reg_rain = RandomForestRegressor(n_estimators=200, random_state=42, n_jobs=-1)
-reg_rain.fit(rainy_hours[features], rainy_hours["precip"])
-print("💧 Rain amount model trained.")
+rainy_hours = y["precip"] > 0.05
+reg_rain, how = fit_or_load(f"hourly_rain_mm_{site}", learn.regressor,
+                            X[rainy_hours], y["precip"][rainy_hours], spec, params)
+print(f"💧 Rain amount model {how}.")
 
 # -------------------------------------------
 # 6. Wind Speed (Regressor)
 # -------------------------------------------
-reg_wind = RandomForestRegressor(n_estimators=200, random_state=42, n_jobs=-1)
-reg_wind.fit(train[features], train["wind"])
-print("🌬️ Wind speed model trained.")
+reg_wind, how = fit_or_load(f"hourly_wind_{site}", learn.regressor,
+                            X_train, y["wind"][:split], spec, params)
+print(f"🌬️ Wind speed model {how}.")
 
 # -------------------------------------------
 # 7. Cloud Cover (Regressor)
 # -------------------------------------------
-reg_cloud = RandomForestRegressor(n_estimators=200, random_state=42, n_jobs=-1)
-reg_cloud.fit(train[features], train["cloud"])
-print("☁️ Cloud cover model trained.")
+reg_cloud, how = fit_or_load(f"hourly_cloud_{site}", learn.regressor,
+                             X_train, y["cloud"][:split], spec, params)
+print(f"☁️ Cloud cover model {how}.")
 
 # -------------------------------------------
 # 8. Forecast Tomorrow Hourly
 # -------------------------------------------
-tomorrow_start = (df.index[-1] + timedelta(hours=1)).replace(hour=0, minute=0)
+tomorrow_start = (fm.index[-1] + timedelta(hours=1)).replace(hour=0, minute=0)
 forecast_hours = pd.date_range(tomorrow_start, periods=24, freq="h")
 
-last_known = df.iloc[-1:].copy()
-forecast_rows = []
-
-for hour in forecast_hours:
-    X_latest = last_known[features].copy()
-    X_latest["hour"] = hour.hour
-    X_latest["dayofyear"] = hour.day_of_year
-
-    rain_prob = clf.predict_proba(X_latest)[0, 1] * 100
-    rain_mm = reg_rain.predict(X_latest)[0] * (rain_prob / 100)
-    wind_speed = reg_wind.predict(X_latest)[0]
-    cloud_cover = np.clip(reg_cloud.predict(X_latest)[0], 0, 100)
-
-    forecast_rows.append({
-        "time": hour,
-        "rain_prob_%": rain_prob,
-        "rain_mm": rain_mm,
-        "wind_speed_mps": wind_speed,
-        "cloud_cover_%": cloud_cover
-    })
-
-forecast_df = pd.DataFrame(forecast_rows).set_index("time")
+# Only hour and dayofyear change between the rows, so build all 24 at once
+# and run each model a single time over the block.
+X_future = horizon_block(fm.X[-1], spec, forecast_hours)
+
+rain_prob = clf.predict_proba(X_future)[:, 1] * 100
+rain_mm = reg_rain.predict(X_future) * (rain_prob / 100)
+wind_speed = reg_wind.predict(X_future)
+cloud_cover = np.clip(reg_cloud.predict(X_future), 0, 100)
+
+forecast_df = pd.DataFrame({
+    "rain_prob_%": rain_prob,
+    "rain_mm": rain_mm,
+    "wind_speed_mps": wind_speed,
+    "cloud_cover_%": cloud_cover,
+}, index=pd.DatetimeIndex(forecast_hours, name="time"))
 
 # -------------------------------------------
 # 9. Display Results
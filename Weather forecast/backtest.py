@@ -0,0 +1,199 @@
+# backtest.py
+#
+# Rolling-origin (walk-forward) backtest of a forecast pipeline.
+#
+#   python backtest.py --pipeline daily_temp --origins 200 --horizon 30 --workers 8
+#   python backtest.py --pipeline hourly_precip --learner hgb
+#
+# The feature matrix is built once and put in shared memory. Every fold
+# trains on all rows before its cutoff (or the last --window rows) and is
+# scored on the next --horizon rows, so "horizon h" is the error h steps
+# after the training cutoff. Folds run in parallel in a process pool.
+# With a binned learner (learners.py) the bin codes are computed once too
+# and shared next to the feature matrix. Rain amounts (learners.RAIN_AMOUNTS)
+# are trained and scored on wet rows only, as the scripts use them.
+# Writes <prefix>_folds.csv (metrics and wall time per fold) and
+# <prefix>_horizons.csv (metrics per horizon step over all folds).
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import roc_auc_score
+from threadpoolctl import threadpool_limits
+
+from learners import (CLASSIFIED_TARGETS, LEARNERS, RAIN_AMOUNTS, BinnedMatrix, Binner,
+                      learner)
+from pipelines import PIPELINES
+from shared_arrays import attach, release, share
+
+_worker = {}
+
+
+def _auc(y, p):
+    return roc_auc_score(y, p) if len(np.unique(y)) == 2 else np.nan
+
+
+def _scored(target, y):
+    """Rows a regression target is trained and scored on: wet ones for rain amounts."""
+    if target in RAIN_AMOUNTS:
+        return y > RAIN_AMOUNTS[target]
+    return np.ones(len(y), dtype=bool)
+
+
+# -------------------------------------------
+# Worker side
+# -------------------------------------------
+def _init_worker(descriptors, binner=None):
+    # One thread per worker: the pool is the parallelism, and OpenMP
+    # (HistGradientBoosting) would otherwise start a thread per core in each
+    _worker["threads"] = threadpool_limits(limits=1)
+    for key, descriptor in descriptors.items():
+        _worker[key] = attach(descriptor)
+    _worker["binner"] = binner
+
+
+def _run_fold(task):
+    fold, cutoff, horizon, window, pipeline_name, learner_name, n_estimators = task
+    pipeline = PIPELINES[pipeline_name]
+    learn = learner(learner_name)
+    X, Y = _worker["X"][1], _worker["Y"][1]
+    if learn.binned:
+        X = BinnedMatrix(X, _worker["binner"], _worker["codes"][1])
+    start = 0 if window is None else max(0, cutoff - window)
+    X_train, X_test = X[start:cutoff], X[cutoff:cutoff + horizon]
+    params = learn.params(pipeline)
+    if learn.binned:
+        params["max_iter"] = n_estimators
+    else:
+        params.update(n_estimators=n_estimators, n_jobs=1)
+
+    t0 = time.perf_counter()
+    metrics = {"fold": fold, "cutoff_row": cutoff, "train_rows": cutoff - start}
+    outputs = {}
+    for j, target in enumerate(pipeline.targets):
+        y_train, y_test = Y[start:cutoff, j], Y[cutoff:cutoff + horizon, j]
+        if target in CLASSIFIED_TARGETS:
+            model = learn.classifier(**params).fit(X_train, y_train)
+            proba = model.predict_proba(X_test)
+            pred = proba[:, list(model.classes_).index(1)] if 1 in model.classes_ else np.zeros(len(X_test))
+            metrics[f"{target}_auc"] = _auc(y_test, pred)
+            metrics[f"{target}_acc"] = np.mean((pred > 0.5) == y_test)
+        else:
+            train, test = _scored(target, y_train), _scored(target, y_test)
+            pred = np.full(len(y_test), np.nan)
+            if train.any():
+                pred = learn.regressor(**params).fit(X_train[train], y_train[train]).predict(X_test)
+            err = (pred - y_test)[test]
+            metrics[f"{target}_mae"] = np.abs(err).mean() if len(err) else np.nan
+            metrics[f"{target}_rmse"] = np.sqrt((err ** 2).mean()) if len(err) else np.nan
+        outputs[target] = (pred, y_test)
+    metrics["seconds"] = time.perf_counter() - t0
+    return metrics, outputs
+
+
+# -------------------------------------------
+# Driver
+# -------------------------------------------
+def origins(n_rows, n_origins, horizon, min_train):
+    """Evenly spaced cutoff rows, leaving `horizon` test rows after each."""
+    first = max(int(n_rows * min_train), 1) if min_train < 1 else int(min_train)
+    last = n_rows - horizon
+    if last <= first:
+        raise ValueError(f"Not enough rows ({n_rows}) for min_train={min_train}, horizon={horizon}")
+    return np.unique(np.linspace(first, last, n_origins).astype(int))
+
+
+def run_backtest(fm, pipeline, n_origins=100, horizon=30, min_train=0.5,
+                 window=None, n_estimators=50, workers=None, learner_name="forest"):
+    """Returns (folds, horizons) DataFrames."""
+    cutoffs = origins(len(fm), n_origins, horizon, min_train)
+    Y = np.column_stack([fm.targets[t] for t in pipeline.targets])
+    shm_x, desc_x = share(fm.X)
+    shm_y, desc_y = share(Y)
+    blocks, descriptors, binner = [shm_x, shm_y], {"X": desc_x, "Y": desc_y}, None
+    if learner(learner_name).binned:
+        # Bin edges from the rows of the first fold only, so no fold's
+        # edges are placed with its test data
+        binner = Binner().fit(fm.X[:cutoffs[0]])
+        shm_c, descriptors["codes"] = share(binner.transform(fm.X))
+        blocks.append(shm_c)
+    tasks = [(i, int(c), horizon, window, pipeline.name, learner_name, n_estimators)
+             for i, c in enumerate(cutoffs)]
+
+    folds, per_horizon = [], {t: [] for t in pipeline.targets}
+    try:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                 initializer=_init_worker,
+                                 initargs=(descriptors, binner)) as pool:
+            for metrics, outputs in pool.map(_run_fold, tasks):
+                metrics["cutoff"] = fm.index[metrics["cutoff_row"]]
+                folds.append(metrics)
+                for target, (pred, truth) in outputs.items():
+                    per_horizon[target].append((pred, truth))
+    finally:
+        release(*blocks)
+
+    rows = []
+    for h in range(horizon):
+        row = {"horizon": h + 1}
+        for target, pairs in per_horizon.items():
+            pred = np.array([p[h] for p, _ in pairs])
+            truth = np.array([t[h] for _, t in pairs])
+            if target in CLASSIFIED_TARGETS:
+                row[f"{target}_auc"] = _auc(truth, pred)
+            else:
+                err = (pred - truth)[_scored(target, truth) & ~np.isnan(pred)]
+                row[f"{target}_mae"] = np.abs(err).mean() if len(err) else np.nan
+                row[f"{target}_rmse"] = np.sqrt((err ** 2).mean()) if len(err) else np.nan
+        rows.append(row)
+    return pd.DataFrame(folds).set_index("fold"), pd.DataFrame(rows).set_index("horizon")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of a forecast pipeline.")
+    parser.add_argument("--pipeline", default="daily_temp", choices=sorted(PIPELINES))
+    parser.add_argument("--latitude", type=float, default=52.37)
+    parser.add_argument("--longitude", type=float, default=4.89)
+    parser.add_argument("--end-date", default=date.today().isoformat())
+    parser.add_argument("--origins", type=int, default=100)
+    parser.add_argument("--horizon", type=int, default=30, help="test rows after each cutoff")
+    parser.add_argument("--min-train", type=float, default=0.5,
+                        help="first cutoff, as a fraction (<1) or a row count")
+    parser.add_argument("--window", type=int, default=None,
+                        help="sliding training window in rows (default: expanding)")
+    parser.add_argument("--learner", default="forest", choices=list(LEARNERS))
+    parser.add_argument("--trees", type=int, default=50,
+                        help="trees of a forest, or boosting iterations")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("-o", "--output", default="backtest")
+    args = parser.parse_args()
+
+    pipeline = PIPELINES[args.pipeline]
+    df = pipeline.load(args.latitude, args.longitude, args.end_date)
+    fm = pipeline.features(df)
+    print(f"🧮 {len(fm)} rows x {fm.X.shape[1]} features, {args.origins} origins, "
+          f"horizon {args.horizon}, learner {args.learner}")
+
+    t0 = time.perf_counter()
+    folds, horizons = run_backtest(fm, pipeline, args.origins, args.horizon, args.min_train,
+                                   args.window, args.trees, args.workers, args.learner)
+    wall = time.perf_counter() - t0
+
+    folds.to_csv(f"{args.output}_folds.csv")
+    horizons.to_csv(f"{args.output}_horizons.csv")
+    metric_cols = [c for c in folds.columns if c.endswith(("_mae", "_rmse", "_auc"))]
+    print("\nPer-fold metrics (summary):")
+    print(folds[metric_cols + ["seconds"]].describe().loc[["mean", "std", "min", "max"]].round(3))
+    print("\nPer-horizon metrics:")
+    print(horizons.round(3).to_string(max_rows=20))
+    print(f"\n✅ {len(folds)} folds in {wall:.1f} s "
+          f"({folds['seconds'].sum():.1f} s of fold time) -> {args.output}_*.csv")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# features.py
+#
+# Lag / rolling / calendar feature builder shared by the forecast scripts.
+#
+# A FeatureSpec says which columns to use as-is, which to lag, which to
+# average over rolling windows and which calendar encodings to add.
+# build_features() turns a time-indexed DataFrame into one C-contiguous
+# float32 matrix in a single pass, using strided window views instead of
+# one shifted pandas column per lag.
+
+import json
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+CALENDAR = {
+    "hour": lambda t: t.hour,
+    "dayofyear": lambda t: t.dayofyear,
+    "month": lambda t: t.month,
+    "hour_sin": lambda t: np.sin(2 * np.pi * t.hour / 24),
+    "hour_cos": lambda t: np.cos(2 * np.pi * t.hour / 24),
+    "doy_sin": lambda t: np.sin(2 * np.pi * t.dayofyear / 365.25),
+    "doy_cos": lambda t: np.cos(2 * np.pi * t.dayofyear / 365.25),
+}
+
+
+# -------------------------------------------
+# Spec
+# -------------------------------------------
+@dataclass
+class FeatureSpec:
+    columns: list = field(default_factory=list)   # used as-is
+    lags: dict = field(default_factory=dict)      # column -> lags (in rows)
+    rolling: dict = field(default_factory=dict)   # column -> window sizes (mean)
+    calendar: list = field(default_factory=list)  # keys of CALENDAR
+    rolling_shift: int = 0  # 1 = windows end at the previous row
+
+    def __post_init__(self):
+        self.columns = list(self.columns)
+        self.lags = {col: tuple(int(k) for k in lags) for col, lags in self.lags.items()}
+        self.rolling = {col: tuple(int(w) for w in ws) for col, ws in self.rolling.items()}
+        self.calendar = list(self.calendar)
+        unknown = set(self.calendar) - set(CALENDAR)
+        if unknown:
+            raise ValueError(f"Unknown calendar features: {sorted(unknown)}")
+
+    def names(self):
+        """Feature names, in the column order of the built matrix."""
+        names = list(self.columns)
+        for col, lags in self.lags.items():
+            names += [f"{col}_lag{k}" for k in lags]
+        for col, windows in self.rolling.items():
+            names += [f"{col}_roll{w}" for w in windows]
+        return names + self.calendar
+
+    def key(self):
+        """Stable string identifying the spec (for caching / model keys)."""
+        return json.dumps({
+            "columns": self.columns,
+            "lags": self.lags,
+            "rolling": self.rolling,
+            "calendar": self.calendar,
+            "rolling_shift": self.rolling_shift,
+        }, sort_keys=True)
+
+    def depth(self):
+        """How many past rows a single feature row looks back at."""
+        depth = max((max(lags) for lags in self.lags.values()), default=0)
+        windows = [max(ws) + self.rolling_shift - 1 for ws in self.rolling.values()]
+        return max([depth] + windows)
+
+
+@dataclass
+class FeatureMatrix:
+    X: np.ndarray          # (rows, features), float32, C-contiguous
+    columns: list
+    index: pd.DatetimeIndex
+    targets: dict          # target name -> float64 array aligned with X
+
+    def __len__(self):
+        return len(self.X)
+
+    def column(self, name):
+        return self.X[:, self.columns.index(name)]
+
+    def frame(self):
+        """DataFrame view over X (no copy)."""
+        return pd.DataFrame(self.X, index=self.index, columns=self.columns, copy=False)
+
+
+# -------------------------------------------
+# Builders
+# -------------------------------------------
+def calendar_block(spec, times):
+    """Calendar encodings for the given timestamps, shape (len(times), n)."""
+    times = pd.DatetimeIndex(times)
+    block = np.empty((len(times), len(spec.calendar)), dtype=np.float32)
+    for j, name in enumerate(spec.calendar):
+        block[:, j] = np.asarray(CALENDAR[name](times))
+    return block
+
+
+def horizon_block(x_last, spec, times):
+    """
+    Feature rows for several future timestamps that only differ in their
+    calendar encodings: `x_last` repeated once per time, with the calendar
+    columns (always last) filled in. Lets a model predict a whole horizon
+    in one call.
+    """
+    x_last = np.asarray(x_last, dtype=np.float32).reshape(-1)
+    block = np.repeat(x_last[None, :], len(times), axis=0)
+    if spec.calendar:
+        block[:, -len(spec.calendar):] = calendar_block(spec, times)
+    return block
+
+
+def _fill(out, df, spec):
+    n = len(df)
+    j = 0
+    for col in spec.columns:
+        out[:, j] = df[col].to_numpy(np.float32)
+        j += 1
+
+    for col, lags in spec.lags.items():
+        depth = max(lags)
+        padded = np.empty(n + depth, dtype=np.float32)
+        padded[:depth] = np.nan
+        padded[depth:] = df[col].to_numpy(np.float32)
+        # window[i] = x[i - depth .. i], so lag k is column depth - k
+        window = sliding_window_view(padded, depth + 1)
+        out[:, j:j + len(lags)] = window[:, depth - np.asarray(lags)]
+        j += len(lags)
+
+    shift = spec.rolling_shift
+    for col, windows in spec.rolling.items():
+        x = df[col].to_numpy(np.float64)
+        for w in windows:
+            start = min(w - 1 + shift, n)
+            out[:start, j] = np.nan
+            if start < n:
+                out[start:, j] = sliding_window_view(x[:n - shift], w).mean(axis=1)
+            j += 1
+
+    if spec.calendar:
+        out[:, j:] = calendar_block(spec, df.index)
+
+
+def build_features(df, spec, targets=()):
+    """
+    Build the feature matrix for `df` and drop incomplete rows (lag/rolling
+    warm-up, gaps, missing targets). Returns a FeatureMatrix.
+    """
+    names = spec.names()
+    out = np.empty((len(df), len(names)), dtype=np.float32)
+    _fill(out, df, spec)
+
+    y = {t: df[t].to_numpy(np.float64) for t in targets}
+    valid = ~np.isnan(out).any(axis=1)
+    for values in y.values():
+        valid &= ~np.isnan(values)
+
+    rows = np.flatnonzero(valid)
+    if len(rows) and rows[-1] - rows[0] + 1 == len(rows):
+        # Only warm-up / trailing rows are incomplete: keep a view, no copy.
+        keep = slice(rows[0], rows[-1] + 1)
+    else:
+        keep = valid
+    return FeatureMatrix(
+        X=np.ascontiguousarray(out[keep]),
+        columns=names,
+        index=df.index[keep],
+        targets={t: values[keep] for t, values in y.items()},
+    )
@@ -0,0 +1,112 @@
+# flat_forest.py
+#
+# Fitted RandomForestRegressor / RandomForestClassifier exported to flat
+# struct-of-arrays form, with a NumPy traversal that walks every tree at
+# once. For the one-row "predict tomorrow" calls this skips sklearn's
+# input validation, joblib dispatch and per-tree Python loop.
+#
+# All trees' nodes are concatenated into shared arrays:
+#
+#   feature    int32    split feature (0 for leaves)
+#   threshold  float32  go left if x[feature] <= threshold
+#   left/right int32    global child index (leaves point to themselves)
+#   value      float32  (n_nodes, n_outputs) leaf value / class fractions
+#   roots      int32    first node of every tree
+#
+# Inputs are compared as float32, as sklearn does. Thresholds are rounded
+# down to the nearest float32, so x <= threshold gives the same branch as
+# sklearn's float64 comparison. Inputs must not contain NaN.
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class FlatForest:
+    feature: np.ndarray
+    threshold: np.ndarray
+    left: np.ndarray
+    right: np.ndarray
+    value: np.ndarray
+    roots: np.ndarray
+    depth: int
+    classes: np.ndarray = None   # set for classifiers
+
+    @classmethod
+    def from_model(cls, model):
+        trees = [est.tree_ for est in model.estimators_]
+        sizes = np.array([t.node_count for t in trees])
+        roots = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int32)
+        classifier = hasattr(model, "classes_")
+
+        feature, threshold, left, right, value = [], [], [], [], []
+        for tree, root in zip(trees, roots):
+            leaf = tree.children_left == -1
+            own = np.arange(tree.node_count) + root
+            feature.append(np.where(leaf, 0, tree.feature))
+            t64 = np.where(leaf, np.inf, tree.threshold)
+            t32 = t64.astype(np.float32)
+            t32 = np.where(t32 > t64, np.nextafter(t32, np.float32(-np.inf)), t32)
+            threshold.append(t32)
+            left.append(np.where(leaf, own, tree.children_left + root))
+            right.append(np.where(leaf, own, tree.children_right + root))
+            v = tree.value[:, 0, :]
+            if classifier:
+                v = v / v.sum(axis=1, keepdims=True)
+            value.append(v)
+
+        return cls(
+            feature=np.concatenate(feature).astype(np.int32),
+            threshold=np.concatenate(threshold).astype(np.float32),
+            left=np.concatenate(left).astype(np.int32),
+            right=np.concatenate(right).astype(np.int32),
+            value=np.concatenate(value).astype(np.float32),
+            roots=roots,
+            depth=max(t.max_depth for t in trees),
+            classes=np.asarray(model.classes_) if classifier else None,
+        )
+
+    # -------------------------------------------
+    # Inference
+    # -------------------------------------------
+    def leaves(self, X):
+        """Leaf index reached in every tree, shape (rows, trees)."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        nodes = np.repeat(self.roots[None, :], len(X), axis=0)
+        rows = np.arange(len(X))[:, None]
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def predict_proba(self, X):
+        return self.value[self.leaves(X)].mean(axis=1, dtype=np.float64)
+
+    def predict(self, X):
+        out = self.predict_proba(X)
+        if self.classes is not None:
+            return self.classes[out.argmax(axis=1)]
+        return out[:, 0]
+
+    # -------------------------------------------
+    # Persistence
+    # -------------------------------------------
+    def save(self, path):
+        arrays = {k: getattr(self, k) for k in
+                  ["feature", "threshold", "left", "right", "value", "roots"]}
+        if self.classes is not None:
+            arrays["classes"] = self.classes
+        np.savez(path, depth=self.depth, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(
+            feature=data["feature"], threshold=data["threshold"],
+            left=data["left"], right=data["right"], value=data["value"],
+            roots=data["roots"], depth=int(data["depth"]),
+            classes=data["classes"] if "classes" in data.files else None,
+        )
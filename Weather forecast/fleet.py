@@ -0,0 +1,152 @@
+# fleet.py
+#
+# Run one forecast pipeline for many sites at once.
+#
+#   python fleet.py sites.csv --pipeline daily_temp --workers 8 -o fleet_forecast.csv
+#
+# sites.csv has the columns name,latitude,longitude. All sites are fetched
+# through the shared hourly store (hourly_ingest.py) in batched
+# multi-coordinate requests, their feature matrices are stacked into one
+# shared-memory block, and a process pool trains (or reloads, see
+# model_store.py) one model per target and site and predicts the next
+# step. The result is one table with a row per site.
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+from model_store import fit_or_load
+from hourly_ingest import load_many
+from learners import CLASSIFIED_TARGETS, RAIN_AMOUNTS
+from openmeteo_cache import STEPS
+from pipelines import PIPELINES
+from shared_arrays import attach, release, share
+
+_worker = {}
+
+
+# -------------------------------------------
+# Worker side
+# -------------------------------------------
+def _init_worker(descriptors):
+    for key, descriptor in descriptors.items():
+        _worker[key] = attach(descriptor)
+
+
+def _forecast_site(task):
+    name, lat, lon, pipeline_name, start, stop, next_time = task
+    pipeline = PIPELINES[pipeline_name]
+    X = _worker["X"][1][start:stop]
+    Y = _worker["Y"][1][start:stop]
+    params = {**pipeline.rf_params, "n_jobs": 1}  # parallelism comes from the pool
+
+    t0 = time.perf_counter()
+    row = {"site": name, "latitude": lat, "longitude": lon, "time": next_time, "rows": len(X)}
+    split = len(X) - int(len(X) * 0.2)
+    for j, target in enumerate(pipeline.targets):
+        y = Y[:, j]
+        if target in CLASSIFIED_TARGETS:
+            model, _ = fit_or_load(f"fleet_{pipeline.name}_{target}_{lat}_{lon}",
+                                   RandomForestClassifier, X[:split], y[:split], pipeline.spec, params)
+            # A dry site (or a short window) can have a single class
+            row[f"{target}_prob"] = (model.predict_proba(X[-1:])[0, list(model.classes_).index(1)]
+                                     if 1 in model.classes_ else 0.0)
+        elif target in RAIN_AMOUNTS:
+            # Amount if it rains, trained on wet rows as the scripts do; the
+            # prediction is scaled by the rain probability like theirs
+            wet = y > RAIN_AMOUNTS[target]
+            train, test = wet[:split], wet[split:]
+            if not train.any():
+                row[f"{target}_pred"], row[f"{target}_mae"] = 0.0, np.nan
+                continue
+            model, _ = fit_or_load(f"fleet_{pipeline.name}_{target}_{lat}_{lon}",
+                                   RandomForestRegressor, X[:split][train], y[:split][train],
+                                   pipeline.spec, params)
+            row[f"{target}_pred"] = model.predict(X[-1:])[0] * row.get("rain_flag_prob", 1.0)
+            row[f"{target}_mae"] = (np.abs(model.predict(X[split:][test]) - y[split:][test]).mean()
+                                    if test.any() else np.nan)
+        else:
+            model, _ = fit_or_load(f"fleet_{pipeline.name}_{target}_{lat}_{lon}",
+                                   RandomForestRegressor, X[:split], y[:split], pipeline.spec, params)
+            row[f"{target}_pred"] = model.predict(X[-1:])[0]
+            row[f"{target}_mae"] = np.abs(model.predict(X[split:]) - y[split:]).mean()
+    row["seconds"] = time.perf_counter() - t0
+    return row
+
+
+# -------------------------------------------
+# Driver
+# -------------------------------------------
+def run_fleet(sites, pipeline, end_date=None, workers=None, start_date=None, **fetch_kwargs):
+    """
+    sites: DataFrame with name, latitude, longitude. Returns one row per
+    site with the next-step prediction (and holdout MAE) of every target,
+    trained on start_date (default: the pipeline's) .. end_date.
+    """
+    end_date = end_date or date.today().isoformat()
+    start_date = start_date or pipeline.start_date
+    locations = list(zip(sites["latitude"], sites["longitude"]))
+    print(f"📡 Fetching {len(locations)} sites ({pipeline.frequency}) up to {end_date} ...")
+    raw = load_many(locations, start_date, end_date, list(pipeline.variables),
+                    frequency=pipeline.frequency, **fetch_kwargs)
+
+    # Stack every site's features into one block; tasks only carry row offsets
+    matrices, tasks, offset = [], [], 0
+    for name, lat, lon in zip(sites["name"], sites["latitude"], sites["longitude"]):
+        fm = pipeline.features(pipeline.frame(raw[(lat, lon)]))
+        if len(fm) < 10:
+            print(f"⚠️ {name}: only {len(fm)} complete rows, skipped")
+            continue
+        matrices.append(fm)
+        next_time = fm.index[-1] + STEPS[pipeline.frequency]
+        tasks.append((name, lat, lon, pipeline.name, offset, offset + len(fm), next_time))
+        offset += len(fm)
+    if not tasks:
+        return pd.DataFrame()
+
+    X = np.concatenate([fm.X for fm in matrices])
+    Y = np.column_stack([np.concatenate([fm.targets[t] for fm in matrices])
+                         for t in pipeline.targets])
+    del matrices
+    shm_x, desc_x = share(X)
+    shm_y, desc_y = share(Y)
+    print(f"🧮 {len(tasks)} sites, {len(X)} rows x {X.shape[1]} features in shared memory")
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                 initializer=_init_worker,
+                                 initargs=({"X": desc_x, "Y": desc_y},)) as pool:
+            rows = list(pool.map(_forecast_site, tasks))
+    finally:
+        release(shm_x, shm_y)
+    return pd.DataFrame(rows).set_index("site")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forecast many sites with one pipeline.")
+    parser.add_argument("sites", help="CSV with name,latitude,longitude columns")
+    parser.add_argument("--pipeline", default="daily_temp", choices=sorted(PIPELINES))
+    parser.add_argument("--start-date", default=None, help="default: the pipeline's")
+    parser.add_argument("--end-date", default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("-o", "--output", default="fleet_forecast.csv")
+    args = parser.parse_args()
+
+    sites = pd.read_csv(args.sites)
+    t0 = time.perf_counter()
+    result = run_fleet(sites, PIPELINES[args.pipeline], args.end_date, args.workers,
+                       args.start_date)
+    print(result.round(dict.fromkeys(result.select_dtypes("number").columns, 2)))
+    result.to_csv(args.output)
+    print(f"✅ {len(result)} site forecasts saved to {args.output} "
+          f"({time.perf_counter() - t0:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# hourly_ingest.py
+#
+# One hourly download per location, from which every forecast pipeline is
+# fed.
+#
+# All hourly variables any pipeline uses (HOURLY_VARIABLES) are fetched in
+# UTC into a single openmeteo_cache store per location, so the four
+# pipelines no longer keep four overlapping archive downloads with their
+# own variable lists and start dates; whichever runs first with the
+# earliest start date fills the store and the others only read it.
+#
+#   hourly pipelines  the UTC hours, indexed in local time (tz-aware), so
+#                     hour features follow the clock and DST days simply
+#                     have 23 or 25 rows
+#   daily pipelines   aggregates of the local calendar day (DAILY), with
+#                     day boundaries at local midnight: a day is 23, 24 or
+#                     25 hours long, and is NaN unless all of its hours
+#                     are present (the archive lags real time by a few
+#                     days, so the last days usually are)
+#
+# Daily variables keep their Open-Meteo names (temperature_2m_max,
+# precipitation_sum, cloudcover_mean, ...) so the daily pipelines'
+# variable maps did not change.
+
+import pandas as pd
+
+from openmeteo_cache import fetch_archive_many
+
+TIMEZONE = "Europe/Amsterdam"
+
+HOURLY_VARIABLES = ["temperature_2m", "relative_humidity_2m", "precipitation", "rain",
+                    "cloud_cover", "wind_speed_10m"]
+
+# Daily variable -> (hourly variable, aggregation over the local day)
+DAILY = {
+    "temperature_2m_max": ("temperature_2m", "max"),
+    "temperature_2m_min": ("temperature_2m", "min"),
+    "temperature_2m_mean": ("temperature_2m", "mean"),
+    "precipitation_sum": ("precipitation", "sum"),
+    "rain_sum": ("rain", "sum"),
+    "cloud_cover_mean": ("cloud_cover", "mean"),
+    "cloudcover_mean": ("cloud_cover", "mean"),
+    "relative_humidity_2m_mean": ("relative_humidity_2m", "mean"),
+    "wind_speed_10m_max": ("wind_speed_10m", "max"),
+    "windspeed_10m_max": ("wind_speed_10m", "max"),
+}
+
+
+# -------------------------------------------
+# Hourly store
+# -------------------------------------------
+def hourly_many(locations, start_date, end_date, timezone=TIMEZONE, cache_dir=None, url=None,
+                session=None):
+    """
+    {(latitude, longitude): DataFrame of HOURLY_VARIABLES} covering the
+    local days start_date .. end_date, indexed in `timezone`.
+    """
+    first = pd.Timestamp(start_date).tz_localize(timezone)
+    stop = (pd.Timestamp(end_date) + pd.Timedelta(days=1)).tz_localize(timezone)
+    # Whole UTC days around the local ones
+    fetched = fetch_archive_many(
+        locations, first.tz_convert("UTC").date(), stop.tz_convert("UTC").date(),
+        HOURLY_VARIABLES, frequency="hourly", timezone="UTC",
+        cache_dir=cache_dir, url=url, session=session,
+    )
+    frames = {}
+    for loc, df in fetched.items():
+        df = df.tz_localize("UTC").tz_convert(timezone)
+        frames[loc] = df[(df.index >= first) & (df.index < stop)]
+    return frames
+
+
+# -------------------------------------------
+# Local days
+# -------------------------------------------
+def daily(hourly, variables):
+    """
+    Daily `variables` (names of DAILY) from a tz-aware hourly frame, per
+    local calendar day of its index. Indexed by naive date.
+    """
+    unknown = [v for v in variables if v not in DAILY]
+    if unknown:
+        raise KeyError(f"No daily aggregation for {', '.join(unknown)}")
+    days = hourly.index.normalize()   # local midnight, DST-aware
+    grouped = hourly.groupby(days)
+    labels = pd.DatetimeIndex(sorted(days.unique()))
+    # 23 / 24 / 25 hours: next local midnight minus this one
+    expected = ((labels + pd.DateOffset(days=1)) - labels) / pd.Timedelta(hours=1)
+
+    counts = grouped.count().reindex(labels)
+    out = {}
+    for name in variables:
+        source, how = DAILY[name]
+        values = getattr(grouped[source], how)().reindex(labels)
+        complete = counts[source].to_numpy() == expected.to_numpy()
+        out[name] = values.where(complete).to_numpy()
+    df = pd.DataFrame(out, index=labels.tz_localize(None))
+    df.index.name = "time"
+    return df
+
+
+def load_many(locations, start_date, end_date, variables, frequency="daily",
+              timezone=TIMEZONE, **fetch_kwargs):
+    """
+    {(latitude, longitude): DataFrame of `variables`} in the given
+    frequency, like openmeteo_cache.fetch_archive_many but derived from the
+    hourly store.
+    """
+    if frequency == "hourly":
+        unknown = [v for v in variables if v not in HOURLY_VARIABLES]
+        if unknown:
+            raise KeyError(f"{', '.join(unknown)} not in HOURLY_VARIABLES")
+    frames = hourly_many(locations, start_date, end_date, timezone, **fetch_kwargs)
+    if frequency == "hourly":
+        return {loc: df[list(variables)] for loc, df in frames.items()}
+    return {loc: daily(df, variables) for loc, df in frames.items()}
+
+
+def load(latitude, longitude, start_date, end_date, variables, frequency="daily", **kwargs):
+    return load_many([(latitude, longitude)], start_date, end_date, variables, frequency,
+                     **kwargs)[(latitude, longitude)]
@@ -0,0 +1,245 @@
+# learners.py
+#
+# The model families the forecast scripts can train, chosen with
+# ECO_LEARNER (or --learner in the tools that have it):
+#
+#   forest  RandomForestClassifier / RandomForestRegressor with the
+#           pipeline's rf_params (the default)
+#   hgb     histogram gradient boosting on a binned feature matrix
+#
+# Tree learners spend most of their time finding split points, and every
+# model of a script used to do that again on the same float columns.
+# For "hgb" the feature matrix is quantile-binned once into uint8 codes
+# (learner.matrix(X, fit_rows), a BinnedMatrix, with bin edges from the
+# training rows only); every model of the script trains on those codes,
+# and each fitted model keeps the Binner so it can predict from plain
+# float rows (horizon_block, new data) as well.
+#
+#   python learners.py --pipeline hourly_precip      # accuracy and fit time side by side
+
+import argparse
+import os
+import time
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import (HistGradientBoostingClassifier, HistGradientBoostingRegressor,
+                              RandomForestClassifier, RandomForestRegressor)
+from sklearn.metrics import accuracy_score, mean_absolute_error, mean_squared_error, roc_auc_score
+
+MAX_BINS = 255        # codes 0..254
+MISSING = 255         # code of NaN
+FIT_SAMPLE = 200_000  # rows the bin edges are computed from
+
+
+# -------------------------------------------
+# Binning
+# -------------------------------------------
+class Binner:
+    """Per-column bin edges at quantiles of the data; transform() -> uint8 codes."""
+
+    def __init__(self, max_bins=MAX_BINS, sample=FIT_SAMPLE, seed=0):
+        self.max_bins, self.sample, self.seed = max_bins, sample, seed
+        self.edges = None
+
+    def fit(self, X):
+        X = np.asarray(X)
+        if len(X) > self.sample:
+            rows = np.random.default_rng(self.seed).choice(len(X), self.sample, replace=False)
+            X = X[np.sort(rows)]
+        self.edges = []
+        for column in X.T:
+            values = np.unique(column[~np.isnan(column)])
+            if len(values) <= self.max_bins:
+                # Few distinct values (hour, month, flags): one bin each
+                edges = (values[:-1] + values[1:]) / 2
+            else:
+                q = np.linspace(0, 100, self.max_bins + 1)[1:-1]
+                edges = np.unique(np.percentile(column[~np.isnan(column)], q))
+            self.edges.append(edges.astype(np.float64))
+        return self
+
+    def transform(self, X):
+        X = np.asarray(X)
+        codes = np.empty(X.shape, dtype=np.uint8)
+        for j, edges in enumerate(self.edges):
+            codes[:, j] = np.searchsorted(edges, X[:, j], side="right")
+        codes[np.isnan(X)] = MISSING
+        return codes
+
+
+class BinnedMatrix:
+    """
+    A feature matrix with its bin codes. Rows are selected from both at
+    once (m[:split], m[mask]); np.asarray(m) is the float matrix, so
+    fingerprints (model_store.py) and plain estimators see the usual data.
+    """
+
+    def __init__(self, X, binner=None, codes=None):
+        self.X = X
+        self.binner = binner or Binner().fit(X)
+        self.codes = self.binner.transform(X) if codes is None else codes
+
+    def __len__(self):
+        return len(self.X)
+
+    @property
+    def shape(self):
+        return self.X.shape
+
+    def __getitem__(self, rows):
+        return BinnedMatrix(self.X[rows], self.binner, self.codes[rows])
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.X, dtype=dtype)
+
+
+class _BinnedInput:
+    """Fit on bin codes; predict from codes or float rows."""
+
+    def _codes(self, X):
+        if isinstance(X, BinnedMatrix) and X.binner is self.binner_:
+            return X.codes
+        return self.binner_.transform(np.asarray(X))
+
+    def fit(self, X, y, sample_weight=None):
+        # A warm start adds iterations on the bins the model was built with
+        if not (self.warm_start and hasattr(self, "binner_")):
+            self.binner_ = X.binner if isinstance(X, BinnedMatrix) else Binner().fit(X)
+        return super().fit(self._codes(X), y, sample_weight=sample_weight)
+
+
+class BinnedHistGradientBoostingRegressor(_BinnedInput, HistGradientBoostingRegressor):
+    def predict(self, X):
+        return super().predict(self._codes(X))
+
+
+class BinnedHistGradientBoostingClassifier(_BinnedInput, HistGradientBoostingClassifier):
+    def predict_proba(self, X):
+        return super().predict_proba(self._codes(X))
+
+    def decision_function(self, X):
+        return super().decision_function(self._codes(X))
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+# -------------------------------------------
+# Learners
+# -------------------------------------------
+HGB_PARAMS = dict(max_iter=200, learning_rate=0.1, max_leaf_nodes=31, l2_regularization=1.0,
+                  early_stopping=False, random_state=42)
+
+
+@dataclass(frozen=True)
+class Learner:
+    name: str
+    classifier: type
+    regressor: type
+    binned: bool = False
+    hyperparams: dict = None   # None: the pipeline's rf_params
+
+    def params(self, pipeline):
+        return dict(pipeline.rf_params if self.hyperparams is None else self.hyperparams)
+
+    def estimator(self, classify):
+        return self.classifier if classify else self.regressor
+
+    def matrix(self, X, fit_rows=None):
+        """X prepared once for every model of this learner; bins from X[:fit_rows]."""
+        return BinnedMatrix(X, Binner().fit(X[:fit_rows])) if self.binned else X
+
+
+LEARNERS = {
+    "forest": Learner("forest", RandomForestClassifier, RandomForestRegressor),
+    "hgb": Learner("hgb", BinnedHistGradientBoostingClassifier,
+                   BinnedHistGradientBoostingRegressor, binned=True, hyperparams=HGB_PARAMS),
+}
+
+
+def learner(name=None):
+    """LEARNERS[name], by default the one ECO_LEARNER names (forest)."""
+    name = name or os.environ.get("ECO_LEARNER", "forest")
+    if name not in LEARNERS:
+        raise ValueError(f"Unknown learner {name!r}, expected one of {', '.join(LEARNERS)}")
+    return LEARNERS[name]
+
+
+# -------------------------------------------
+# Side-by-side comparison
+# -------------------------------------------
+# How each target is trained, shared with backtest.py and fleet.py
+CLASSIFIED_TARGETS = {"rain_flag"}
+RAIN_AMOUNTS = {"precip": 0.05, "precip_sum": 0.1}   # trained on wet rows only, as the scripts do
+
+
+def compare(fm, pipeline, names=("forest", "hgb"), test_fraction=0.2):
+    """Fit every target with every learner on one split -> DataFrame of metrics and fit times."""
+    split = len(fm) - int(len(fm) * test_fraction)
+    rows = []
+    for name in names:
+        # Bin edges from the training rows, as backtest.py does
+        learn = learner(name)
+        params = learn.params(pipeline)
+        t0 = time.perf_counter()
+        X = learn.matrix(fm.X, split)
+        prepare = time.perf_counter() - t0
+        for target in pipeline.targets:
+            y = fm.targets[target]
+            train = np.arange(len(fm)) < split
+            test = ~train
+            if target in RAIN_AMOUNTS:
+                train &= y > RAIN_AMOUNTS[target]
+                test &= y > RAIN_AMOUNTS[target]
+            classify = target in CLASSIFIED_TARGETS
+            t0 = time.perf_counter()
+            model = learn.estimator(classify)(**params).fit(X[train], y[train])
+            row = {"learner": name, "target": target, "fit_s": time.perf_counter() - t0,
+                   "bin_s": prepare}
+            if classify:
+                proba = model.predict_proba(X[test])[:, list(model.classes_).index(1)]
+                row["auc"] = roc_auc_score(y[test], proba)
+                row["accuracy"] = accuracy_score(y[test], proba > 0.5)
+            else:
+                pred = model.predict(X[test])
+                row["mae"] = mean_absolute_error(y[test], pred)
+                row["rmse"] = np.sqrt(mean_squared_error(y[test], pred))
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def side_by_side(table):
+    """One row per target and metric, one column per learner."""
+    long = table.drop(columns="bin_s").melt(id_vars=["learner", "target"],
+                                            var_name="metric").dropna()
+    wide = long.pivot_table(index=["target", "metric"], columns="learner", values="value")
+    # Binning is done once per learner, fitting once per target
+    totals = table.groupby("learner")["fit_s"].sum() + table.groupby("learner")["bin_s"].first()
+    return wide, totals
+
+
+def main():
+    from pipelines import PIPELINES
+
+    parser = argparse.ArgumentParser(description="Compare learners on one pipeline.")
+    parser.add_argument("--pipeline", default="hourly_precip", choices=sorted(PIPELINES))
+    parser.add_argument("--latitude", type=float, default=52.37)
+    parser.add_argument("--longitude", type=float, default=4.89)
+    parser.add_argument("--end-date", default=date.today().isoformat())
+    parser.add_argument("--learners", nargs="+", default=list(LEARNERS), choices=list(LEARNERS))
+    args = parser.parse_args()
+
+    pipeline = PIPELINES[args.pipeline]
+    df = pipeline.load(args.latitude, args.longitude, args.end_date)
+    fm = pipeline.features(df)
+    print(f"🧮 {len(fm)} rows x {fm.X.shape[1]} features, targets {', '.join(pipeline.targets)}")
+    wide, totals = side_by_side(compare(fm, pipeline, args.learners))
+    print(wide.round(3).to_string())
+    print("\nTotal time (binning + fits): " + ", ".join(f"{name} {totals[name]:.1f} s" for name in args.learners))
+
+
+if __name__ == "__main__":
+    main()
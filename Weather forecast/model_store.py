@@ -0,0 +1,131 @@
+# model_store.py
+#
+# On-disk registry of fitted forecast models.
+#
+# A model slot is keyed by name, feature spec and hyperparameters; the
+# data it was trained on is recorded as a fingerprint (row count + hash of
+# X and y). fit_or_load() then picks the cheapest way to get a model for
+# the current training data:
+#
+#   loaded     same data as last time -> memory-mapped load, no fitting
+#   refreshed  old data is a prefix of the new data (new rows appended)
+#              -> warm_start: add a few trees (or boosting iterations)
+#              trained on the full data
+#   fitted     anything else, or too many refreshes in a row -> refit
+#
+# Refreshes keep the hourly cron jobs cheap; the periodic full refit keeps
+# the forest from drifting towards old data and growing without bound.
+#
+# Forests are also saved in flat_forest form (flat.npz), which
+# load_flat() returns for fast single-row predictions.
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+from flat_forest import FlatForest
+
+MODEL_DIR = Path(os.environ.get(
+    "ECO_MODEL_DIR", Path.home() / ".cache" / "eco-climate" / "models"
+))
+
+# Parameters that do not change the fitted model
+_RUNTIME_PARAMS = {"n_jobs", "verbose", "warm_start"}
+
+
+def data_fingerprint(X, y, rows=None):
+    rows = len(X) if rows is None else rows
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(X[:rows]).view(np.uint8))
+    h.update(np.ascontiguousarray(y[:rows], dtype=np.float64).view(np.uint8))
+    return h.hexdigest()
+
+
+def model_key(name, spec, params):
+    params = {k: v for k, v in params.items() if k not in _RUNTIME_PARAMS}
+    blob = json.dumps([name, spec.key(), params], sort_keys=True, default=str)
+    return f"{name}-{hashlib.sha1(blob.encode()).hexdigest()[:12]}"
+
+
+def _size_param(model):
+    """Trees of a forest, iterations of gradient boosting (learners.py)."""
+    return "n_estimators" if "n_estimators" in model.get_params() else "max_iter"
+
+
+def _save_flat(slot, model):
+    if hasattr(model, "estimators_") and hasattr(model.estimators_[0], "tree_"):
+        FlatForest.from_model(model).save(slot / "flat.tmp.npz")
+        os.replace(slot / "flat.tmp.npz", slot / "flat.npz")
+
+
+def _save(slot, model, meta):
+    slot.mkdir(parents=True, exist_ok=True)
+    tmp = slot / "model.joblib.tmp"
+    joblib.dump(model, tmp)  # uncompressed, so it can be memory-mapped
+    os.replace(tmp, slot / "model.joblib")
+    _save_flat(slot, model)
+    with open(slot / "meta.json.tmp", "w") as f:
+        json.dump(meta, f, indent=1, default=str)
+    os.replace(slot / "meta.json.tmp", slot / "meta.json")
+
+
+def _load_meta(slot):
+    try:
+        with open(slot / "meta.json") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def fit_or_load(name, estimator, X, y, spec, params, store_dir=None,
+                grow=0.1, max_refreshes=24):
+    """
+    Return (model, how) for `estimator(**params)` trained on X, y.
+
+    grow           trees added per refresh, as a fraction of n_estimators
+    max_refreshes  refreshes allowed before the next full refit
+    """
+    slot = Path(store_dir or MODEL_DIR) / model_key(name, spec, params)
+    meta = _load_meta(slot)
+    fingerprint = data_fingerprint(X, y)
+
+    if meta and meta["rows"] == len(X) and meta["data"] == fingerprint:
+        model = joblib.load(slot / "model.joblib", mmap_mode="r")
+        if not (slot / "flat.npz").exists():
+            _save_flat(slot, model)
+        return model, "loaded"
+
+    if (meta and meta["rows"] < len(X) and meta["refreshes"] < max_refreshes
+            and data_fingerprint(X, y, meta["rows"]) == meta["data"]):
+        model = joblib.load(slot / "model.joblib")
+        size = _size_param(model)
+        added = max(1, int(round(params.get(size, 100) * grow)))
+        model.set_params(warm_start=True, **{size: model.get_params()[size] + added})
+        model.fit(X, y)
+        model.set_params(warm_start=False)
+        how = "refreshed"
+        refreshes = meta["refreshes"] + 1
+    else:
+        model = estimator(**params)
+        model.fit(X, y)
+        how = "fitted"
+        refreshes = 0
+
+    _save(slot, model, {
+        "rows": len(X),
+        "data": fingerprint,
+        "refreshes": refreshes,
+        "n_estimators": model.get_params().get(_size_param(model)),
+        "params": {k: v for k, v in params.items() if k not in _RUNTIME_PARAMS},
+    })
+    return model, how
+
+
+def load_flat(name, spec, params, store_dir=None):
+    """FlatForest of the model fit_or_load() stored under the same key."""
+    slot = Path(store_dir or MODEL_DIR) / model_key(name, spec, params)
+    return FlatForest.load(slot / "flat.npz")
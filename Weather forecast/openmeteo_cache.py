@@ -0,0 +1,224 @@
+# openmeteo_cache.py
+#
+# Local Parquet store for Open-Meteo archive downloads.
+#
+# Every variable is stored as one small Parquet file per month:
+#
+#   <cache_dir>/<location>/<frequency>/<variable>/<YYYY-MM>.parquet
+#
+# and a ranges.json next to the variable folders records which span of
+# timestamps is already on disk. A run only asks the archive API for the
+# days that are missing (usually just the tail since the last run) and
+# merges them into the affected month files.
+
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+import requests
+
+ARCHIVE_URL = os.environ.get(
+    "OPENMETEO_ARCHIVE_URL", "https://archive-api.open-meteo.com/v1/archive"
+)
+CACHE_DIR = Path(os.environ.get(
+    "OPENMETEO_CACHE_DIR", Path.home() / ".cache" / "eco-climate" / "open-meteo"
+))
+
+STEPS = {"daily": pd.Timedelta(days=1), "hourly": pd.Timedelta(hours=1)}
+ARCHIVE_LAG = pd.Timedelta(days=7)   # the archive's trailing nulls stay shorter than this
+
+
+# -------------------------------------------
+# Paths & range bookkeeping
+# -------------------------------------------
+def location_key(latitude, longitude, timezone):
+    return f"{latitude:.2f}_{longitude:.2f}_{timezone.replace('/', '-')}"
+
+
+def _store_dir(cache_dir, latitude, longitude, timezone, frequency):
+    return Path(cache_dir) / location_key(latitude, longitude, timezone) / frequency
+
+
+def _load_ranges(store):
+    path = store / "ranges.json"
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return {k: (pd.Timestamp(a), pd.Timestamp(b)) for k, (a, b) in json.load(f).items()}
+
+
+def _save_ranges(store, ranges):
+    store.mkdir(parents=True, exist_ok=True)
+    tmp = store / "ranges.json.tmp"
+    with open(tmp, "w") as f:
+        json.dump({k: [a.isoformat(), b.isoformat()] for k, (a, b) in ranges.items()}, f, indent=1)
+    os.replace(tmp, store / "ranges.json")
+
+
+def _missing_spans(ranges, variables, start, end, step):
+    """Date spans (head and/or tail) the store does not cover yet."""
+    heads, tails = [], []
+    for var in variables:
+        if var not in ranges:
+            heads.append((start, end))
+            continue
+        first, last = ranges[var]
+        if start < first:
+            heads.append((start, (first - step).normalize()))
+        if last + step <= end + STEPS["daily"] - step:
+            tails.append(((last + step).normalize(), end))
+    spans = []
+    if heads:
+        spans.append((min(a for a, _ in heads), max(b for _, b in heads)))
+    if tails:
+        spans.append((min(a for a, _ in tails), end))
+    if len(spans) == 2 and spans[1][0] <= spans[0][1] + STEPS["daily"]:
+        spans = [(spans[0][0], end)]
+    return [(a, b) for a, b in spans if a <= b]
+
+
+# -------------------------------------------
+# Download
+# -------------------------------------------
+def download_many(locations, start, end, variables, frequency="daily",
+                  timezone="Europe/Amsterdam", url=None, session=None):
+    """
+    One archive API request for several (latitude, longitude) pairs (the
+    API takes comma-separated coordinates). Returns one time-indexed
+    DataFrame per location, in order.
+    """
+    params = {
+        "latitude": ",".join(str(lat) for lat, _ in locations),
+        "longitude": ",".join(str(lon) for _, lon in locations),
+        "start_date": pd.Timestamp(start).date().isoformat(),
+        "end_date": pd.Timestamp(end).date().isoformat(),
+        frequency: ",".join(variables),
+        "timezone": timezone,
+    }
+    response = (session or requests).get(url or ARCHIVE_URL, params=params, timeout=120)
+    response.raise_for_status()
+    payload = response.json()
+    if isinstance(payload, dict):
+        payload = [payload]
+    frames = []
+    for item in payload:
+        block = item[frequency]
+        df = pd.DataFrame({var: block[var] for var in variables},
+                          index=pd.to_datetime(block["time"]), dtype="float64")
+        df.index.name = "time"
+        frames.append(df)
+    return frames
+
+
+def download(latitude, longitude, start, end, variables, **kwargs):
+    """One archive API request, returned as a time-indexed DataFrame."""
+    return download_many([(latitude, longitude)], start, end, variables, **kwargs)[0]
+
+
+# -------------------------------------------
+# Month partitions
+# -------------------------------------------
+def _month_file(store, variable, month):
+    return store / variable / f"{month}.parquet"
+
+
+def _merge_into_store(store, fetched):
+    for var in fetched.columns:
+        series = fetched[var]
+        for month, part in series.groupby(series.index.strftime("%Y-%m")):
+            path = _month_file(store, var, month)
+            if path.exists():
+                old = pd.read_parquet(path)[var]
+                part = part.combine_first(old)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            part.sort_index().to_frame(var).to_parquet(tmp)
+            os.replace(tmp, path)
+
+
+def _read_store(store, variables, start, stop):
+    months = pd.period_range(start, stop - pd.Timedelta(seconds=1), freq="M").strftime("%Y-%m")
+    columns = {}
+    for var in variables:
+        parts = [pd.read_parquet(p)[var] for p in
+                 (_month_file(store, var, m) for m in months) if p.exists()]
+        columns[var] = pd.concat(parts) if parts else pd.Series(dtype="float64")
+    df = pd.DataFrame(columns)
+    df.index.name = "time"
+    return df[(df.index >= start) & (df.index < stop)]
+
+
+def _record(store, ranges, fetched, variables):
+    _merge_into_store(store, fetched)
+    if not len(fetched):
+        return
+    # The archive lags real time by a few days and returns nulls for them;
+    # only count up to the last real value as covered. A variable with no
+    # value at all (not available here) is covered as far as the others,
+    # or up to ARCHIVE_LAG before the end, so it is not fetched again.
+    any_valid = fetched.index[fetched[list(variables)].notna().any(axis=1)]
+    for var in variables:
+        valid = fetched.index[fetched[var].notna()]
+        if len(valid):
+            covered = valid[-1]
+        elif len(any_valid):
+            covered = any_valid[-1]
+        else:
+            covered = fetched.index[-1] - ARCHIVE_LAG
+        if covered < fetched.index[0]:
+            continue
+        first, last = ranges.get(var, (fetched.index[0], covered))
+        ranges[var] = (min(first, fetched.index[0]), max(last, covered))
+    _save_ranges(store, ranges)
+
+
+# -------------------------------------------
+# Public entry points
+# -------------------------------------------
+def fetch_archive(latitude, longitude, start_date, end_date, variables,
+                  frequency="daily", timezone="Europe/Amsterdam",
+                  cache_dir=None, url=None, session=None):
+    """
+    Archive data for one location, served from the local store and topped
+    up with only the days that are not on disk yet.
+
+    Returns a DataFrame indexed by time with one float64 column per
+    variable, covering start_date .. end_date (inclusive, whole days).
+    """
+    return fetch_archive_many(
+        [(latitude, longitude)], start_date, end_date, variables, frequency=frequency,
+        timezone=timezone, cache_dir=cache_dir, url=url, session=session,
+    )[(latitude, longitude)]
+
+
+def fetch_archive_many(locations, start_date, end_date, variables,
+                       frequency="daily", timezone="Europe/Amsterdam",
+                       cache_dir=None, url=None, session=None, batch_size=50):
+    """
+    fetch_archive() for many (latitude, longitude) pairs. Locations missing
+    the same span of days are downloaded together, `batch_size`
+    coordinates per request. Returns {(latitude, longitude): DataFrame}.
+    """
+    step = STEPS[frequency]
+    start = pd.Timestamp(start_date).normalize()
+    end = pd.Timestamp(end_date).normalize()
+    stop = end + STEPS["daily"]
+
+    stores, plans = {}, {}
+    for loc in dict.fromkeys(locations):
+        store = _store_dir(cache_dir or CACHE_DIR, *loc, timezone, frequency)
+        ranges = _load_ranges(store)
+        stores[loc] = store
+        for span in _missing_spans(ranges, variables, start, end, step):
+            plans.setdefault(span, []).append((loc, store, ranges))
+
+    for (span_start, span_end), group in plans.items():
+        for i in range(0, len(group), batch_size):
+            chunk = group[i:i + batch_size]
+            frames = download_many([loc for loc, _, _ in chunk], span_start, span_end, variables,
+                                   frequency=frequency, timezone=timezone, url=url, session=session)
+            for (_, store, ranges), fetched in zip(chunk, frames):
+                _record(store, ranges, fetched, variables)
+
+    return {loc: _read_store(store, variables, start, stop) for loc, store in stores.items()}
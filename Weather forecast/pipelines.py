@@ -0,0 +1,164 @@
+# pipelines.py
+#
+# Data definitions of the four forecast pipelines: which Open-Meteo
+# variables they use (and what the scripts call them), derived columns,
+# the feature spec and the target columns. The Amsterdam_*
+# scripts, the fleet runner and the other tools all read from here so the
+# pipelines only exist once. All four read their variables from the same
+# hourly download (hourly_ingest.py); daily variables are aggregated over
+# local days.
+
+from dataclasses import dataclass, field
+
+from features import FeatureSpec, build_features
+from hourly_ingest import load
+
+
+@dataclass
+class Pipeline:
+    name: str
+    frequency: str            # "daily" or "hourly" (tz-aware local index)
+    start_date: str
+    variables: dict           # Open-Meteo variable -> column name
+    spec: FeatureSpec
+    targets: list
+    derive: object = None     # optional df -> df, adds derived columns
+    index_name: str = "time"
+    rf_params: dict = field(default_factory=lambda: dict(
+        n_estimators=200, random_state=42, n_jobs=-1
+    ))
+
+    def frame(self, raw):
+        """Rename the downloaded variables and add derived columns."""
+        df = raw.rename(columns=self.variables)
+        df.index.name = self.index_name
+        return self.derive(df) if self.derive else df
+
+    def load(self, latitude, longitude, end_date, start_date=None, **fetch_kwargs):
+        raw = load(latitude, longitude, start_date or self.start_date, end_date,
+                   list(self.variables), frequency=self.frequency, **fetch_kwargs)
+        return self.frame(raw)
+
+    def features(self, df):
+        return build_features(df, self.spec, targets=self.targets)
+
+
+# -------------------------------------------
+# Derived columns
+# -------------------------------------------
+def _daily_rain(df):
+    # Binary target: did it rain or not?
+    df["rain_flag"] = (df["precip_sum"] > 0.1).astype(float).where(df["precip_sum"].notna())
+    df["temp_mean"] = (df["temp_max"] + df["temp_min"]) / 2
+    return df
+
+
+def _hourly_rain(df):
+    df["rain_flag"] = (df["precip"] > 0.05).astype(float).where(df["precip"].notna())
+    return df
+
+
+# -------------------------------------------
+# Pipelines
+# -------------------------------------------
+DAILY_TEMPERATURE = Pipeline(
+    name="daily_temp",
+    frequency="daily",
+    start_date="2015-01-01",
+    index_name="date",
+    variables={
+        "temperature_2m_max": "temp_max",
+        "temperature_2m_min": "temp_min",
+        "precipitation_sum": "precipitation",
+    },
+    spec=FeatureSpec(
+        columns=["precipitation"],
+        lags={col: range(1, 8) for col in ["temp_max", "temp_min", "precipitation"]},
+        # Windows end at the previous day: the same day's values are the targets
+        rolling={"temp_max": [7], "temp_min": [7]},
+        rolling_shift=1,
+        calendar=["dayofyear", "month"],
+    ),
+    targets=["temp_max", "temp_min"],
+)
+
+HOURLY_TEMPERATURE = Pipeline(
+    name="hourly_temp",
+    frequency="hourly",
+    start_date="2025-01-01",
+    variables={
+        "temperature_2m": "temp",
+        "relative_humidity_2m": "relative_humidity_2m",
+        "precipitation": "precipitation",
+        "cloud_cover": "cloud_cover",
+    },
+    spec=FeatureSpec(
+        columns=["relative_humidity_2m", "precipitation", "cloud_cover"],
+        lags={col: range(1, 25) for col in
+              ["temp", "relative_humidity_2m", "cloud_cover", "precipitation"]},
+        # Rolling averages over the previous hours (the current temp is the target)
+        rolling={"temp": [6, 24]},
+        rolling_shift=1,
+        # Time features, with sine and cosine encoding for hour
+        calendar=["hour", "dayofyear", "month", "hour_sin", "hour_cos"],
+    ),
+    targets=["temp"],
+)
+
+DAILY_PRECIPITATION = Pipeline(
+    name="daily_precip",
+    frequency="daily",
+    start_date="2020-01-01",
+    index_name="date",
+    variables={
+        "temperature_2m_max": "temp_max",
+        "temperature_2m_min": "temp_min",
+        "precipitation_sum": "precip_sum",
+        "rain_sum": "rain_sum",
+        "cloudcover_mean": "cloudcover",
+        "relative_humidity_2m_mean": "humidity",
+        "windspeed_10m_max": "wind_max",
+    },
+    derive=_daily_rain,
+    spec=FeatureSpec(
+        columns=["temp_max", "temp_min", "humidity", "temp_mean"],
+        # Lag features (last few days)
+        lags={col: range(1, 8) for col in
+              ["precip_sum", "rain_flag", "temp_max", "temp_min", "cloudcover", "humidity", "wind_max"]},
+        # Rolling features, ending at the previous day (precip_sum, wind_max
+        # and cloudcover are targets)
+        rolling={"precip_sum": [3, 7], "temp_mean": [7], "wind_max": [3], "cloudcover": [3]},
+        rolling_shift=1,
+        # Time-based features
+        calendar=["month", "dayofyear"],
+    ),
+    targets=["rain_flag", "precip_sum", "wind_max", "cloudcover"],
+)
+
+HOURLY_PRECIPITATION = Pipeline(
+    name="hourly_precip",
+    frequency="hourly",
+    start_date="2024-01-01",
+    variables={
+        "temperature_2m": "temp",
+        "precipitation": "precip",
+        "cloud_cover": "cloud",
+        "relative_humidity_2m": "humidity",
+        "wind_speed_10m": "wind",
+    },
+    derive=_hourly_rain,
+    spec=FeatureSpec(
+        columns=["temp", "humidity"],
+        # Lag features
+        lags={col: range(1, 6) for col in ["precip", "rain_flag", "temp", "cloud", "humidity", "wind"]},
+        # Rolling features, ending at the previous hour (all three are targets)
+        rolling={"precip": [6, 12], "wind": [6], "cloud": [6]},
+        rolling_shift=1,
+        # Time features
+        calendar=["hour", "dayofyear"],
+    ),
+    targets=["rain_flag", "precip", "wind", "cloud"],
+)
+
+PIPELINES = {p.name: p for p in
+             [DAILY_TEMPERATURE, HOURLY_TEMPERATURE, DAILY_PRECIPITATION, HOURLY_PRECIPITATION]}
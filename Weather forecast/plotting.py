@@ -0,0 +1,32 @@
+# plotting.py
+#
+# Optional plots for the forecast scripts. Plotting is off unless ECO_PLOT
+# is set: ECO_PLOT=1 opens a window, ECO_PLOT=<file>.png (or .svg/.pdf)
+# saves the figure without a display. matplotlib is only imported when a
+# plot is actually made.
+
+import os
+
+SAVE_SUFFIXES = (".png", ".svg", ".pdf")
+
+
+def pyplot():
+    """matplotlib.pyplot when plotting is enabled, else None."""
+    target = os.environ.get("ECO_PLOT", "")
+    if target in ("", "0"):
+        return None
+    import matplotlib
+    if target.endswith(SAVE_SUFFIXES):
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def finish(plt):
+    target = os.environ.get("ECO_PLOT", "")
+    if target.endswith(SAVE_SUFFIXES):
+        plt.savefig(target)
+        plt.close()
+        print(f"🖼️ Plot saved as {target}")
+    else:
+        plt.show()
@@ -0,0 +1,126 @@
+# recursive.py
+#
+# Recursive multi-step forecaster on top of a FeatureSpec.
+#
+# Instead of appending every prediction to the full history DataFrame and
+# rebuilding the last row, the forecaster keeps only the last
+# spec.depth() values of each source column in a fixed-size ring buffer.
+# Each step assembles one feature row from the buffer, predicts the
+# target, and pushes the prediction (plus persisted exogenous values)
+# into the buffer, so a step costs O(features) regardless of how long
+# the history is.
+
+import numpy as np
+import pandas as pd
+
+from features import calendar_block
+
+
+class RecursiveForecaster:
+    def __init__(self, model, spec, target, history, step=pd.Timedelta(hours=1)):
+        """
+        model    fitted estimator trained on build_features(..., spec)
+        spec     FeatureSpec; the target may only appear with lags >= 1
+                 (and in rolling windows only with rolling_shift >= 1)
+        target   column the model predicts
+        history  DataFrame with every column the spec uses, ending at the
+                 last observed step
+        """
+        if target in spec.columns or (target in spec.rolling and spec.rolling_shift < 1):
+            raise ValueError(
+                f"'{target}' is used at the current step; recursive forecasting "
+                "needs it lagged (use lags >= 1 and rolling_shift >= 1)"
+            )
+        self.model = model
+        self.spec = spec
+        self.step = pd.Timedelta(step)
+
+        sources = list(dict.fromkeys(
+            list(spec.columns) + list(spec.lags) + list(spec.rolling) + [target]
+        ))
+        self._target = sources.index(target)
+        self._size = max(spec.depth(), 1)
+        if len(history) < self._size:
+            raise ValueError(f"Need at least {self._size} rows of history, got {len(history)}")
+
+        # ring[:, pos] is the most recent observation, ring[:, pos - k + 1] is lag k
+        self._ring = np.ascontiguousarray(
+            history[sources].to_numpy(np.float64)[-self._size:].T
+        )
+        self._pos = self._size - 1
+        self._lag_order = np.arange(self._size)
+        self.time = history.index[-1]
+
+        # Gather plans: slot in the feature row <- (source row, lag / window)
+        src = {col: i for i, col in enumerate(sources)}
+        self._row = np.empty((1, len(spec.names())), dtype=np.float32)
+        j = len(spec.columns)
+        self._col_src = np.array([src[c] for c in spec.columns], dtype=np.intp)
+
+        lag_src, lag_k = [], []
+        for col, lags in spec.lags.items():
+            lag_src += [src[col]] * len(lags)
+            lag_k += list(lags)
+        self._lag_slots = np.arange(j, j + len(lag_k))
+        self._lag_src = np.array(lag_src, dtype=np.intp)
+        self._lag_k = np.array(lag_k, dtype=np.intp)
+        j += len(lag_k)
+
+        roll_src, roll_w = [], []
+        for col, windows in spec.rolling.items():
+            roll_src += [src[col]] * len(windows)
+            roll_w += list(windows)
+        self._roll_slots = np.arange(j, j + len(roll_w))
+        self._roll_src = np.array(roll_src, dtype=np.intp)
+        self._roll_w = np.array(roll_w, dtype=np.intp)
+        self._roll_start = spec.rolling_shift
+        j += len(roll_w)
+        self._cal_slots = slice(j, None)
+
+    def _lagged(self):
+        """
+        values[:, k] = value at lag k. Lag 0 (the step being predicted) is
+        unknown, so exogenous columns persist their last value; the target's
+        lag 0 is never read (checked in __init__).
+        """
+        order = (self._pos - self._lag_order) % self._size
+        values = np.empty((self._ring.shape[0], self._size + 1))
+        values[:, 1:] = self._ring[:, order]
+        values[:, 0] = values[:, 1]
+        return values
+
+    def step_once(self):
+        """Predict the next step and roll the state forward by one."""
+        t = self.time + self.step
+        values = self._lagged()
+        row = self._row[0]
+
+        row[:len(self._col_src)] = values[self._col_src, 0]
+        row[self._lag_slots] = values[self._lag_src, self._lag_k]
+        if len(self._roll_src):
+            csum = np.zeros((values.shape[0], values.shape[1] + 1))
+            np.cumsum(values, axis=1, out=csum[:, 1:])
+            a = self._roll_start
+            row[self._roll_slots] = (
+                csum[self._roll_src, a + self._roll_w] - csum[self._roll_src, a]
+            ) / self._roll_w
+        if self.spec.calendar:
+            row[self._cal_slots] = calendar_block(self.spec, [t])[0]
+
+        pred = float(self.model.predict(self._row)[0])
+
+        new = values[:, 0]
+        new[self._target] = pred
+        self._pos = (self._pos + 1) % self._size
+        self._ring[:, self._pos] = new
+        self.time = t
+        return t, pred
+
+    def forecast(self, steps):
+        """Run `steps` recursive steps; returns a Series indexed by time."""
+        times, preds = [], []
+        for _ in range(steps):
+            t, pred = self.step_once()
+            times.append(t)
+            preds.append(pred)
+        return pd.Series(preds, index=pd.DatetimeIndex(times, name="time"))
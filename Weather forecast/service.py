@@ -0,0 +1,375 @@
+# service.py
+#
+# Local HTTP forecast service that keeps data and models warm.
+#
+#   python service.py --port 8765 --warm 52.37,4.89 --refresh 3600
+#
+#   GET /forecast/daily-temperature?lat=52.37&lon=4.89
+#   GET /forecast/hourly-temperature?lat=52.37&lon=4.89&hours=24
+#   GET /forecast/precipitation?lat=52.37&lon=4.89&frequency=daily|hourly
+#   GET /health
+#
+# Every (pipeline, location) is a Site: its data, feature matrix and fitted
+# models, loaded on first use (or at startup with --warm) through the
+# archive cache and the model store, under the same model names as the
+# Amsterdam_* scripts. Single-row predictions go through the flat forest
+# export. Results are cached until the next refresh, and concurrent
+# requests for the same missing result share one computation. A
+# background task reloads every site's data and refreshes its models
+# every --refresh seconds, then swaps the new state in. At most --max-sites
+# sites are kept (least recently used go first), and a site not requested
+# for --idle seconds is dropped instead of refreshed; --warm sites stay.
+
+import argparse
+import asyncio
+import json
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+from features import horizon_block
+from model_store import fit_or_load, load_flat
+from openmeteo_cache import STEPS
+from pipelines import PIPELINES
+from recursive import RecursiveForecaster
+
+# pipeline -> (key, model name prefix, target, estimator, training rows)
+# "train" = first 80% of rows, "rainy" = all rows with rain_flag == 1;
+# the same models the Amsterdam_* scripts store.
+MODELS = {
+    "daily_temp": [
+        ("temp_max", "daily_temp_max", "temp_max", RandomForestRegressor, "train"),
+        ("temp_min", "daily_temp_min", "temp_min", RandomForestRegressor, "train"),
+    ],
+    "hourly_temp": [
+        ("temp", "hourly_temp", "temp", RandomForestRegressor, "train"),
+    ],
+    "daily_precip": [
+        ("rain_flag", "daily_rain_flag", "rain_flag", RandomForestClassifier, "train"),
+        ("rain_mm", "daily_rain_mm", "precip_sum", RandomForestRegressor, "rainy"),
+        ("wind", "daily_wind", "wind_max", RandomForestRegressor, "train"),
+        ("cloud", "daily_cloud", "cloudcover", RandomForestRegressor, "train"),
+    ],
+    "hourly_precip": [
+        ("rain_flag", "hourly_rain_flag", "rain_flag", RandomForestClassifier, "train"),
+        ("rain_mm", "hourly_rain_mm", "precip", RandomForestRegressor, "rainy"),
+        ("wind", "hourly_wind", "wind", RandomForestRegressor, "train"),
+        ("cloud", "hourly_cloud", "cloud", RandomForestRegressor, "train"),
+    ],
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# -------------------------------------------
+# Sites
+# -------------------------------------------
+class Site:
+    """Data, features and fitted models of one pipeline at one location."""
+
+    def __init__(self, pipeline, latitude, longitude):
+        self.pipeline = pipeline
+        self.latitude = latitude
+        self.longitude = longitude
+        self.state = None      # (df, fm, models, flat), replaced as a whole
+        self.version = 0
+        self.refreshed = None
+        self.used = time.time()  # last request
+
+    def load(self):
+        """Blocking: fetch data, fit or reload models, swap the new state in."""
+        pipeline = self.pipeline
+        df = pipeline.load(self.latitude, self.longitude, date.today().isoformat())
+        fm = pipeline.features(df)
+        split = len(fm) - int(len(fm) * 0.2)
+        site = f"{self.latitude}_{self.longitude}"
+
+        models, flat = {}, {}
+        for key, prefix, target, estimator, rows in MODELS[pipeline.name]:
+            y = fm.targets[target]
+            if rows == "rainy":
+                rainy = fm.targets["rain_flag"] == 1
+                X_fit, y_fit = fm.X[rainy], y[rainy]
+            else:
+                X_fit, y_fit = fm.X[:split], y[:split]
+            name = f"{prefix}_{site}"
+            models[key], _ = fit_or_load(name, estimator, X_fit, y_fit,
+                                         pipeline.spec, pipeline.rf_params)
+            flat[key] = load_flat(name, pipeline.spec, pipeline.rf_params)
+
+        self.state = (df, fm, models, flat)
+        self.version += 1
+        self.refreshed = time.time()
+
+
+def daily_temperature(site):
+    _, fm, _, flat = site.state
+    x = fm.X[-1:]
+    return {
+        "date": fm.index[-1] + STEPS["daily"],
+        "temp_max": flat["temp_max"].predict(x)[0],
+        "temp_min": flat["temp_min"].predict(x)[0],
+    }
+
+
+def hourly_temperature(site, hours):
+    df, fm, _, flat = site.state
+    # One row per step: the flat forest keeps each step well under a millisecond
+    forecaster = RecursiveForecaster(flat["temp"], site.pipeline.spec, "temp",
+                                     df.loc[:fm.index[-1]])
+    pred = forecaster.forecast(hours)
+    return {"time": list(pred.index), "temp": pred.to_numpy()}
+
+
+def precipitation(site):
+    _, fm, models, flat = site.state
+    if site.pipeline.frequency == "daily":
+        x = fm.X[-1:]
+        rain_prob = flat["rain_flag"].predict_proba(x)[0, 1]
+        return {
+            "date": fm.index[-1] + STEPS["daily"],
+            "rain_prob_%": rain_prob * 100,
+            "rain_mm": flat["rain_mm"].predict(x)[0] * rain_prob,
+            "wind_speed_mps": flat["wind"].predict(x)[0],
+            "cloud_cover_%": np.clip(flat["cloud"].predict(x)[0], 0, 100),
+        }
+    # Next 24 hours in one block per model (see Amsterdam_precipitation_hourly.py)
+    times = pd.date_range(fm.index[-1] + STEPS["hourly"], periods=24, freq="h")
+    X_future = horizon_block(fm.X[-1], site.pipeline.spec, times)
+    rain_prob = models["rain_flag"].predict_proba(X_future)[:, 1]
+    return {
+        "time": list(times),
+        "rain_prob_%": rain_prob * 100,
+        "rain_mm": models["rain_mm"].predict(X_future) * rain_prob,
+        "wind_speed_mps": models["wind"].predict(X_future),
+        "cloud_cover_%": np.clip(models["cloud"].predict(X_future), 0, 100),
+    }
+
+
+def _jsonable(value):
+    if isinstance(value, (pd.Timestamp, date)):
+        return value.isoformat()
+    if isinstance(value, np.ndarray):
+        return [_jsonable(v) for v in value.tolist()]
+    if isinstance(value, list):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (float, np.floating)):
+        return round(float(value), 2)
+    return value
+
+
+# -------------------------------------------
+# Service
+# -------------------------------------------
+class ForecastService:
+    def __init__(self, refresh=3600, threads=4, max_sites=32, idle=86400):
+        self.refresh = refresh
+        self.max_sites = max_sites
+        self.idle = idle
+        self.sites = OrderedDict()   # key -> Site, least recently used first
+        self.pinned = set()          # keys of --warm sites, never dropped
+        self.results = {}      # key -> (site version, payload)
+        self.inflight = {}     # key -> Future shared by concurrent callers
+        self.latency = {}      # endpoint -> recent durations in seconds
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+
+    async def _coalesce(self, key, fn, *args):
+        """Run fn(*args) in the thread pool, once for all concurrent callers."""
+        future = self.inflight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, fn, *args)
+            self.inflight[key] = future
+            future.add_done_callback(lambda _: self.inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    def _drop(self, key):
+        self.sites.pop(key, None)
+        for result in [k for k in self.results if k[:3] == key]:
+            del self.results[result]
+
+    def _evict(self, now=None):
+        """Drop unpinned sites beyond max_sites (oldest first) and, given now, idle ones."""
+        unpinned = [key for key in self.sites if key not in self.pinned]
+        excess = len(unpinned) - self.max_sites
+        for key in unpinned:
+            if excess > 0 or (now is not None and now - self.sites[key].used > self.idle):
+                self._drop(key)
+                excess -= 1
+
+    async def site(self, pipeline_name, latitude, longitude, pin=False):
+        key = (pipeline_name, latitude, longitude)
+        if pin:
+            self.pinned.add(key)
+        site = self.sites.get(key)
+        if site is None:
+            site = self.sites[key] = Site(PIPELINES[pipeline_name], latitude, longitude)
+        self.sites.move_to_end(key)
+        site.used = time.time()
+        self._evict()
+        if site.state is None:
+            try:
+                await self._coalesce(("load",) + key, site.load)
+            except Exception:
+                self.sites.pop(key, None)
+                raise
+        return site
+
+    async def forecast(self, site, fn, *args):
+        key = (site.pipeline.name, site.latitude, site.longitude, fn.__name__) + args
+        cached = self.results.get(key)
+        if cached and cached[0] == site.version:
+            return cached[1]
+        version = site.version
+        payload = _jsonable(await self._coalesce(key + (version,), fn, site, *args))
+        self.results[key] = (version, payload)
+        return payload
+
+    async def refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh)
+            self._evict(time.time())
+            for key, site in list(self.sites.items()):
+                try:
+                    await self._coalesce(("load",) + key, site.load)
+                    print(f"🔄 Refreshed {key}")
+                except Exception as exc:  # keep serving the previous state
+                    print(f"⚠️ Refresh of {key} failed: {exc}")
+
+    # -------------------------------------------
+    # HTTP
+    # -------------------------------------------
+    async def route(self, path, query):
+        def arg(name, default=None, cast=float):
+            if name in query:
+                try:
+                    return cast(query[name][0])
+                except ValueError:
+                    raise HTTPError(400, f"bad value for '{name}'")
+            if default is None:
+                raise HTTPError(400, f"missing '{name}'")
+            return default
+
+        if path == "/health":
+            return {
+                "sites": [{"pipeline": k[0], "lat": k[1], "lon": k[2],
+                           "version": s.version, "refreshed": s.refreshed}
+                          for k, s in self.sites.items()],
+                "latency_ms": {
+                    endpoint: {"n": len(d),
+                               "p50": round(float(np.percentile(d, 50)) * 1000, 3),
+                               "p99": round(float(np.percentile(d, 99)) * 1000, 3)}
+                    for endpoint, d in self.latency.items() if d
+                },
+            }
+
+        lat, lon = arg("lat", 52.37), arg("lon", 4.89)
+        if path == "/forecast/daily-temperature":
+            return await self.forecast(await self.site("daily_temp", lat, lon), daily_temperature)
+        if path == "/forecast/hourly-temperature":
+            hours = arg("hours", 24, int)
+            if not 1 <= hours <= 168:
+                raise HTTPError(400, "hours must be between 1 and 168")
+            site = await self.site("hourly_temp", lat, lon)
+            return await self.forecast(site, hourly_temperature, hours)
+        if path == "/forecast/precipitation":
+            frequency = arg("frequency", "daily", str)
+            if frequency not in ("daily", "hourly"):
+                raise HTTPError(400, "frequency must be 'daily' or 'hourly'")
+            site = await self.site(f"{frequency}_precip", lat, lon)
+            return await self.forecast(site, precipitation)
+        raise HTTPError(404, f"no route for {path}")
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request = await reader.readline()
+                if not request:
+                    break
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                t0 = time.perf_counter()
+                parts = request.decode("latin-1").split()
+                url = urlsplit(parts[1] if len(parts) > 1 else "/")
+                try:
+                    if parts[0] != "GET":
+                        raise HTTPError(405, "only GET is supported")
+                    status, body = 200, await self.route(url.path, parse_qs(url.query))
+                except HTTPError as exc:
+                    status, body = exc.status, {"error": str(exc)}
+                except Exception as exc:
+                    status, body = 500, {"error": f"{type(exc).__name__}: {exc}"}
+
+                data = json.dumps(body).encode()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode()
+                    + data
+                )
+                await writer.drain()
+                if status == 200:
+                    self.latency.setdefault(url.path, deque(maxlen=10000)).append(
+                        time.perf_counter() - t0)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host, port, refresh, warm=(), max_sites=32, idle=86400):
+    service = ForecastService(refresh, max_sites=max_sites, idle=idle)
+    for lat, lon in warm:
+        print(f"🔥 Warming {lat}, {lon} ...")
+        for name in PIPELINES:
+            await service.site(name, lat, lon, pin=True)
+    server = await asyncio.start_server(service.handle, host, port)
+    refresher = asyncio.create_task(service.refresh_loop())
+    print(f"✅ Serving forecasts on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        refresher.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local forecast service with warm models.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--refresh", type=float, default=3600, help="seconds between data refreshes")
+    parser.add_argument("--warm", action="append", default=[], metavar="LAT,LON",
+                        help="load every pipeline for this location at startup")
+    parser.add_argument("--max-sites", type=int, default=32,
+                        help="sites kept besides --warm ones (least recently used dropped)")
+    parser.add_argument("--idle", type=float, default=86400,
+                        help="seconds without requests before a site is dropped")
+    args = parser.parse_args()
+
+    warm = [tuple(float(v) for v in item.split(",")) for item in args.warm]
+    try:
+        asyncio.run(serve(args.host, args.port, args.refresh, warm, args.max_sites, args.idle))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
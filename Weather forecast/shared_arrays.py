@@ -0,0 +1,28 @@
+# shared_arrays.py
+#
+# NumPy arrays in multiprocessing shared memory, so pool workers can read
+# big feature matrices without each task pickling a copy.
+
+import numpy as np
+from multiprocessing import shared_memory
+
+
+def share(array):
+    """Copy `array` into a new shared memory block -> (shm, descriptor)."""
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    view = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+    view[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def attach(descriptor):
+    """Open a block made by share() in another process -> (shm, array)."""
+    name, shape, dtype = descriptor
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def release(*blocks):
+    for shm in blocks:
+        shm.close()
+        shm.unlink()
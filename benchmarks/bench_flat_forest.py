@@ -0,0 +1,66 @@
+# bench_flat_forest.py
+#
+# sklearn RandomForest predict vs the flat-array traversal of
+# flat_forest.py, for the one-row "predict tomorrow" case and small
+# batches, on synthetic data shaped like the daily feature matrix.
+#
+#   python benchmarks/bench_flat_forest.py --trees 200 --features 26
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Weather forecast"))
+from flat_forest import FlatForest  # noqa: E402
+
+
+def median_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return 1000 * float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="sklearn vs flat-array forest inference.")
+    parser.add_argument("--rows", type=int, default=3000)
+    parser.add_argument("--features", type=int, default=26)
+    parser.add_argument("--trees", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(args.rows, args.features)).astype(np.float32)
+    y = 2 * X[:, 0] + X[:, 1] * X[:, 2] + rng.normal(size=args.rows)
+    X_new = rng.normal(size=(256, args.features)).astype(np.float32)
+
+    params = dict(n_estimators=args.trees, random_state=42, n_jobs=-1)
+    models = {
+        "regressor": RandomForestRegressor(**params).fit(X, y),
+        "classifier": RandomForestClassifier(**params).fit(X, (y > 0).astype(int)),
+    }
+    for kind, model in models.items():
+        t0 = time.perf_counter()
+        flat = FlatForest.from_model(model)
+        export_ms = 1000 * (time.perf_counter() - t0)
+        if kind == "classifier":
+            sk, fl = model.predict_proba, flat.predict_proba
+        else:
+            sk, fl = model.predict, flat.predict
+        err = np.abs(sk(X_new) - fl(X_new)).max()
+        print(f"{kind}: {len(flat.feature)} nodes, depth {flat.depth}, "
+              f"export {export_ms:.0f} ms, max |sklearn - flat| = {err:.1e}")
+        for n in (1, 24, 256):
+            t_sk = median_ms(lambda: sk(X_new[:n]), args.repeat)
+            t_fl = median_ms(lambda: fl(X_new[:n]), args.repeat)
+            print(f"  {n:4d} rows: sklearn {t_sk:7.2f} ms | flat {t_fl:7.2f} ms | {t_sk / t_fl:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# bench_hourly_inference.py
+#
+# Per-hour loop vs batched 24-hour inference for the four precipitation
+# models of Amsterdam_precipitation_hourly.py, on synthetic hourly data.
+#
+#   python benchmarks/bench_hourly_inference.py --trees 200 --repeat 5
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from fixtures import synthetic_weather  # noqa: E402  (also puts "Weather forecast" on sys.path)
+from features import build_features, calendar_block, horizon_block  # noqa: E402
+from pipelines import HOURLY_PRECIPITATION  # noqa: E402
+
+SPEC = HOURLY_PRECIPITATION.spec
+
+
+def synthetic_hourly(hours, seed=0):
+    return synthetic_weather(HOURLY_PRECIPITATION, hours, seed, start="2024-01-01")
+
+
+def fit_models(fm, trees):
+    X, y = fm.X, fm.targets
+    params = dict(n_estimators=trees, random_state=42, n_jobs=-1)
+    rainy = y["precip"] > 0.05
+    clf = RandomForestClassifier(**params).fit(X, y["rain_flag"])
+    reg_rain = RandomForestRegressor(**params).fit(X[rainy], y["precip"][rainy])
+    reg_wind = RandomForestRegressor(**params).fit(X, y["wind"])
+    reg_cloud = RandomForestRegressor(**params).fit(X, y["cloud"])
+    return clf, reg_rain, reg_wind, reg_cloud
+
+
+def forecast_loop(models, x_last, hours):
+    clf, reg_rain, reg_wind, reg_cloud = models
+    rows = []
+    for hour in hours:
+        x = x_last[None, :].copy()
+        x[:, -len(SPEC.calendar):] = calendar_block(SPEC, [hour])
+        prob = clf.predict_proba(x)[0, 1] * 100
+        rows.append((prob,
+                     reg_rain.predict(x)[0] * prob / 100,
+                     reg_wind.predict(x)[0],
+                     np.clip(reg_cloud.predict(x)[0], 0, 100)))
+    return np.array(rows)
+
+
+def forecast_batched(models, x_last, hours):
+    clf, reg_rain, reg_wind, reg_cloud = models
+    X = horizon_block(x_last, SPEC, hours)
+    prob = clf.predict_proba(X)[:, 1] * 100
+    return np.column_stack([prob,
+                            reg_rain.predict(X) * prob / 100,
+                            reg_wind.predict(X),
+                            np.clip(reg_cloud.predict(X), 0, 100)])
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return min(times), out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-hour loop vs batched horizon inference.")
+    parser.add_argument("--hours", type=int, default=2 * 365 * 24)
+    parser.add_argument("--trees", type=int, default=200)
+    parser.add_argument("--horizon", type=int, default=24)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    fm = build_features(synthetic_hourly(args.hours), SPEC,
+                        targets=["rain_flag", "precip", "wind", "cloud"])
+    print(f"Fitting 4 forests x {args.trees} trees on {len(fm)} rows ...")
+    models = fit_models(fm, args.trees)
+    hours = pd.date_range(fm.index[-1] + pd.Timedelta(hours=1), periods=args.horizon, freq="h")
+
+    t_loop, loop = best_of(lambda: forecast_loop(models, fm.X[-1], hours), args.repeat)
+    t_batch, batch = best_of(lambda: forecast_batched(models, fm.X[-1], hours), args.repeat)
+
+    print(f"loop    : {t_loop * 1000:8.1f} ms  ({4 * args.horizon} predict calls)")
+    print(f"batched : {t_batch * 1000:8.1f} ms  (4 predict calls)")
+    print(f"speedup : {t_loop / t_batch:8.1f}x")
+    print(f"max |loop - batched| = {np.abs(loop - batch).max():.2e}")
+
+
+if __name__ == "__main__":
+    main()
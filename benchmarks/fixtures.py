@@ -0,0 +1,92 @@
+# fixtures.py
+#
+# Deterministic synthetic data for the benchmarks: weather frames shaped
+# like the Open-Meteo archive responses of each forecast pipeline, and
+# chunked raster stacks shaped like MOD13A2 NDVI and MCD64A1 burn dates.
+# The same arguments always give the same data.
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+for folder in ("Weather forecast", "code"):
+    if str(ROOT / folder) not in sys.path:
+        sys.path.insert(0, str(ROOT / folder))
+
+
+def _variable(name, t, rng):
+    """One Open-Meteo variable with a plausible seasonal/diurnal shape."""
+    n = len(t)
+    day = 2 * np.pi * t.dayofyear.to_numpy() / 365.25
+    hour = 2 * np.pi * t.hour.to_numpy() / 24
+    season = np.sin(day - 1.9)
+    if name.startswith("temperature"):
+        offset = {"_max": 4.0, "_min": -4.0}.get(name[-4:], 0.0)
+        return 10 + offset + 8 * season + 3 * np.sin(hour - 2) + rng.normal(0, 1.5, n)
+    if name.startswith(("precipitation", "rain")):
+        scale = 4.0 if name.endswith("_sum") else 1.0
+        return (np.maximum(rng.normal(-0.6, 1.0, n), 0) * scale).round(1)
+    if name.startswith("cloud"):
+        return np.clip(65 + 30 * rng.normal(size=n), 0, 100)
+    if name.startswith("relative_humidity"):
+        return np.clip(80 - 8 * season + 10 * rng.normal(size=n), 20, 100)
+    if name.startswith("wind"):
+        return np.abs(12 + 5 * rng.normal(size=n))
+    return rng.normal(size=n)
+
+
+def synthetic_weather(pipeline, periods, seed=0, start="2015-01-01"):
+    """
+    `periods` days or hours (per pipeline.frequency) of every variable the
+    pipeline downloads, renamed and derived like pipeline.load() does.
+    """
+    from hourly_ingest import TIMEZONE
+
+    rng = np.random.default_rng(seed)
+    if pipeline.frequency == "daily":
+        t = pd.date_range(start, periods=periods, freq="D")
+    else:   # local time, as hourly_ingest returns it
+        t = pd.date_range(start, periods=periods, freq="h", tz=TIMEZONE)
+    raw = pd.DataFrame({name: _variable(name, t, rng) for name in pipeline.variables}, index=t)
+    return pipeline.frame(raw)
+
+
+def synthetic_stack(kind, years=10, size=(512, 1024), chunks=None, seed=0):
+    """
+    Global lon/lat stack as an xarray Dataset, dask-chunked like
+    local_backend.LocalBackend opens assets:
+
+      "ndvi"  MOD13A2: 16-day composites of NDVI with a seasonal cycle
+              and ~10% masked (NaN) pixels
+      "burn"  MCD64A1: monthly BurnDate, day of year of a burn, 0 when
+              unburned, NaN when unmapped
+    """
+    import xarray as xr
+    from local_backend import DEFAULT_CHUNKS
+
+    rng = np.random.default_rng(seed)
+    rows, cols = size
+    y = 90 - (np.arange(rows) + 0.5) * 180 / rows
+    x = -180 + (np.arange(cols) + 0.5) * 360 / cols
+    if kind == "ndvi":
+        t = pd.DatetimeIndex([d for year in range(2001, 2001 + years)
+                              for d in pd.date_range(f"{year}-01-01", periods=23, freq="16D")])
+        cycle = np.sin(2 * np.pi * t.dayofyear.to_numpy() / 365.25 - 1.9)[:, None, None]
+        base = 2000 + 4000 * np.cos(np.radians(y))[None, :, None]
+        data = (base + 1500 * cycle + rng.normal(0, 300, (len(t), rows, cols))).astype(np.float32)
+        data[rng.random(data.shape) < 0.1] = np.nan
+        ds = xr.Dataset({"NDVI": (("time", "y", "x"), data)})
+    elif kind == "burn":
+        t = pd.date_range("2015-01-01", periods=12 * years, freq="MS")
+        burned = rng.random((len(t), rows, cols)) < 0.01
+        doy = t.dayofyear.to_numpy()[:, None, None] + rng.integers(0, 28, burned.shape)
+        data = np.where(burned, doy, 0).astype(np.float32)
+        data[rng.random(data.shape) < 0.05] = np.nan
+        ds = xr.Dataset({"BurnDate": (("time", "y", "x"), data)})
+    else:
+        raise ValueError(f"Unknown stack kind {kind!r}")
+    ds = ds.assign_coords(time=t, y=y, x=x)
+    return ds.chunk(chunks or DEFAULT_CHUNKS)
@@ -0,0 +1,390 @@
+# suite.py
+#
+# Timings of the forecast and map pipeline stages on synthetic data
+# (fixtures.py), kept as a JSON history so changes can be compared.
+#
+#   python benchmarks/suite.py list
+#   python benchmarks/suite.py run                      # everything, appended to the history
+#   python benchmarks/suite.py run -k forecast --quick  # a subset, on smaller fixtures
+#   python benchmarks/suite.py compare                  # last run vs the one before
+#   python benchmarks/suite.py compare 3 7 --threshold 0.2
+#
+# Each benchmark prepares its inputs untimed, then times one call of the
+# stage `repeat` times; min and median are recorded in ECO_BENCH_HISTORY
+# (by default ~/.cache/eco-climate/bench_history.json). compare flags every
+# benchmark whose median got slower by more than the threshold (default
+# 10%) and exits with status 1 if there is any, so it can gate CI.
+# Models are fitted with n_jobs=1 so timings do not depend on core count.
+
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from fixtures import ROOT, synthetic_stack, synthetic_weather  # noqa: E402
+
+HISTORY = Path(os.environ.get(
+    "ECO_BENCH_HISTORY", Path.home() / ".cache" / "eco-climate" / "bench_history.json"
+))
+
+BENCHMARKS = {}
+_SCRATCH = []   # the directory of the running benchmark, removed after it
+
+
+def _scratch():
+    """A new empty directory, removed when the benchmark finishes."""
+    return tempfile.mkdtemp(dir=_SCRATCH[-1])
+
+
+def benchmark(name, repeat=5):
+    """Register fn(quick) -> callable to time, as benchmark `name`."""
+    def register(fn):
+        BENCHMARKS[name] = (fn, repeat)
+        return fn
+    return register
+
+
+# -------------------------------------------
+# Forecast pipelines
+# -------------------------------------------
+def _frame(pipeline_name, quick):
+    from pipelines import PIPELINES
+
+    pipeline = PIPELINES[pipeline_name]
+    periods = {"daily": 3 * 365 if quick else 10 * 365,
+               "hourly": 90 * 24 if quick else 2 * 365 * 24}[pipeline.frequency]
+    return pipeline, synthetic_weather(pipeline, periods)
+
+
+def _fitted(pipeline_name, quick, trees=None):
+    from sklearn.ensemble import RandomForestRegressor
+
+    pipeline, df = _frame(pipeline_name, quick)
+    fm = pipeline.features(df)
+    trees = trees or (20 if quick else 100)
+    target = pipeline.targets[0]
+    model = RandomForestRegressor(n_estimators=trees, random_state=42, n_jobs=1)
+    return pipeline, df, fm, model.fit(fm.X, fm.targets[target]), target
+
+
+for _name in ("daily_temp", "hourly_temp", "daily_precip", "hourly_precip"):
+    def _features(quick, _name=_name):
+        pipeline, df = _frame(_name, quick)
+        return lambda: pipeline.features(df)
+    benchmark(f"features.{_name}")(_features)
+
+
+@benchmark("fit.daily_temp", repeat=3)
+def _fit_daily(quick):
+    from sklearn.ensemble import RandomForestRegressor
+
+    pipeline, df = _frame("daily_temp", quick)
+    fm = pipeline.features(df)
+    trees = 20 if quick else 100
+    return lambda: RandomForestRegressor(n_estimators=trees, random_state=42, n_jobs=1).fit(
+        fm.X, fm.targets["temp_max"])
+
+
+@benchmark("fit.hourly_precip", repeat=3)
+def _fit_hourly(quick):
+    from sklearn.ensemble import RandomForestClassifier
+
+    pipeline, df = _frame("hourly_precip", quick)
+    fm = pipeline.features(df)
+    trees = 20 if quick else 100
+    return lambda: RandomForestClassifier(n_estimators=trees, random_state=42, n_jobs=1).fit(
+        fm.X, fm.targets["rain_flag"])
+
+
+@benchmark("fit.hourly_precip_4_targets_hgb", repeat=3)
+def _fit_hgb(quick):
+    from learners import learner
+
+    pipeline, df = _frame("hourly_precip", quick)
+    fm = pipeline.features(df)
+    learn = learner("hgb")
+    params = learn.params(pipeline)
+    y, rainy = fm.targets, fm.targets["precip"] > 0.05
+
+    def fit():
+        X = learn.matrix(fm.X)   # binned once for the four models
+        learn.classifier(**params).fit(X, y["rain_flag"])
+        learn.regressor(**params).fit(X[rainy], y["precip"][rainy])
+        learn.regressor(**params).fit(X, y["wind"])
+        learn.regressor(**params).fit(X, y["cloud"])
+    return fit
+
+
+@benchmark("forecast.hourly_temp_24_recursive")
+def _recursive(quick):
+    from flat_forest import FlatForest
+    from recursive import RecursiveForecaster
+
+    pipeline, df, _, model, target = _fitted("hourly_temp", quick)
+    flat = FlatForest.from_model(model)
+    history = df.dropna()
+    return lambda: RecursiveForecaster(flat, pipeline.spec, target, history).forecast(24)
+
+
+@benchmark("forecast.hourly_precip_24_batched")
+def _batched(quick):
+    from features import horizon_block
+    from flat_forest import FlatForest
+
+    import pandas as pd
+
+    pipeline, _, fm, model, _ = _fitted("hourly_precip", quick)
+    flat = FlatForest.from_model(model)
+    hours = pd.date_range(fm.index[-1] + pd.Timedelta(hours=1), periods=24, freq="h")
+    return lambda: flat.predict(horizon_block(fm.X[-1], pipeline.spec, hours))
+
+
+@benchmark("forecast.hourly_precip_24_loop")
+def _loop(quick):
+    from bench_hourly_inference import forecast_loop
+    from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+    import pandas as pd
+
+    _, _, fm, _, _ = _fitted("hourly_precip", quick, trees=1)
+    params = dict(n_estimators=20 if quick else 100, random_state=42, n_jobs=1)
+    y, rainy = fm.targets, fm.targets["precip"] > 0.05
+    models = (RandomForestClassifier(**params).fit(fm.X, y["rain_flag"]),
+              RandomForestRegressor(**params).fit(fm.X[rainy], y["precip"][rainy]),
+              RandomForestRegressor(**params).fit(fm.X, y["wind"]),
+              RandomForestRegressor(**params).fit(fm.X, y["cloud"]))
+    hours = pd.date_range(fm.index[-1] + pd.Timedelta(hours=1), periods=24, freq="h")
+    return lambda: forecast_loop(models, fm.X[-1], hours)
+
+
+@benchmark("forecast.flat_forest_1row", repeat=50)
+def _flat_one_row(quick):
+    from flat_forest import FlatForest
+
+    _, _, fm, model, _ = _fitted("daily_temp", quick)
+    flat, row = FlatForest.from_model(model), fm.X[-1:]
+    return lambda: flat.predict(row)
+
+
+# -------------------------------------------
+# Map pipelines
+# -------------------------------------------
+def _stack(kind, quick):
+    size = (256, 512) if quick else (720, 1440)
+    return synthetic_stack(kind, years=3 if quick else 10, size=size)
+
+
+@benchmark("reduce.ndvi_mean_cold", repeat=3)
+def _reduce_cold(quick):
+    from temporal import TemporalReducer
+
+    data = _stack("ndvi", quick)["NDVI"]
+    store = _scratch()
+    # A new lineage every call, so nothing is resumed
+    calls = iter(range(10 ** 6))
+    return lambda: TemporalReducer(store).reduce([["bench", next(calls)]], data)
+
+
+@benchmark("reduce.ndvi_mean_resume", repeat=5)
+def _reduce_resume(quick):
+    from temporal import TemporalReducer
+
+    data = _stack("ndvi", quick)["NDVI"]
+    reducer = TemporalReducer(_scratch())
+    reducer.reduce([["bench"]], data)
+    return lambda: reducer.reduce([["bench"]], data).result("mean")
+
+
+@benchmark("reduce.ndvi_monthly_groups", repeat=3)
+def _reduce_groups(quick):
+    from temporal import TemporalReducer
+
+    data = _stack("ndvi", quick)["NDVI"]
+    store = _scratch()
+    calls = iter(range(10 ** 6))
+    return lambda: TemporalReducer(store).reduce([["bench", next(calls)]], data, by="month")
+
+
+@benchmark("reduce.fire_history", repeat=3)
+def _reduce_fire(quick):
+    from fire import FireReducer
+
+    data = _stack("burn", quick)["BurnDate"]
+    store = _scratch()
+    calls = iter(range(10 ** 6))
+    return lambda: FireReducer(store).reduce([["bench", next(calls)]], data)
+
+
+@benchmark("export.tiles_z0-3", repeat=3)
+def _export_tiles(quick):
+    from tiles import WORLD, ArraySource, export
+
+    grid = np.asarray(_stack("ndvi", quick)["NDVI"].isel(time=0).values)
+    source = ArraySource(grid, (-180, -90, 180, 90), {"min": 0, "max": 9000,
+                                                      "palette": ["white", "green"]})
+    # A new directory every call: every tile is encoded and written
+    return lambda: export(source, _scratch(), range(0, 3 if quick else 4),
+                          WORLD, workers=1)
+
+
+@benchmark("export.dashboard_html", repeat=5)
+def _export_dashboard(quick):
+    from dashboard import export
+    from layers import MAPS
+
+    urls = {layer.key(): f"{layer.key()}/{{z}}/{{x}}/{{y}}.png"
+            for spec in MAPS.values() for layer in spec.layers}
+    return lambda: export(None, _scratch(), urls)
+
+
+@benchmark("export.map_html", repeat=3)
+def _export_html(quick):
+    import geemap.foliumap  # noqa: F401  (skipped when geemap is missing)
+    from render_maps import render
+    from layers import MAPS
+
+    urls = {layer.key(): f"{layer.key()}/{{z}}/{{x}}/{{y}}.png"
+            for spec in MAPS.values() for layer in spec.layers}
+    return lambda: render(None, _scratch(), open_browser=False, urls=urls)
+
+
+# -------------------------------------------
+# Running and history
+# -------------------------------------------
+def run(patterns=None, quick=False, repeat=None):
+    """{name: result} of the benchmarks matching any of `patterns`."""
+    import contextlib
+    import io
+
+    results = {}
+    for name, (setup, default_repeat) in BENCHMARKS.items():
+        if patterns and not any(fnmatch.fnmatch(name, f"*{p}*") for p in patterns):
+            continue
+        try:
+            with tempfile.TemporaryDirectory(prefix="eco-bench-") as scratch, \
+                    contextlib.redirect_stdout(io.StringIO()):   # stages print progress
+                _SCRATCH[:] = [scratch]
+                fn = setup(quick)
+                times = []
+                for _ in range(repeat or default_repeat):
+                    t0 = time.perf_counter()
+                    fn()
+                    times.append(time.perf_counter() - t0)
+        except ImportError as exc:
+            print(f"  {name:40s} skipped ({exc})")
+            results[name] = {"skipped": str(exc)}
+            continue
+        results[name] = {"min": min(times), "median": float(np.median(times)),
+                         "repeat": len(times)}
+        print(f"  {name:40s} {1000 * results[name]['median']:10.2f} ms  "
+              f"(min {1000 * min(times):.2f}, n={len(times)})")
+    return results
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path=HISTORY):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def record(results, quick, label=None, path=HISTORY):
+    history = load_history(path)
+    history.append({
+        "id": len(history), "at": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": _commit(),
+        "label": label, "quick": quick, "python": platform.python_version(),
+        "machine": f"{platform.machine()} x{os.cpu_count()}", "results": results,
+    })
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(history, f, indent=1)
+    os.replace(f"{path}.tmp", path)
+    return history[-1]
+
+
+def compare(base, head, threshold=0.10):
+    """Print median changes from run `base` to `head`; returns the regressed names."""
+    print(f"run {base['id']} ({base['commit']}, {base['at']}) -> "
+          f"run {head['id']} ({head['commit']}, {head['at']})")
+    if base["quick"] != head["quick"]:
+        print("⚠️ comparing a --quick run with a full run")
+    regressed = []
+    for name in sorted(set(base["results"]) | set(head["results"])):
+        a, b = base["results"].get(name, {}), head["results"].get(name, {})
+        if "median" not in a or "median" not in b:
+            print(f"  {name:40s} {'(not in both runs)':>32s}")
+            continue
+        change = b["median"] / a["median"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  ⚠️ regression"
+            regressed.append(name)
+        elif change < -threshold:
+            flag = "  ✅ faster"
+        print(f"  {name:40s} {1000 * a['median']:10.2f} -> {1000 * b['median']:10.2f} ms "
+              f"{100 * change:+7.1f}%{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline benchmarks on synthetic data.")
+    parser.add_argument("--history", type=Path, default=HISTORY, help="JSON history file")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="list the benchmarks")
+    run_p = sub.add_parser("run", help="run benchmarks and append the results to the history")
+    run_p.add_argument("-k", dest="patterns", action="append",
+                       help="only benchmarks whose name contains this (repeatable)")
+    run_p.add_argument("--quick", action="store_true", help="smaller fixtures")
+    run_p.add_argument("--repeat", type=int, default=None, help="override the repeat count")
+    run_p.add_argument("--label", default=None, help="note stored with the run")
+    run_p.add_argument("--no-save", action="store_true", help="do not append to the history")
+    cmp_p = sub.add_parser("compare", help="compare two runs of the history")
+    cmp_p.add_argument("base", nargs="?", type=int, default=None, help="run id (default: previous)")
+    cmp_p.add_argument("head", nargs="?", type=int, default=None, help="run id (default: last)")
+    cmp_p.add_argument("--threshold", type=float, default=0.10,
+                       help="relative slowdown of the median that counts as a regression")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for name, (_, repeat) in BENCHMARKS.items():
+            print(f"{name:40s} repeat {repeat}")
+    elif args.command == "run":
+        print(f"⏱️ {'quick' if args.quick else 'full'} benchmarks")
+        results = run(args.patterns, args.quick, args.repeat)
+        if not args.no_save:
+            entry = record(results, args.quick, args.label, args.history)
+            print(f"✅ Saved as run {entry['id']} in {args.history}")
+    else:
+        history = load_history(args.history)
+        if len(history) < 2 and (args.base is None or args.head is None):
+            sys.exit("Need at least two runs in the history to compare")
+        head = history[args.head if args.head is not None else -1]
+        base = history[args.base if args.base is not None else
+                       (head["id"] - 1 if head["id"] > 0 else -2)]
+        regressed = compare(base, head, args.threshold)
+        if regressed:
+            print(f"⚠️ {len(regressed)} regression(s) beyond {args.threshold:.0%}")
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# climate_cli.py
+#
+# One entry point for the forecast and map scripts.
+#
+#   python climate_cli.py forecast daily-temp [--plot | --plot-file out.png]
+#   python climate_cli.py map [fire-watch ...] [--open] [--dashboard DIR]
+#   python climate_cli.py backtest|fleet|learners|serve|build|bench [args ...]
+#   python climate_cli.py bench-import [--budget 0.25]
+#
+# This module only imports the standard library it needs to parse the
+# command line; pandas, sklearn, matplotlib, ee and geemap are imported by
+# the script a subcommand runs. Plotting is off and maps are not opened in
+# a browser unless asked for. ECO_TRACE=<file>.json traces the stages of
+# the script a subcommand runs (see tracing.py).
+
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+WEATHER_DIR = os.path.join(ROOT, "Weather forecast")
+MAPS_DIR = os.path.join(ROOT, "code")
+BENCH_DIR = os.path.join(ROOT, "benchmarks")
+
+FORECASTS = {
+    "daily-temp": "Amsterdam_forecast_daily.py",
+    "hourly-temp": "Amsterdam_forecast_hourly.py",
+    "daily-precip": "Amsterdam_precipitation_daily.py",
+    "hourly-precip": "Amsterdam_precipitation_hourly.py",
+}
+
+MAPS_SCRIPT = "render_maps.py"   # layers and maps are defined in code/layers.py
+
+# Subcommands that hand their remaining arguments to a tool's own argparse
+TOOLS = {
+    "backtest": (WEATHER_DIR, "backtest.py"),
+    "fleet": (WEATHER_DIR, "fleet.py"),
+    "learners": (WEATHER_DIR, "learners.py"),
+    "serve": (WEATHER_DIR, "service.py"),
+    "build": (MAPS_DIR, "build.py"),
+    "bench": (BENCH_DIR, "suite.py"),
+}
+
+
+def run_script(directory, filename, argv=()):
+    """Run a script as __main__, as if started from its own directory."""
+    import runpy
+
+    path = os.path.join(directory, filename)
+    sys.path.insert(0, directory)
+    sys.argv = [path, *argv]
+    if os.environ.get("ECO_TRACE", "") in ("", "0"):
+        runpy.run_path(path, run_name="__main__")
+        return
+    import tracing   # only when asked for (see tracing.py)
+
+    tracing.enable_from_env()
+    with tracing.span("script", file=filename):
+        runpy.run_path(path, run_name="__main__")
+
+
+def bench_import(budget, repeat):
+    """
+    Time cold starts of `climate_cli.py --help` in fresh interpreters.
+    Returns the exit status: 1 when the best run exceeds the budget or a
+    heavy library is imported at startup.
+    """
+    import subprocess
+    import time
+
+    command = [sys.executable, "-X", "importtime", os.path.abspath(__file__), "--help"]
+    best, stderr = float("inf"), ""
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        done = subprocess.run(command, capture_output=True, text=True)
+        elapsed = time.perf_counter() - t0
+        if elapsed < best:
+            best, stderr = elapsed, done.stderr
+
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    imports = []
+    for line in stderr.splitlines()[1:]:
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            imports.append((int(parts[1]), parts[2].rstrip()))
+    print("Slowest imports (cumulative):")
+    for us, name in sorted(imports, reverse=True)[:10]:
+        print(f"  {us / 1000:8.1f} ms  {name.strip()}")
+    print(f"\nCold start: {best * 1000:.0f} ms (best of {repeat}), budget {budget * 1000:.0f} ms")
+
+    heavy = sorted({name.strip() for _, name in imports}
+                   & {"pandas", "numpy", "sklearn", "matplotlib", "ee", "geemap"})
+    if heavy:
+        print(f"❌ Heavy modules imported at startup: {', '.join(heavy)}")
+        return 1
+    if best > budget:
+        print("❌ Cold start is over budget")
+        return 1
+    print("✅ Within budget")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="climate_cli.py",
+                                     description="Eco-Climate forecasts and maps.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    forecast = sub.add_parser("forecast", help="run an Amsterdam forecast")
+    forecast.add_argument("name", choices=sorted(FORECASTS))
+    plot = forecast.add_mutually_exclusive_group()
+    plot.add_argument("--plot", action="store_true", help="show the plot in a window")
+    plot.add_argument("--plot-file", help="save the plot (.png, .svg or .pdf)")
+
+    maps = sub.add_parser("map", help="build Earth Engine maps as HTML")
+    maps.add_argument("names", nargs="*", help="maps to build (default: all)")
+    maps.add_argument("--open", action="store_true", help="open the maps in a browser")
+    maps.add_argument("--dashboard", metavar="DIR",
+                      help="write one dashboard with all the maps to DIR instead")
+
+    for name, (_, filename) in TOOLS.items():
+        sub.add_parser(name, help=f"run {filename} (see its --help)", add_help=False)
+
+    bench = sub.add_parser("bench-import", help="check the CLI's cold-start time")
+    bench.add_argument("--budget", type=float, default=0.25, help="seconds")
+    bench.add_argument("--repeat", type=int, default=5)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in TOOLS:
+        # Everything after the subcommand, --help included, belongs to the tool
+        run_script(*TOOLS[argv[0]], argv[1:])
+        return 0
+    args = build_parser().parse_args(argv)
+
+    if args.command == "forecast":
+        if args.plot_file:
+            os.environ["ECO_PLOT"] = args.plot_file
+        elif args.plot:
+            os.environ["ECO_PLOT"] = "1"
+        run_script(WEATHER_DIR, FORECASTS[args.name])
+    elif args.command == "map":
+        extra = ["--dashboard", "-o", os.path.abspath(args.dashboard)] if args.dashboard else []
+        run_script(MAPS_DIR, MAPS_SCRIPT,
+                   args.names + (["--open"] if args.open else []) + extra)
+    elif args.command == "bench-import":
+        return bench_import(args.budget, args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,340 @@
+# align.py
+#
+# Put rasters of different resolutions on one lon/lat grid before
+# combining them, with the aggregation rule that fits each variable:
+#
+#   "sum"   counts (population): the target cell gets the total of the
+#           source pixels whose centres fall inside it
+#   "mean"  intensities (reflectance, NDVI, temperature): their average
+#
+# A source coarser than the grid is sampled at the cell centres instead,
+# with counts split by area. Each aligned raster is cached under
+# <ECO_ALIGN_DIR>, keyed by its layer, the files it was read from and their
+# modification times, with overviews (every level half the resolution of the
+# one below, aggregated with the same rule from the exact sums and counts),
+# and ratios of aligned rasters, such as solar radiation per capita, are
+# computed once per level and cached the same way. PyramidSource renders
+# tiles from the level that matches the zoom, so no zoom redoes the
+# native-resolution math.
+#
+#   python align.py --data-dir data --resolution 0.05 --zoom 0-6 -o tiles/solar_per_capita
+
+import argparse
+import hashlib
+import json
+import math
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+ALIGN_DIR = Path(os.environ.get(
+    "ECO_ALIGN_DIR", Path.home() / ".cache" / "eco-climate" / "aligned"
+))
+RULES = ("sum", "mean")
+
+
+@dataclass(frozen=True)
+class Grid:
+    """North-up lon/lat grid of square cells of `res` degrees."""
+    west: float
+    south: float
+    east: float
+    north: float
+    res: float
+
+    @property
+    def shape(self):
+        return (max(1, round((self.north - self.south) / self.res)),
+                max(1, round((self.east - self.west) / self.res)))
+
+    @property
+    def bounds(self):
+        rows, cols = self.shape
+        return (self.west, self.north - rows * self.res, self.west + cols * self.res, self.north)
+
+    def coarser(self, factor=2):
+        return Grid(self.west, self.south, self.east, self.north, self.res * factor)
+
+
+def resolution_of(da):
+    return float(abs(da["x"].values[1] - da["x"].values[0]))
+
+
+def grid_of(image, res=None):
+    """Grid covering a local_backend Image, at its own or the given resolution."""
+    da = image.ds[image.bands[0]]
+    return Grid(*(float(b) for b in image.bounds()), res or resolution_of(da))
+
+
+# -------------------------------------------
+# Aggregation
+# -------------------------------------------
+def _north_up(da):
+    if da["y"].size > 1 and da["y"][0] < da["y"][-1]:
+        da = da.isel(y=slice(None, None, -1))
+    return da.transpose("y", "x")
+
+
+def _aggregate(da, grid, row_block=1024):
+    """(sum, count) of the valid source pixels whose centres fall in each cell."""
+    rows, cols = grid.shape
+    da = _north_up(da)
+    col = np.floor((da["x"].values - grid.west) / grid.res).astype(np.intp)
+    col_ok = (col >= 0) & (col < cols)
+    total = np.zeros(rows * cols)
+    count = np.zeros(rows * cols)
+    y = da["y"].values
+    for r0 in range(0, y.size, row_block):
+        r1 = min(r0 + row_block, y.size)
+        row = np.floor((grid.north - y[r0:r1]) / grid.res).astype(np.intp)
+        block = np.asarray(da.isel(y=slice(r0, r1)).values, dtype=np.float64)
+        ok = ((row >= 0) & (row < rows))[:, None] & col_ok[None, :] & ~np.isnan(block)
+        flat = (row[:, None] * cols + col[None, :])[ok]
+        total += np.bincount(flat, weights=block[ok], minlength=rows * cols)
+        count += np.bincount(flat, minlength=rows * cols)
+    return total.reshape(rows, cols), count.reshape(rows, cols)
+
+
+def _sample(da, grid, rule):
+    """(sum, count) from a source coarser than the grid, sampled at cell centres."""
+    rows, cols = grid.shape
+    da = _north_up(da)
+    x, y = da["x"].values, da["y"].values
+    dx, dy = abs(x[1] - x[0]), abs(y[1] - y[0])
+    cx = grid.west + (np.arange(cols) + 0.5) * grid.res
+    cy = grid.north - (np.arange(rows) + 0.5) * grid.res
+    c = np.floor((cx - (x[0] - dx / 2)) / dx).astype(np.intp)
+    r = np.floor(((y[0] + dy / 2) - cy) / dy).astype(np.intp)
+    c_ok, r_ok = (c >= 0) & (c < x.size), (r >= 0) & (r < y.size)
+    values = np.asarray(da.values, dtype=np.float64)[np.clip(r, 0, y.size - 1)]
+    values = values[:, np.clip(c, 0, x.size - 1)]
+    values[~(r_ok[:, None] & c_ok[None, :])] = np.nan
+    if rule == "sum":
+        values = values * (grid.res * grid.res) / (dx * dy)   # this cell's share of the pixel
+    valid = ~np.isnan(values)
+    return np.where(valid, values, 0.0), valid.astype(np.float64)
+
+
+def _halve(array):
+    """2x2 block sums, padding odd edges with zeros."""
+    rows, cols = array.shape
+    padded = np.zeros((rows + rows % 2, cols + cols % 2))
+    padded[:rows, :cols] = array
+    return padded.reshape(padded.shape[0] // 2, 2, padded.shape[1] // 2, 2).sum(axis=(1, 3))
+
+
+def _values(total, count, rule):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = total if rule == "sum" else total / count
+    return np.where(count > 0, out, np.nan).astype(np.float32)
+
+
+# -------------------------------------------
+# Cached pyramids
+# -------------------------------------------
+class Pyramid:
+    """A raster and its overviews: level k has resolution grid.res * 2**k."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path / "meta.json") as f:
+            self.meta = json.load(f)
+        self.grid = Grid(*self.meta["grid"])
+
+    @property
+    def key(self):
+        return self.path.name
+
+    @property
+    def levels(self):
+        return self.meta["levels"]
+
+    def values(self, level=0):
+        return np.load(self.path / f"level{level}.npy", mmap_mode="r")
+
+    def grid_at(self, level):
+        # Odd sizes are padded by _halve, so level k has ceil(rows / 2**k)
+        # rows: take the extent from the stored array, not from the bounds
+        rows, cols = self.values(level).shape
+        res = self.grid.res * 2 ** level
+        west, north = self.grid.west, self.grid.north
+        return Grid(west, north - rows * res, west + cols * res, north, res)
+
+    @staticmethod
+    def _path(store_dir, *parts):
+        text = json.dumps(parts, sort_keys=True, default=str)
+        return Path(store_dir or ALIGN_DIR) / hashlib.sha1(text.encode()).hexdigest()[:16]
+
+    @classmethod
+    def _write(cls, path, grid, levels, **meta):
+        """levels: float32 arrays from level 0 up."""
+        path.mkdir(parents=True, exist_ok=True)
+        for k, values in enumerate(levels):
+            np.save(path / f"level{k}.npy", values)
+        meta.update(grid=[grid.west, grid.south, grid.east, grid.north, grid.res],
+                    levels=len(levels))
+        tmp = path / "meta.json.tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path / "meta.json")   # written last: marks the pyramid complete
+        return cls(path)
+
+
+def aligned(da, grid, rule, source_key, levels=6, store_dir=None):
+    """
+    Pyramid of `da` (a lon/lat DataArray, lazy or not) on `grid`, aggregated
+    with `rule`. source_key identifies the data (e.g. a layers.Expr key and
+    the files it was read from, see source_key()); the result is cached for
+    this source, grid, rule and number of levels.
+    """
+    if rule not in RULES:
+        raise ValueError(f"Unknown rule {rule!r}, expected one of {RULES}")
+    path = Pyramid._path(store_dir, "aligned", source_key, list(grid.bounds), grid.res, rule,
+                         levels)
+    if (path / "meta.json").exists():
+        return Pyramid(path)
+
+    if resolution_of(da) <= grid.res:
+        total, count = _aggregate(da, grid)
+    else:
+        total, count = _sample(da, grid, rule)
+    out = []
+    for _ in range(levels):
+        out.append(_values(total, count, rule))
+        if min(total.shape) <= 1:
+            break
+        total, count = _halve(total), _halve(count)
+    return Pyramid._write(path, grid, out, kind="aligned", source=source_key, rule=rule)
+
+
+def ratio(numerator, denominator, offset=0.0, store_dir=None):
+    """numerator / (denominator + offset), level by level, cached."""
+    if numerator.grid != denominator.grid:
+        raise ValueError("Pyramids are on different grids; align them to one grid first")
+    path = Pyramid._path(store_dir, "ratio", numerator.key, denominator.key, float(offset))
+    if (path / "meta.json").exists():
+        return Pyramid(path)
+    out = []
+    for k in range(min(numerator.levels, denominator.levels)):
+        den = np.asarray(denominator.values(k), dtype=np.float64) + offset
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # Division by zero is masked, as in Earth Engine
+            out.append(np.where(den != 0, numerator.values(k) / den, np.nan).astype(np.float32))
+    return Pyramid._write(path, numerator.grid, out, kind="ratio",
+                          numerator=numerator.key, denominator=denominator.key, offset=offset)
+
+
+class PyramidSource:
+    """Tile source (see tiles.py) reading the overview that matches each zoom."""
+
+    def __init__(self, pyramid, vis):
+        self.pyramid = pyramid
+        self.vis = vis
+        self.sources = {}
+
+    def level_for(self, z):
+        # Degrees per tile pixel at the equator; use the coarsest level that
+        # is still at least as fine
+        pixel = 360.0 / (256 * 2 ** z)
+        level = int(math.floor(math.log2(max(pixel / self.pyramid.grid.res, 1.0))))
+        return min(level, self.pyramid.levels - 1)
+
+    def render(self, z, x, y):
+        from tiles import ArraySource
+
+        level = self.level_for(z)
+        if level not in self.sources:
+            self.sources[level] = ArraySource(self.pyramid.values(level),
+                                              self.pyramid.grid_at(level).bounds, self.vis)
+        return self.sources[level].render(z, x, y)
+
+
+# -------------------------------------------
+# Ratio layers of layers.py
+# -------------------------------------------
+def _ratio_layers():
+    """{layer expr key: (numerator expr, rule, denominator expr, rule, offset)}."""
+    from layers import POPULATION, SOLAR_PER_CAPITA, SOLAR_PROXY
+    return {SOLAR_PER_CAPITA.key(): (SOLAR_PROXY, "mean", POPULATION, "sum", 1.0)}
+
+
+def _assets(expr):
+    """Assets a layers.Expr reads."""
+    from layers import Expr
+
+    if not isinstance(expr, Expr):
+        return set()
+    found = {expr.args[0]} if expr.op in ("ImageCollection", "Image") else set()
+    for part in (expr.on, *expr.args):
+        found |= _assets(part)
+    return found
+
+
+def source_key(expr, backend):
+    """
+    Cache key of an expression's data: its layers key plus, on a backend
+    that can tell (LocalBackend.stamp), the resolved source and modification
+    time of every asset it reads, so another data root or updated files get
+    new pyramids.
+    """
+    stamp = getattr(backend, "stamp", None)
+    if stamp is None:
+        return expr.key()
+    return [expr.key(), sorted([asset, *stamp(asset)] for asset in _assets(expr))]
+
+
+def ratio_source(layer, backend, memo=None, res=None, levels=8):
+    """
+    (PyramidSource, bounds) for a ratio layer of layers.py computed on one
+    aligned grid (by default the coarser input's resolution), or None for
+    other layers.
+    """
+    from layers import evaluate
+
+    spec = _ratio_layers().get(layer.expr.key())
+    if spec is None:
+        return None
+    num_expr, num_rule, den_expr, den_rule, offset = spec
+    num, den = evaluate(num_expr, backend, memo), evaluate(den_expr, backend, memo)
+    num_grid, den_grid = grid_of(num), grid_of(den)
+    # Common extent: where both inputs have data
+    west, south = max(num_grid.west, den_grid.west), max(num_grid.south, den_grid.south)
+    east, north = min(num_grid.east, den_grid.east), min(num_grid.north, den_grid.north)
+    grid = Grid(west, south, east, north, res or max(num_grid.res, den_grid.res))
+    pyramid = ratio(
+        aligned(num.ds[num.bands[0]], grid, num_rule, source_key(num_expr, backend), levels),
+        aligned(den.ds[den.bands[0]], grid, den_rule, source_key(den_expr, backend), levels),
+        offset)
+    return PyramidSource(pyramid, layer.vis), grid.bounds
+
+
+def main():
+    from layers import MAPS, SOLAR_PER_CAPITA
+    from local_backend import LocalBackend
+    from temporal import TemporalReducer
+    from tiles import WORLD, _zoom_range, export
+
+    parser = argparse.ArgumentParser(description="Solar radiation per capita on one aligned grid.")
+    parser.add_argument("--data-dir", default=None)
+    parser.add_argument("--resolution", type=float, default=None,
+                        help="degrees (default: the coarser input's)")
+    parser.add_argument("--levels", type=int, default=8, help="overview levels")
+    parser.add_argument("--zoom", type=_zoom_range, default=range(0, 7), help="e.g. 0-6")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("-o", "--out", required=True, help="tile directory or .mbtiles file")
+    args = parser.parse_args()
+
+    layer = next(l for l in MAPS["solar-atlas"].layers if l.expr == SOLAR_PER_CAPITA)
+    backend = LocalBackend(args.data_dir, reducer=TemporalReducer())
+    source, bounds = ratio_source(layer, backend, {}, args.resolution, args.levels)
+    bounds = (max(bounds[0], WORLD[0]), max(bounds[1], WORLD[1]),
+              min(bounds[2], WORLD[2]), min(bounds[3], WORLD[3]))
+    counts = export(source, args.out, args.zoom, bounds, workers=args.workers, name=layer.name,
+                    processes=True)
+    print(f"🧱 {layer.name}: {dict(counts)} (overviews in {source.pyramid.path})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+# build.py
+#
+# Rebuild only the maps whose inputs changed.
+#
+#   python build.py -o site             # stale maps only, 4 at a time
+#   python build.py -o site --jobs 8 fire-watch
+#   python build.py -o site --force     # everything
+#   python build.py -o site --offline   # fingerprints without asking Earth Engine
+#   python build.py -o site --url-max-age 6
+#
+# Every map gets a fingerprint: a hash of its layer expressions and vis
+# params (layers.py, so dataset IDs and date ranges are included), the
+# update time of every Earth Engine asset it reads, and the HTML renderer
+# (render_maps.py). A map whose fingerprint matches build-manifest.json in
+# the output directory and whose HTML exists is skipped, unless the Earth
+# Engine tile URLs baked into its HTML are older than --url-max-age hours
+# (they expire, and an up-to-date page would stop showing tiles). With
+# --offline the asset update times recorded at the last build are reused,
+# so only layer and renderer changes count. The stale maps share one Earth
+# Engine session and their tile URLs are fetched together; the HTML is
+# then written by at most --jobs workers. The manifest records each map's
+# fingerprint, asset update times, URL fetch time and timings, so a
+# rebuild with nothing to do only costs the asset lookups.
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from layers import MAPS, Expr
+
+MANIFEST = "build-manifest.json"
+URL_MAX_AGE = float(os.environ.get("ECO_TILE_URL_MAX_AGE", 12))   # hours
+CONSTRUCTORS = ("ImageCollection", "Image", "FeatureCollection")
+
+
+def assets_of(expr, found=None):
+    """Asset IDs an expression reads, in first-use order."""
+    found = [] if found is None else found
+    if not isinstance(expr, Expr):
+        return found
+    if expr.on is None and expr.op in CONSTRUCTORS and expr.args[0] not in found:
+        found.append(expr.args[0])
+    for arg in expr.args:
+        assets_of(arg, found)
+    if expr.on is not None:
+        assets_of(expr.on, found)
+    return found
+
+
+def map_assets(name):
+    found = []
+    for layer in MAPS[name].layers:
+        assets_of(layer.expr, found)
+    return found
+
+
+def asset_versions(assets, workers=8):
+    """{asset: update time} from Earth Engine, looked up in parallel."""
+    from render_maps import initialize
+
+    ee = initialize()
+
+    def lookup(asset):
+        try:
+            return asset, ee.data.getAsset(asset).get("updateTime")
+        except ee.EEException:
+            return asset, None   # public catalog entries without metadata
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(pool.map(lookup, assets))
+
+
+def _renderer_hash():
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "render_maps.py"), "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def fingerprint(name, versions, renderer):
+    spec = MAPS[name]
+    data = {
+        "file": spec.file, "center": list(spec.center), "zoom": spec.zoom,
+        "layers": [[layer.name, layer.key()] for layer in spec.layers],
+        "assets": {asset: versions.get(asset) for asset in map_assets(name)},
+        "renderer": renderer,
+    }
+    text = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"maps": {}}
+
+
+def _save_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def _urls_expired(entry, max_age):
+    fetched = entry.get("urls_fetched")
+    return fetched is None or time.time() - fetched > max_age * 3600
+
+
+def build(names=None, out_dir=".", jobs=4, offline=False, force=False, url_max_age=URL_MAX_AGE):
+    """Rebuild the stale maps among `names`; returns the names that failed."""
+    from render_maps import render, tile_urls
+
+    t0 = time.perf_counter()
+    names = list(names or MAPS)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = load_manifest(out_dir)
+
+    if offline:
+        # The update times seen by the last build, so fingerprints still match
+        versions = {name: manifest["maps"].get(name, {}).get("assets", {}) for name in names}
+    else:
+        assets = sorted({asset for name in names for asset in map_assets(name)})
+        found = asset_versions(assets, max(jobs, 8))
+        versions = {name: {a: found.get(a) for a in map_assets(name)} for name in names}
+    renderer = _renderer_hash()
+    prints = {name: fingerprint(name, versions[name], renderer) for name in names}
+    stale = [name for name in names
+             if force or manifest["maps"].get(name, {}).get("fingerprint") != prints[name]
+             or _urls_expired(manifest["maps"].get(name, {}), url_max_age)
+             or not os.path.exists(os.path.join(out_dir, MAPS[name].file))]
+    print(f"🔎 {len(names) - len(stale)} of {len(names)} maps up to date"
+          f"{'' if not stale else ', rebuilding ' + ', '.join(stale)}")
+
+    failed, urls_seconds = [], 0.0
+    if stale:
+        t_urls = time.perf_counter()
+        urls_fetched = time.time()
+        urls = tile_urls([layer for name in stale for layer in MAPS[name].layers], workers=jobs)
+        urls_seconds = time.perf_counter() - t_urls
+
+        def run(name):
+            t = time.perf_counter()
+            render([name], out_dir, open_browser=False, urls=urls)
+            return time.perf_counter() - t
+
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = {pool.submit(run, name): name for name in stale}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    seconds = future.result()
+                except Exception as exc:  # one broken map should not stop the others
+                    print(f"⚠️ {name}: {exc}")
+                    failed.append(name)
+                    continue
+                manifest["maps"][name] = {
+                    "fingerprint": prints[name], "file": MAPS[name].file,
+                    "assets": versions[name], "urls_fetched": urls_fetched,
+                    "built": time.strftime("%Y-%m-%dT%H:%M:%S"), "seconds": round(seconds, 3),
+                }
+
+    manifest["last_build"] = {
+        "at": time.strftime("%Y-%m-%dT%H:%M:%S"), "seconds": round(time.perf_counter() - t0, 3),
+        "tile_urls_seconds": round(urls_seconds, 3), "jobs": jobs,
+        "built": sorted(set(stale) - set(failed)), "failed": sorted(failed),
+        "skipped": sorted(set(names) - set(stale)),
+    }
+    _save_manifest(out_dir, manifest)
+    print(f"✅ Build finished in {manifest['last_build']['seconds']:.1f} s "
+          f"({len(stale) - len(failed)} built, {len(names) - len(stale)} skipped, "
+          f"{len(failed)} failed)")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the maps whose inputs changed.")
+    parser.add_argument("maps", nargs="*", metavar="MAP",
+                        help=f"maps to consider (default: all of {', '.join(MAPS)})")
+    parser.add_argument("-o", "--out-dir", default=".")
+    parser.add_argument("--jobs", type=int, default=4, help="maps built at the same time")
+    parser.add_argument("--force", action="store_true", help="rebuild even if up to date")
+    parser.add_argument("--offline", action="store_true",
+                        help="reuse the asset update times of the last build (layer changes only)")
+    parser.add_argument("--url-max-age", type=float, default=URL_MAX_AGE,
+                        help="hours after which a map's Earth Engine tile URLs are refetched")
+    args = parser.parse_args()
+    unknown = set(args.maps) - set(MAPS)
+    if unknown:
+        parser.error(f"unknown maps: {', '.join(sorted(unknown))}")
+    failed = build(args.maps, args.out_dir, max(1, args.jobs), args.offline, args.force,
+                   args.url_max_age)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# climatology.py
+#
+# Baseline statistics computed once and kept, for anomaly and z-score
+# layers on local data (see local_backend.py).
+#
+#   python climatology.py ndvi --baseline 2001-01-01:2010-12-31 \
+#       --recent 2021-01-01:2024-12-31 --zscore --monthly --data-dir data -o ndvi_z.npy
+#
+# A baseline is the per-pixel mean, standard deviation and count of one
+# band over a fixed period, optionally per calendar month, at the native or
+# a coarser resolution. It is reduced in one streaming pass (temporal.py,
+# all months at once), stored as float32 in <ECO_CLIMATOLOGY_DIR>/<asset>/
+# <band>/ and listed in index.json, and never recomputed for the same
+# source: the key includes the collection's lineage (with the resolved data
+# root), its grid and its time steps (temporal.steps_hash). An anomaly or
+# z-score of any recent window is then a lazy diff of that window against
+# the stored arrays.
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import xarray as xr
+
+from local_backend import Image, LocalBackend, pixel_size
+from temporal import TemporalReducer, steps_hash
+
+CLIMATOLOGY_DIR = Path(os.environ.get(
+    "ECO_CLIMATOLOGY_DIR", Path.home() / ".cache" / "eco-climate" / "climatology"
+))
+
+# Short names for the datasets our anomaly layers use
+DATASETS = {
+    "ndvi": ("MODIS/061/MOD13A2", "NDVI"),
+    "lst": ("MODIS/061/MOD11A2", "LST_Day_1km"),
+    "et": ("MODIS/061/MOD16A2GF", "ET"),
+    "precipitation": ("UCSB-CHG/CHIRPS/DAILY", "precipitation"),
+}
+
+
+def _resolution(da):
+    return pixel_size(da, "x")
+
+
+def _coarsen(da, resolution):
+    """Block-average to `resolution` (in coordinate units), if coarser than native."""
+    if resolution is None:
+        return da
+    factor = int(round(resolution / _resolution(da)))
+    if factor <= 1:
+        return da
+    return da.coarsen(y=factor, x=factor, boundary="trim").mean()
+
+
+class ClimatologyStore:
+    def __init__(self, store_dir=None):
+        self.store_dir = Path(store_dir or CLIMATOLOGY_DIR)
+        try:
+            with open(self.store_dir / "index.json") as f:
+                self.index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.index = {}
+
+    @staticmethod
+    def key(asset, band, start, end, resolution, monthly, source=None):
+        res = "native" if resolution is None else f"{resolution:g}"
+        key = f"{asset}/{band}/{start}_{end}_{res}{'_monthly' if monthly else ''}"
+        return key if source is None else f"{key}_{source}"
+
+    @staticmethod
+    def source(collection, da):
+        """Digest of where a baseline's data comes from: lineage, grid and time steps."""
+        grid = [list(da.shape[1:]), float(da["y"][0]), float(da["y"][-1]),
+                float(da["x"][0]), float(da["x"][-1])]
+        text = json.dumps({"lineage": collection.lineage, "grid": grid, "steps": steps_hash(da)},
+                          sort_keys=True, default=str)
+        return hashlib.sha1(text.encode()).hexdigest()[:12]
+
+    def baseline(self, backend, asset, band, start, end, resolution=None, monthly=False):
+        """
+        Dataset with mean, std and count (dims [month,] y, x) of `band` over
+        [start, end), computed on first use and loaded afterwards.
+        """
+        collection = backend.ImageCollection(asset).select(band).filterDate(start, end)
+        da = _coarsen(collection.ds[band], resolution)
+        key = self.key(asset, band, start, end, resolution, monthly, self.source(collection, da))
+        path = self.store_dir / f"{key}.nc"
+        if key in self.index and path.exists():
+            return xr.load_dataset(path)
+
+        # The baseline is only needed in its compact form: reduce into a
+        # scratch store (all 12 months in the same pass) and keep float32
+        with tempfile.TemporaryDirectory() as scratch:
+            reduction = TemporalReducer(scratch).reduce(
+                collection.lineage + [["resolution", resolution]], da,
+                by="month" if monthly else None)
+            stats = {s: reduction.result(s).astype(np.float32) for s in ("mean", "std", "count")}
+            groups = reduction.groups
+        coords = {"y": da["y"].values, "x": da["x"].values}
+        dims = ("y", "x")
+        if monthly:
+            # Months with no data in the period are kept, with count 0
+            dims, coords["month"] = ("month", "y", "x"), [int(g) for g in groups]
+        data = {stat: (dims, values) for stat, values in stats.items()}
+        ds = xr.Dataset(data, coords=coords)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        ds.to_netcdf(tmp)
+        os.replace(tmp, path)
+        self.index[key] = {"asset": asset, "band": band, "start": start, "end": end,
+                           "resolution": _resolution(da), "monthly": monthly,
+                           "file": str(path.relative_to(self.store_dir))}
+        tmp = self.store_dir / "index.json.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.index, f, indent=1)
+        os.replace(tmp, self.store_dir / "index.json")
+        return ds
+
+    def anomaly(self, backend, asset, band, recent, baseline, zscore=False,
+                resolution=None, monthly=False):
+        """
+        Mean of the recent window minus the baseline mean (divided by the
+        baseline std for a z-score). With monthly=True every time step is
+        compared with its own calendar month first, so seasonal sampling
+        differences between the windows cancel out.
+        """
+        base = self.baseline(backend, asset, band, *baseline, resolution, monthly)
+        window = backend.ImageCollection(asset).select(band).filterDate(*recent)
+        da = _coarsen(window.ds[band], resolution)
+        if monthly:
+            # Per time step against its month, then averaged over the window
+            month = da["time"].dt.month
+            diff = da - base["mean"].sel(month=month)
+            if zscore:
+                diff = diff / base["std"].sel(month=month)
+            out = diff.mean("time", skipna=True).drop_vars("month", errors="ignore")
+        else:
+            out = da.mean("time", skipna=True) - base["mean"]
+            if zscore:
+                out = out / base["std"]
+        return Image(xr.Dataset({band: out}))
+
+
+def _period(text):
+    start, _, end = text.partition(":")
+    return start, end
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Anomalies against stored climatology baselines.")
+    parser.add_argument("dataset", choices=sorted(DATASETS))
+    parser.add_argument("--baseline", type=_period, default=("2001-01-01", "2010-12-31"),
+                        help="START:END")
+    parser.add_argument("--recent", type=_period, default=("2021-01-01", "2024-12-31"),
+                        help="START:END")
+    parser.add_argument("--zscore", action="store_true")
+    parser.add_argument("--monthly", action="store_true", help="per calendar month baselines")
+    parser.add_argument("--resolution", type=float, default=None, help="degrees (default: native)")
+    parser.add_argument("--data-dir", default=None)
+    parser.add_argument("-o", "--output", required=True, help=".npy, rows from north to south")
+    args = parser.parse_args()
+
+    asset, band = DATASETS[args.dataset]
+    image = ClimatologyStore().anomaly(LocalBackend(args.data_dir), asset, band, args.recent,
+                                       args.baseline, args.zscore, args.resolution, args.monthly)
+    values = image.to_numpy()
+    np.save(args.output, values)
+    print(f"✅ {args.dataset} {'z-score' if args.zscore else 'anomaly'} saved as {args.output} "
+          f"(bounds {tuple(round(b, 4) for b in image.bounds())}, mean {np.nanmean(values):.3f})")
+
+
+if __name__ == "__main__":
+    main()
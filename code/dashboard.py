@@ -0,0 +1,185 @@
+# dashboard.py
+#
+# All maps of layers.py as one static dashboard instead of one standalone
+# HTML page per map.
+#
+#   python render_maps.py --dashboard -o site                 # Earth Engine tile URLs
+#   python tiles.py maps --data-dir data -o site --dashboard   # pre-rendered tiles
+#
+# The output is a small index.html (the shell: a theme switcher and the map)
+# plus shared static files whose names carry a hash of their content:
+#
+#   assets/dashboard.<hash>.js, assets/dashboard.<hash>.css
+#   themes/<map>.<hash>.json     layers, centre and zoom of one map
+#
+# Hashed files never change under the same name, so a static host can
+# serve them with a long cache lifetime and only index.html is revalidated.
+# The first theme is inlined in index.html so the first map draws without
+# another request; the other themes are fetched when they are opened.
+# Every text file gets precompressed .gz and (with the optional `brotli`
+# package) .br siblings for hosts that serve them as-is.
+
+import gzip
+import hashlib
+import json
+import os
+
+from layers import MAPS
+
+# Leaflet is shared with every other site that uses this CDN copy
+LEAFLET = "https://unpkg.com/leaflet@1.9.4/dist/leaflet"
+BASEMAP = {"url": "https://tile.openstreetmap.org/{z}/{x}/{y}.png",
+           "attribution": "&copy; OpenStreetMap contributors"}
+
+CSS = """\
+html, body { margin: 0; height: 100%; font-family: system-ui, sans-serif; }
+body { display: flex; flex-direction: column; }
+nav { display: flex; flex-wrap: wrap; gap: 4px; padding: 6px; background: #1f2a30; }
+nav a { color: #dfe7ea; padding: 4px 10px; border-radius: 3px; text-decoration: none; }
+nav a.active { background: #3d7a5a; color: #fff; }
+#map { flex: 1; }
+"""
+
+JS = """\
+(function () {
+  var themes = JSON.parse(document.getElementById("themes").textContent);
+  var loaded = {};
+  var map = L.map("map", { worldCopyJump: true });
+  var basemap = themes.basemap;
+  L.tileLayer(basemap.url, { attribution: basemap.attribution, maxZoom: 19 }).addTo(map);
+  var control = L.control.layers(null, null, { collapsed: false }).addTo(map);
+  var shown = [];
+
+  function show(name, theme) {
+    shown.forEach(function (layer) { map.removeLayer(layer); control.removeLayer(layer); });
+    shown = theme.layers.map(function (spec) {
+      var layer = L.tileLayer(spec.url, { attribution: spec.attribution, maxZoom: 19 });
+      layer.addTo(map);
+      control.addOverlay(layer, spec.name);
+      return layer;
+    });
+    map.setView(theme.center, theme.zoom);
+    document.querySelectorAll("nav a").forEach(function (a) {
+      a.classList.toggle("active", a.dataset.theme === name);
+    });
+  }
+
+  function openTheme(name) {
+    if (loaded[name]) return show(name, loaded[name]);
+    var entry = themes.themes[name];
+    if (!entry) return;
+    if (entry.inline) return show(name, loaded[name] = entry.inline);
+    fetch(entry.file).then(function (r) { return r.json(); }).then(function (theme) {
+      show(name, loaded[name] = theme);
+    });
+  }
+
+  var nav = document.querySelector("nav");
+  Object.keys(themes.themes).forEach(function (name) {
+    var a = document.createElement("a");
+    a.href = "#" + name;
+    a.dataset.theme = name;
+    a.textContent = themes.themes[name].title;
+    nav.appendChild(a);
+  });
+  window.addEventListener("hashchange", function () { openTheme(location.hash.slice(1)); });
+  var first = location.hash.slice(1);
+  openTheme(themes.themes[first] ? first : Object.keys(themes.themes)[0]);
+})();
+"""
+
+INDEX = """\
+<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Eco-climate maps</title>
+<link rel="stylesheet" href="{leaflet}.css">
+<link rel="stylesheet" href="{css}">
+</head>
+<body>
+<nav></nav>
+<div id="map"></div>
+<script id="themes" type="application/json">{themes}</script>
+<script src="{leaflet}.js"></script>
+<script src="{js}"></script>
+</body>
+</html>
+"""
+
+
+def _title(name):
+    return name.replace("-", " ").capitalize()
+
+
+def _hashed(out_dir, folder, stem, ext, text):
+    """Write text as <folder>/<stem>.<hash>.<ext>; returns the relative path."""
+    digest = hashlib.sha1(text.encode()).hexdigest()[:10]
+    relative = f"{folder}/{stem}.{digest}.{ext}"
+    path = os.path.join(out_dir, relative)
+    if not os.path.exists(path):   # same name, same content
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+    return relative
+
+
+def precompress(path):
+    """Write path.gz and, if brotli is installed, path.br next to path."""
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path + ".gz", "wb") as f:
+        # mtime=0: identical input gives identical bytes
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    try:
+        import brotli  # optional
+    except ImportError:
+        return
+    with open(path + ".br", "wb") as f:
+        f.write(brotli.compress(data, quality=11))
+
+
+def export(names=None, out_dir="dashboard", urls=None):
+    """
+    Write the dashboard of the named maps to out_dir. `urls` is {layer key:
+    tile URL}, from Earth Engine (render_maps.tile_urls) by default.
+    Returns the path of index.html.
+    """
+    names = list(names or MAPS)
+    if urls is None:
+        from render_maps import tile_urls
+        urls = tile_urls([layer for name in names for layer in MAPS[name].layers])
+
+    os.makedirs(out_dir, exist_ok=True)
+    written = [os.path.join(out_dir, _hashed(out_dir, "assets", "dashboard", "css", CSS)),
+               os.path.join(out_dir, _hashed(out_dir, "assets", "dashboard", "js", JS))]
+    css, js = (os.path.relpath(p, out_dir).replace(os.sep, "/") for p in written)
+
+    manifest = {"basemap": BASEMAP, "themes": {}}
+    for i, name in enumerate(names):
+        spec = MAPS[name]
+        theme = {"center": list(spec.center), "zoom": spec.zoom,
+                 "layers": [{"name": layer.name, "url": urls[layer.key()],
+                             "attribution": "Google Earth Engine"} for layer in spec.layers]}
+        text = json.dumps(theme, separators=(",", ":"), ensure_ascii=False)
+        entry = {"title": _title(name), "file": _hashed(out_dir, "themes", name, "json", text)}
+        written.append(os.path.join(out_dir, entry["file"]))
+        if i == 0:
+            entry["inline"] = theme   # the first map needs no extra request
+        manifest["themes"][name] = entry
+
+    themes = json.dumps(manifest, separators=(",", ":"), ensure_ascii=False).replace("</", "<\\/")
+    index = os.path.join(out_dir, "index.html")
+    with open(index, "w", encoding="utf-8") as f:
+        f.write(INDEX.format(leaflet=LEAFLET, css=css, js=js, themes=themes))
+    written.append(index)
+
+    for path in written:
+        if not os.path.exists(path + ".gz") or path == index:
+            precompress(path)
+    total = sum(os.path.getsize(p) for p in written)
+    gzipped = sum(os.path.getsize(p + ".gz") for p in written)
+    print(f"✅ Dashboard with {len(names)} maps saved as {index} "
+          f"({total / 1024:.1f} kB, {gzipped / 1024:.1f} kB gzipped)")
+    return index
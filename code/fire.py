@@ -0,0 +1,204 @@
+# fire.py
+#
+# Burn history of the MODIS burned-area stack (MCD64A1 BurnDate) in one
+# pass, on local data (see local_backend.py).
+#
+#   python fire.py --start 2015-01-01 --end 2023-12-31 --year 2020 --data-dir data -o fire
+#
+# Fire Frequency and Cumulative Burned Area (layers.py, "fire-watch") are
+# two reductions of the same stack, and per-year questions would need one
+# more per year. The FireReducer reads every composite once and keeps, per
+# pixel:
+#
+#   frequency   composites with a burn (BurnDate > 0)       uint16
+#   valid       composites with an observation              uint16
+#   first/last  first and last burn date, days since 1970   int32 (-1 = never)
+#   years       bit i set = burned in base_year + i         uint16
+#
+# 14 bytes per pixel whatever the length of the stack. "Burned in year X"
+# and "years since last fire" are bit operations on `years`. Like
+# temporal.py, the state is persisted and only new composites are folded
+# in on later runs.
+
+import argparse
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from temporal import REDUCTION_DIR, TemporalReducer, new_steps, steps_hash
+
+ASSET, BAND = "MODIS/061/MCD64A1", "BurnDate"
+FIELDS = {"frequency": np.uint16, "valid": np.uint16, "first": np.int32,
+          "last": np.int32, "years": np.uint16}
+MAX_YEARS = 16   # bits in the years mask
+
+
+class FireHistory:
+    """Persisted fire state of one stack; see FireReducer."""
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(os.path.join(path, "meta.json")) as f:
+                self.meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.meta = None
+
+    def array(self, name, mode="r"):
+        return np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode=mode)
+
+    def frequency(self):
+        return np.asarray(self.array("frequency"))
+
+    def valid(self):
+        return np.asarray(self.array("valid"))
+
+    def burn_date(self, which="first"):
+        """First or last burn date as datetime64[D] (NaT = never burned)."""
+        days = np.asarray(self.array(which))
+        dates = days.astype("datetime64[D]")
+        dates[days < 0] = np.datetime64("NaT")
+        return dates
+
+    def years_burned(self):
+        years = np.asarray(self.array("years"))
+        return sum(((years >> bit) & 1) for bit in range(MAX_YEARS)).astype(np.uint8)
+
+    def burned_in(self, year):
+        bit = year - self.meta["base_year"]
+        if not 0 <= bit < MAX_YEARS:
+            return np.zeros(self.array("years").shape, dtype=bool)
+        return (np.asarray(self.array("years")) >> bit) & 1 == 1
+
+    def years_since_last_fire(self, year):
+        """year minus the last burn year, -1 where the pixel never burned."""
+        years = np.asarray(self.array("years")).astype(np.uint32)
+        last = np.full(years.shape, -1, dtype=np.int16)
+        for bit in range(MAX_YEARS):
+            last[(years >> bit) & 1 == 1] = bit
+        return np.where(last >= 0, year - (self.meta["base_year"] + last), -1).astype(np.int16)
+
+
+def _fold(state, block, years, base_year):
+    """Fold a (time, rows, cols) BurnDate block into state (in place)."""
+    valid = ~np.isnan(block)
+    burned = valid & (block > 0)
+    state["valid"] += valid.sum(axis=0, dtype=np.uint16)
+    state["frequency"] += burned.sum(axis=0, dtype=np.uint16)
+    for i, year in enumerate(years):
+        hit = burned[i]
+        if not hit.any():
+            continue
+        # BurnDate is the day of year of the burn
+        doy = np.where(hit, block[i], 1).astype(np.int32)
+        day = np.datetime64(f"{year}-01-01", "D").astype(np.int32) + doy - 1
+        state["first"][:] = np.where(hit & ((state["first"] < 0) | (day < state["first"])),
+                                     day, state["first"])
+        state["last"][:] = np.where(hit & (day > state["last"]), day, state["last"])
+        state["years"] |= np.where(hit, np.uint16(1 << (year - base_year)), np.uint16(0))
+
+
+class FireReducer(TemporalReducer):
+    """One-pass fire statistics, stored next to the temporal reductions."""
+
+    def reduce(self, lineage, data):
+        """
+        data: BurnDate DataArray (time, y, x), NaN where not mapped.
+        Returns the up-to-date FireHistory, folding in only new composites.
+        """
+        history = FireHistory(self.store_dir / f"fire-{self.key(lineage, data)}")
+        times = pd.DatetimeIndex(data["time"].values)
+        meta = history.meta
+        if not len(times):
+            raise ValueError("Empty burned-area collection")
+
+        steps, fresh = np.arange(len(times)), True
+        new = new_steps(meta, data)
+        if new is not None:
+            steps, fresh = new, False
+            if not len(steps):
+                return history
+        base_year = meta["base_year"] if not fresh else int(times[0].year)
+        if times[-1].year - base_year >= MAX_YEARS:
+            raise ValueError(f"Burn history covers more than {MAX_YEARS} years "
+                             f"({base_year}-{times[-1].year})")
+
+        path = history.path
+        if fresh:
+            shutil.rmtree(path, ignore_errors=True)
+        path.mkdir(parents=True, exist_ok=True)
+        meta = {"complete": False, "base_year": base_year}
+        with open(path / "meta.json", "w") as f:
+            json.dump(meta, f)
+
+        rows, cols = data.shape[1:]
+        if fresh:
+            for name, dtype in FIELDS.items():
+                arr = np.lib.format.open_memmap(path / f"{name}.npy", mode="w+",
+                                                dtype=dtype, shape=(rows, cols))
+                arr[:] = -1 if name in ("first", "last") else 0
+                del arr
+        state = {name: history.array(name, "r+") for name in FIELDS}
+
+        row_block = self.row_block or (data.chunks[1][0] if data.chunks else 512)
+        for r0 in range(0, rows, row_block):
+            r1 = min(r0 + row_block, rows)
+            block_state = {k: np.array(v[r0:r1]) for k, v in state.items()}
+            for t0 in range(0, len(steps), self.time_block):
+                idx = steps[t0:t0 + self.time_block]
+                block = np.asarray(data.isel(time=idx, y=slice(r0, r1)).values, dtype=np.float32)
+                _fold(block_state, block, times[idx].year, base_year)
+            for k, v in state.items():
+                v[r0:r1] = block_state[k]
+        for v in state.values():
+            v.flush()
+        del state
+
+        meta.update(complete=True, n_times=len(times), last_time=str(times[-1]),
+                    steps=steps_hash(data))
+        tmp = path / "meta.json.tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path / "meta.json")
+        history.meta = meta
+        return history
+
+
+def burn_history(backend, start, end, reducer=None):
+    """FireHistory of BurnDate over [start, end) from a LocalBackend."""
+    fires = backend.ImageCollection(ASSET).filterDate(start, end).select(BAND)
+    return (reducer or FireReducer()).reduce(fires.lineage, fires.ds[BAND])
+
+
+def main():
+    from local_backend import LocalBackend
+
+    parser = argparse.ArgumentParser(description="One-pass burn history from MCD64A1.")
+    parser.add_argument("--start", default="2015-01-01")
+    parser.add_argument("--end", default="2023-12-31")
+    parser.add_argument("--year", type=int, default=None,
+                        help="also write burned-in-year and years-since-last-fire for this year")
+    parser.add_argument("--data-dir", default=None)
+    parser.add_argument("--store", default=None, help=f"state directory (default {REDUCTION_DIR})")
+    parser.add_argument("-o", "--output", default="fire", help="prefix of the .npy outputs")
+    args = parser.parse_args()
+
+    history = burn_history(LocalBackend(args.data_dir), args.start, args.end,
+                           FireReducer(args.store))
+    outputs = {"frequency": history.frequency(), "valid": history.valid(),
+               "years_burned": history.years_burned()}
+    if args.year is not None:
+        outputs[f"burned_{args.year}"] = history.burned_in(args.year)
+        outputs[f"since_last_fire_{args.year}"] = history.years_since_last_fire(args.year)
+    for name, values in outputs.items():
+        np.save(f"{args.output}_{name}.npy", values)
+    burned = (outputs["frequency"] > 0).mean()
+    print(f"🔥 {burned:.1%} of pixels burned at least once since {history.meta['base_year']}; "
+          f"wrote {', '.join(f'{args.output}_{n}.npy' for n in outputs)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+# layers.py
+#
+# Every map layer as data: an expression over Earth Engine style
+# operations, its vis params and its name, grouped into the maps we
+# publish. Nothing here talks to Earth Engine; render_maps.py evaluates the
+# expressions against the `ee` module.
+#
+# Expressions are built with the same method names as ee, e.g.
+#
+#   NDVI = ImageCollection("MODIS/061/MOD13A2").select("NDVI")
+#   NDVI.filterDate("2015-01-01", "2023-12-31").mean()
+#
+# and are immutable trees with a canonical key, so identical expressions
+# written in different maps (or with filter/select in a different order)
+# are recognised as one and only computed and tiled once.
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+
+
+@dataclass(frozen=True)
+class Expr:
+    op: str                  # method name, or a constructor such as "ImageCollection"
+    args: tuple = ()
+    on: "Expr" = None        # receiver of a method call
+
+    # --- collections ---
+    def filterDate(self, start, end):
+        return self._filter("filterDate", str(start), str(end))
+
+    def filter(self, condition):
+        return self._filter("filter", condition)
+
+    def select(self, band):
+        return Expr("select", (band,), self)
+
+    def map(self, fn):
+        return Expr("map", (fn(VAR),), self)
+
+    def mean(self):
+        return Expr("mean", (), self)
+
+    def sum(self):
+        return Expr("sum", (), self)
+
+    def count(self):
+        return Expr("count", (), self)
+
+    def first(self):
+        return Expr("first", (), self)
+
+    # --- images ---
+    def add(self, other):
+        return Expr("add", (other,), self)
+
+    def subtract(self, other):
+        return Expr("subtract", (other,), self)
+
+    def multiply(self, other):
+        return Expr("multiply", (other,), self)
+
+    def divide(self, other):
+        return Expr("divide", (other,), self)
+
+    def gt(self, other):
+        return Expr("gt", (other,), self)
+
+    def neq(self, other):
+        return Expr("neq", (other,), self)
+
+    def updateMask(self, mask):
+        return Expr("updateMask", (mask,), self)
+
+    def selfMask(self):
+        return Expr("selfMask", (), self)
+
+    def _filter(self, op, *args):
+        # Filtering and band selection commute; keep filters innermost so
+        # .select().filterDate() and .filterDate().select() share one key.
+        if self.op == "select":
+            return Expr("select", self.args, self.on._filter(op, *args))
+        return Expr(op, args, self)
+
+    # --- canonical form ---
+    def data(self):
+        out = {"op": self.op, "args": [_data(a) for a in self.args]}
+        if self.on is not None:
+            out["on"] = self.on.data()
+        return out
+
+    def key(self):
+        text = json.dumps(self.data(), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def _data(value):
+    if isinstance(value, Expr):
+        return value.data()
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)      # 1 and 1.0 are the same constant
+    if isinstance(value, (list, tuple)):
+        return [_data(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _data(v) for k, v in value.items()}
+    return value
+
+
+VAR = Expr("var")    # the element a .map() function is applied to
+
+
+def ImageCollection(asset):
+    return Expr("ImageCollection", (asset,))
+
+
+def Image(asset):
+    return Expr("Image", (asset,))
+
+
+def FeatureCollection(asset):
+    return Expr("FeatureCollection", (asset,))
+
+
+def calendarRange(start, end, field):
+    return Expr("Filter.calendarRange", (start, end, field))
+
+
+def evaluate(expr, backend, memo=None, var=None):
+    """
+    Build `expr` with `backend` (the ee module, or anything with the same
+    constructors and methods). Sub-expressions are evaluated once per memo.
+    """
+    if not isinstance(expr, Expr):
+        return expr
+    if expr.op == "var":
+        return var
+    key = expr.key()
+    if memo is not None and key in memo:
+        return memo[key]
+
+    if expr.on is None:
+        target = backend
+        for part in expr.op.split("."):
+            target = getattr(target, part)
+        result = target(*expr.args)
+    else:
+        receiver = evaluate(expr.on, backend, memo, var)
+        if expr.op == "map":
+            body = expr.args[0]
+            # The mapped body depends on the element, so it gets no shared memo
+            fn = lambda item: evaluate(body, backend, None, item)
+            fn.key = body.key()   # lets backends tell mapped functions apart
+            result = receiver.map(fn)
+        else:
+            args = [evaluate(a, backend, memo, var) for a in expr.args]
+            result = getattr(receiver, expr.op)(*args)
+
+    if memo is not None and var is None:
+        memo[key] = result
+    return result
+
+
+# -------------------------------------------
+# Layers and maps
+# -------------------------------------------
+@dataclass(frozen=True)
+class Layer:
+    name: str
+    expr: Expr
+    vis: dict = field(default_factory=dict, hash=False)
+
+    def key(self):
+        """Expression and vis params: layers with the same key share tiles."""
+        text = json.dumps({"expr": self.expr.data(), "vis": _data(self.vis)},
+                          sort_keys=True, separators=(",", ":"))
+        return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class MapSpec:
+    file: str
+    center: tuple
+    zoom: int
+    layers: tuple
+
+
+# Shared datasets
+NDVI = ImageCollection("MODIS/061/MOD13A2").select("NDVI")
+LST_DAY = ImageCollection("MODIS/061/MOD11A2").select("LST_Day_1km")
+WORLDCOVER_2020 = Image("ESA/WorldCover/v100/2020")
+WORLDCOVER_2021 = Image("ESA/WorldCover/v200/2021")
+
+NDVI_VIS = {"min": 0, "max": 9000, "palette": ["white", "green"]}
+WORLDCOVER_VIS = {"min": 10, "max": 100, "palette": ["#006400", "#FFFF00", "#8B4513", "#00BFFF"]}
+
+FIRE_START, FIRE_END = "2015-01-01", "2023-12-31"  # avoid using future 2024 data
+BURN_DATE = ImageCollection("MODIS/061/MCD64A1").filterDate(FIRE_START, FIRE_END).select("BurnDate")
+SOLAR_PROXY = (ImageCollection("MODIS/006/MOD09GA").select("sur_refl_b01")
+               .filterDate("2023-01-01", "2023-12-31").mean())
+POPULATION = ImageCollection("CIESIN/GPWv4/population-count").first()
+# 500 m reflectance over ~1 km population counts. Locally, align.py puts both
+# on one grid (mean / sum) and caches the ratio with overviews.
+SOLAR_PER_CAPITA = SOLAR_PROXY.divide(POPULATION.add(1))
+
+MAPS = {
+    "demo": MapSpec("demo_map.html", (20, 0), 2, (
+        Layer("SRTM Elevation", Image("CGIAR/SRTM90_V4"),
+              {"min": 0, "max": 3000, "palette": ["blue", "green", "brown"]}),
+    )),
+    "eco-trend": MapSpec("eco_trend_map.html", (10, 0), 2, (
+        Layer("Mean NDVI", NDVI.mean(), NDVI_VIS),
+        # Seasonality example: mean NDVI of all Januaries. Locally this is a
+        # lookup in the 12-month cube (see local_backend.py)
+        Layer("NDVI January (Seasonality Example)",
+              NDVI.filter(calendarRange(1, 1, "month")).mean(),
+              {"min": 0, "max": 9000, "palette": ["brown", "yellow", "green"]}),
+        Layer("ESA WorldCover 2020", WORLDCOVER_2020, WORLDCOVER_VIS),
+        Layer("ESA WorldCover 2021", WORLDCOVER_2021, WORLDCOVER_VIS),
+        Layer("Land Cover Change (2020-2021)",
+              WORLDCOVER_2021.subtract(WORLDCOVER_2020).neq(0).selfMask(),
+              {"palette": ["#FF0000"]}),
+        Layer("Human Pressure (Nightlights)",
+              ImageCollection("NOAA/VIIRS/DNB/MONTHLY_V1/VCMCFG").select("avg_rad").mean(),
+              {"min": 0, "max": 60, "palette": ["black", "purple", "orange", "white"]}),
+    )),
+    "drought-water": MapSpec("drought_water_map.html", (10, 0), 2, (
+        Layer("Surface Water Occurrence",
+              Image("JRC/GSW1_4/GlobalSurfaceWater").select("occurrence"),
+              {"min": 0, "max": 100, "palette": ["white", "blue"]}),
+        # On local data both means are persisted by the TemporalReducer (see
+        # temporal.py); for per-month anomalies and z-scores against a stored
+        # baseline, run climatology.py
+        Layer("NDVI Anomaly (Recent - Baseline)",
+              NDVI.filterDate("2021-01-01", "2024-12-31").mean()
+              .subtract(NDVI.filterDate("2001-01-01", "2010-12-31").mean()),
+              {"min": -1000, "max": 1000, "palette": ["brown", "white", "green"]}),
+        Layer("Land Surface Temperature (°C)",
+              LST_DAY.mean().multiply(0.02).subtract(273.15),
+              {"min": 10, "max": 45, "palette": ["blue", "yellow", "red"]}),
+        Layer("Evapotranspiration (MODIS/061)",
+              ImageCollection("MODIS/061/MOD16A2GF").select("ET").mean().multiply(0.1),
+              {"min": 0, "max": 2000, "palette": ["white", "lightblue", "darkblue"]}),
+        Layer("Mean Precipitation (CHIRPS)",
+              ImageCollection("UCSB-CHG/CHIRPS/DAILY").filterDate("2020-01-01", "2024-12-31")
+              .select("precipitation").mean(),
+              {"min": 0, "max": 10, "palette": ["white", "lightblue", "blue"]}),
+    )),
+    "fire-watch": MapSpec("fire_watch_map.html", (0, 0), 2, (
+        # On local data, fire.py computes both fire layers and per-year burn
+        # history in one pass
+        Layer("Fire Frequency (2015–2023)", BURN_DATE.map(lambda img: img.gt(0)).sum(),
+              {"min": 0, "max": 100, "palette": ["white", "orange", "red"]}),
+        Layer("Cumulative Burned Area (2015–2023)", BURN_DATE.count(),
+              {"min": 0, "max": 120, "palette": ["white", "yellow", "brown"]}),
+        Layer("Mean NDVI (2015–2023)", NDVI.filterDate(FIRE_START, FIRE_END).mean(), NDVI_VIS),
+    )),
+    "solar-atlas": MapSpec("solar_atlas_map.html", (0, 0), 2, (
+        Layer("Solar Radiation Proxy (MODIS B01)", SOLAR_PROXY,
+              {"min": 0, "max": 2000, "palette": ["blue", "yellow", "red"]}),
+        # Remove forests (10) and water (80)
+        Layer("Suitable Land (simplified)",
+              WORLDCOVER_2020.updateMask(WORLDCOVER_2020.neq(10))
+              .updateMask(WORLDCOVER_2020.neq(80)),
+              {"palette": ["lightgreen"]}),
+        Layer("Solar Radiation per Capita", SOLAR_PER_CAPITA,
+              {"min": 0, "max": 500, "palette": ["white", "yellow", "red"]}),
+    )),
+    "biodiversity-pulse": MapSpec("biodiversity_pulse_map.html", (0, 0), 2, (
+        Layer("NDVI (Mean)", NDVI.mean(), NDVI_VIS),
+        Layer("Temperature (LST)", LST_DAY.mean().multiply(0.02),
+              {"min": 200, "max": 320, "palette": ["blue", "white", "red"]}),
+        # Statistics per protected area: zonal.py
+        Layer("Protected Areas", FeatureCollection("WCMC/WDPA/current/polygons"),
+              {"color": "blue"}),
+        Layer("ESA WorldCover 2020", WORLDCOVER_2020,
+              {"min": 10, "max": 100, "palette": ["forestgreen", "yellow", "brown", "blue"]}),
+    )),
+}
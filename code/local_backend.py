@@ -0,0 +1,361 @@
+# local_backend.py
+#
+# Run the layer expressions of layers.py on local rasters instead of Earth
+# Engine. LocalBackend() stands in for the `ee` module in
+# layers.evaluate(), and implements the operations our maps use:
+#
+#   ImageCollection  filterDate, select, filter(calendarRange), map,
+#                    mean, sum, count, first (and, with a reducer,
+#                    reduce, groupBy, seasonalAmplitude)
+#   Image            select, add, subtract, multiply, divide, gt, neq,
+#                    updateMask, selfMask
+#
+# Assets are looked up under a data directory, e.g. MODIS/061/MOD13A2 in
+# <root>/MODIS/061/MOD13A2.zarr, .nc or .tif, or a directory of
+# YYYY-MM-DD.tif files. Datasets have dims (time, y, x) for collections or
+# (y, x) for images, one data variable per band, and lon/lat coordinates
+# in x/y. Everything stays a lazy, chunked dask graph until compute(), so
+# reductions stream over the time axis with bounded memory and use all
+# cores. Masked pixels are NaN, as Earth Engine masks: they propagate
+# through arithmetic and comparisons and are skipped by the reducers.
+# With a TemporalReducer, collection means, sums and counts are kept as
+# persisted accumulators and only new time steps are read on later runs.
+# A single-month calendarRange filter then reads its month from the
+# collection's 12-month cube, built for all months in one pass.
+
+import os
+import re
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+DEFAULT_CHUNKS = {"time": 16, "y": 1024, "x": 1024}
+
+
+@dataclass(frozen=True)
+class CalendarRange:
+    start: int
+    end: int
+    field: str     # "month", "year" or "day_of_year"
+
+    def mask(self, times):
+        values = {"month": times.month, "year": times.year,
+                  "day_of_year": times.dayofyear}[self.field]
+        if self.start <= self.end:
+            return (values >= self.start) & (values <= self.end)
+        return (values >= self.start) | (values <= self.end)   # wraps, e.g. Nov-Feb
+
+
+def _masked(result, *inputs):
+    """Comparisons give 0/1 floats; keep the inputs' masked pixels masked."""
+    result = result.astype(np.float32)
+    for value in inputs:
+        if isinstance(value, xr.DataArray):
+            result = result.where(value.notnull())
+    return result
+
+
+class Image:
+    def __init__(self, ds):
+        self.ds = ds
+
+    @property
+    def bands(self):
+        return list(self.ds.data_vars)
+
+    def select(self, *bands):
+        return Image(self.ds[list(bands)])
+
+    # --- per-pixel operations ---
+    def _binary(self, other, fn):
+        if not isinstance(other, Image):
+            return Image(self.ds.map(lambda a: fn(a, other)))
+        left, right = self.bands, other.bands
+        if len(right) == 1:
+            pairs = [(b, right[0]) for b in left]
+        elif len(left) == 1:
+            pairs = [(left[0], b) for b in right]
+        elif len(left) == len(right):
+            pairs = list(zip(left, right))
+        else:
+            raise ValueError(f"Band counts do not match: {left} vs {right}")
+        return Image(xr.Dataset({a if len(left) >= len(right) else b:
+                                 fn(self.ds[a], other.ds[b]) for a, b in pairs}))
+
+    def add(self, other):
+        return self._binary(other, lambda a, b: a + b)
+
+    def subtract(self, other):
+        return self._binary(other, lambda a, b: a - b)
+
+    def multiply(self, other):
+        return self._binary(other, lambda a, b: a * b)
+
+    def divide(self, other):
+        # Division by zero is masked, as in Earth Engine
+        return self._binary(other, lambda a, b: (a / b).where(b != 0))
+
+    def gt(self, other):
+        return self._binary(other, lambda a, b: _masked(a > b, a, b))
+
+    def neq(self, other):
+        return self._binary(other, lambda a, b: _masked(a != b, a, b))
+
+    def updateMask(self, mask):
+        keep = lambda a, m: a.where((m != 0) & m.notnull())
+        return self._binary(mask, keep)
+
+    def selfMask(self):
+        return Image(self.ds.map(lambda a: a.where(a != 0)))
+
+    # --- results ---
+    def bounds(self):
+        """(west, south, east, north) of the pixel edges."""
+        x, y = self.ds["x"].values, self.ds["y"].values
+        dx, dy = pixel_size(self.ds, "x"), pixel_size(self.ds, "y")
+        return (x.min() - dx / 2, y.min() - dy / 2, x.max() + dx / 2, y.max() + dy / 2)
+
+    def north_up(self, band=None):
+        """One band as a (still lazy) (y, x) DataArray, rows from north to south."""
+        da = self.ds[band or self.bands[0]]
+        if da["y"].size > 1 and da["y"][0] < da["y"][-1]:
+            da = da.isel(y=slice(None, None, -1))
+        return da.transpose("y", "x")
+
+    def to_numpy(self, band=None):
+        """Computed values of one band, rows from north to south."""
+        return self.north_up(band).values
+
+    def compute(self):
+        return Image(self.ds.compute())
+
+
+def pixel_size(ds, dim):
+    """
+    Pixel size along x or y of a Dataset or DataArray: the coordinate
+    spacing, or for a one-pixel axis the res / transform attributes
+    (GeoTIFF, rioxarray) it came with.
+    """
+    coord = ds[dim].values
+    if coord.size > 1:
+        return float(abs(coord[1] - coord[0]))
+    axis = 0 if dim == "x" else 1
+    variables = getattr(ds, "data_vars", {}).values()
+    for attrs in (ds[dim].attrs, ds.attrs, *(da.attrs for da in variables)):
+        if "res" in attrs:
+            res = np.atleast_1d(attrs["res"])
+            return float(abs(res[axis if res.size > 1 else 0]))
+        if "transform" in attrs:   # affine (a, b, c, d, e, f)
+            return float(abs(attrs["transform"][0 if dim == "x" else 4]))
+    if "spatial_ref" in ds.coords and "GeoTransform" in ds["spatial_ref"].attrs:
+        # GDAL order: (c, a, b, f, d, e)
+        geo = ds["spatial_ref"].attrs["GeoTransform"].split()
+        return abs(float(geo[1 if dim == "x" else 5]))
+    raise ValueError(f"Image is one pixel wide along {dim} and has no res or transform "
+                     f"attribute to take the pixel size from")
+
+
+class ImageCollection:
+    """
+    `lineage` describes how the collection was derived from its asset
+    (None once that is unknown); with a reducer, mean/sum/count of a known
+    lineage go through its persisted accumulators (see temporal.py).
+    `group` is (unfiltered collection, grouping, label) for a collection
+    that is one calendar group of another, so its statistics are looked up
+    in the grouped reduction of that collection.
+    """
+
+    def __init__(self, ds, lineage=None, reducer=None, group=None):
+        self.ds = ds
+        self.lineage = lineage
+        self.reducer = reducer
+        self.group = group
+
+    def _derive(self, ds, *step, group=None):
+        lineage = None if self.lineage is None or step[0] is None else self.lineage + [list(step)]
+        return ImageCollection(ds, lineage, self.reducer, group)
+
+    def filterDate(self, start, end):
+        # [start, end), like ee.ImageCollection.filterDate
+        times = pd.DatetimeIndex(self.ds["time"].values)
+        keep = (times >= pd.Timestamp(start)) & (times < pd.Timestamp(end))
+        return self._derive(self.ds.isel(time=np.flatnonzero(keep)), "filterDate", start, end)
+
+    def filter(self, condition):
+        if not isinstance(condition, CalendarRange):
+            raise NotImplementedError(f"Unsupported filter: {condition!r}")
+        keep = condition.mask(pd.DatetimeIndex(self.ds["time"].values))
+        group = None
+        if condition.field == "month" and condition.start == condition.end:
+            group = (self, "month", f"{int(condition.start):02d}")
+        return self._derive(self.ds.isel(time=np.flatnonzero(keep)), "filter",
+                            condition.start, condition.end, condition.field, group=group)
+
+    def select(self, *bands):
+        group = None
+        if self.group is not None:
+            parent, by, label = self.group
+            group = (parent.select(*bands), by, label)
+        return self._derive(self.ds[list(bands)], "select", *bands, group=group)
+
+    def map(self, fn):
+        # Every supported image operation is per-pixel, so applying it to
+        # the whole (time, y, x) stack equals applying it image by image.
+        key = getattr(fn, "key", None)
+        return self._derive(fn(Image(self.ds)).ds, "map" if key else None, key)
+
+    def _image(self, arrays):
+        coords = {"y": self.ds["y"], "x": self.ds["x"]}
+        return Image(xr.Dataset({name: xr.DataArray(values, dims=("y", "x"), coords=coords)
+                                 for name, values in arrays.items()}))
+
+    def _reductions(self, by=None):
+        return {band: self.reducer.reduce(self.lineage + [["band", band]], da, by=by)
+                for band, da in self.ds.data_vars.items()}
+
+    def _streamed(self, stat):
+        """stat of every band through the reducer, or None to reduce lazily."""
+        if self.reducer is None or self.lineage is None:
+            return None
+        if self.group is not None and self.group[0].lineage is not None:
+            parent, by, label = self.group
+            return self._image({band: reduction.result(stat, label)
+                                for band, reduction in parent._reductions(by).items()})
+        return self._image({band: reduction.result(stat)
+                            for band, reduction in self._reductions().items()})
+
+    def mean(self):
+        return self._streamed("mean") or Image(self.ds.mean("time", skipna=True))
+
+    def sum(self):
+        return self._streamed("sum") or Image(self.ds.sum("time", skipna=True, min_count=1))
+
+    def count(self):
+        return self._streamed("count") or Image(self.ds.count("time").astype(np.float32))
+
+    def reduce(self, *stats):
+        """Several statistics (count, sum, mean, variance, std, min, max) in one pass."""
+        self._check_streamed("reduce()")
+        return {stat: self._streamed(stat) for stat in stats}
+
+    def _check_streamed(self, what):
+        if self.reducer is None or self.lineage is None:
+            raise ValueError(f"{what} needs a reducer and a collection read from an asset")
+
+    def groupBy(self, field="month", stat="mean"):
+        """
+        stat of every calendar group (see temporal.GROUPINGS) as bands
+        <band>_<label>, e.g. NDVI_01 ... NDVI_12, all groups in one pass.
+        """
+        self._check_streamed("groupBy()")
+        bands = {}
+        for band, reduction in self._reductions(field).items():
+            for label, values in zip(reduction.groups, reduction.result(stat)):
+                bands[f"{band}_{label}"] = values
+        return self._image(bands)
+
+    def seasonalAmplitude(self, field="month"):
+        """Largest minus smallest group mean of every band."""
+        self._check_streamed("seasonalAmplitude()")
+        return self._image({band: reduction.amplitude()
+                            for band, reduction in self._reductions(field).items()})
+
+    def first(self):
+        return Image(self.ds.isel(time=0, drop=True))
+
+    def size(self):
+        return self.ds.sizes["time"]
+
+
+class LocalBackend:
+    """Stand-in for the `ee` module, reading assets from `root`."""
+
+    def __init__(self, root=None, chunks=None, reducer=None):
+        """reducer: a temporal.TemporalReducer, or None to reduce lazily every time."""
+        self.root = root or os.environ.get("ECO_LOCAL_DATA", "data")
+        self.chunks = chunks or DEFAULT_CHUNKS
+        self.reducer = reducer
+        self.assets = {}
+        self.sources = {}   # asset -> the path it was read from
+        self.Filter = SimpleNamespace(calendarRange=CalendarRange)
+
+    def register(self, asset, ds):
+        """Use an in-memory (or already opened) Dataset for `asset`."""
+        self.assets[asset] = ds
+        self.sources[asset] = "<registered>"
+
+    def _open(self, asset):
+        if asset in self.assets:
+            return self.assets[asset]
+        base = os.path.join(self.root, *asset.split("/"))
+        if os.path.isdir(base + ".zarr"):
+            ds, path = xr.open_zarr(base + ".zarr"), base + ".zarr"
+        elif os.path.exists(base + ".nc"):
+            ds, path = xr.open_dataset(base + ".nc", chunks={}), base + ".nc"
+        elif os.path.exists(base + ".tif"):
+            ds, path = _open_tif(base + ".tif"), base + ".tif"
+        elif os.path.isdir(base):
+            ds, path = _open_tif_series(base), base
+        else:
+            raise FileNotFoundError(f"No local data for '{asset}' under {self.root}")
+        chunks = {d: c for d, c in self.chunks.items() if d in ds.dims}
+        ds = ds.chunk(chunks)
+        self.assets[asset] = ds
+        self.sources[asset] = os.path.abspath(path)
+        return ds
+
+    def stamp(self, asset):
+        """(resolved source, last modification time) of an asset, for cache keys."""
+        self._open(asset)
+        source = self.sources[asset]
+        if not os.path.exists(source):
+            return source, None     # registered in memory
+        mtime = os.path.getmtime(source)
+        # A .zarr store or a directory of GeoTIFFs changes inside, not at the top
+        for folder, _, files in os.walk(source) if os.path.isdir(source) else ():
+            mtime = max([mtime] + [os.path.getmtime(os.path.join(folder, f)) for f in files])
+        return source, mtime
+
+    def ImageCollection(self, asset):
+        ds = self._open(asset)
+        if "time" not in ds.dims:
+            ds = ds.expand_dims(time=[pd.Timestamp(0)])
+        # The resolved source is part of the lineage, so the same asset name
+        # under another data root gets its own persisted reductions
+        return ImageCollection(ds, [["asset", asset, self.sources[asset]]], self.reducer)
+
+    def Image(self, asset):
+        ds = self._open(asset)
+        if "time" in ds.dims:
+            ds = ds.isel(time=0, drop=True)
+        return Image(ds)
+
+    def FeatureCollection(self, asset):
+        raise NotImplementedError(f"'{asset}': vector layers are not supported locally")
+
+
+def _open_tif(path):
+    import rioxarray  # optional, only needed for GeoTIFF input
+
+    da = rioxarray.open_rasterio(path, chunks=True)
+    names = da.attrs.get("long_name")
+    if isinstance(names, str):
+        names = (names,)
+    if not names or len(names) != da.sizes["band"]:
+        names = [f"b{i + 1}" for i in range(da.sizes["band"])]
+    return xr.Dataset({n: da.isel(band=i, drop=True) for i, n in enumerate(names)})
+
+
+def _open_tif_series(directory):
+    files = sorted(f for f in os.listdir(directory) if re.match(r"\d{4}-\d{2}-\d{2}\.tif$", f))
+    if not files:
+        raise FileNotFoundError(f"No YYYY-MM-DD.tif files in {directory}")
+    times = pd.DatetimeIndex([f[:10] for f in files], name="time")
+    ds = xr.concat([_open_tif(os.path.join(directory, f)) for f in files], dim=times)
+    # When each step's file last changed: a reprocessed composite is a change
+    # the temporal reductions see (temporal.STAMP)
+    mtimes = [os.path.getmtime(os.path.join(directory, f)) for f in files]
+    return ds.assign_coords(source_mtime=("time", mtimes))
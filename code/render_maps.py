@@ -0,0 +1,124 @@
+# render_maps.py
+#
+# Build the HTML maps defined in layers.py in one process.
+#
+#   python render_maps.py                  # every map
+#   python render_maps.py fire-watch demo  # just these
+#   python render_maps.py --dashboard -o site   # one dashboard (dashboard.py)
+#
+# Earth Engine is initialised once. Every distinct (expression, vis)
+# across the requested maps gets a single getMapId call, made in parallel,
+# and the resulting tile URL is added to each map that shows it; shared
+# sub-expressions are only built once. Set ECO_OPEN_BROWSER=1 to open the
+# maps afterwards.
+
+import argparse
+import os
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+from layers import MAPS, evaluate
+
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+EE_PROJECT = os.environ.get("EE_PROJECT", "ee-ferrenoe")
+
+
+def initialize():
+    """Authenticate and initialize Earth Engine (once per process)."""
+    import ee
+
+    try:
+        ee.Initialize(project=EE_PROJECT)
+    except ee.EEException:
+        ee.Authenticate()
+        ee.Initialize(project=EE_PROJECT)
+    return ee
+
+
+def _displayable(ee, obj, vis):
+    # Feature collections are drawn like geemap does: translucent fill and outline
+    if isinstance(obj, ee.FeatureCollection):
+        color = vis.get("color", "000000")
+        fill = ee.Image().byte().paint(obj, 1).visualize(palette=[color], opacity=0.5)
+        outline = ee.Image().byte().paint(obj, 1, vis.get("width", 2)).visualize(palette=[color])
+        return fill.blend(outline), {}
+    return obj, vis
+
+
+def tile_urls(layers, workers=8):
+    """{layer key: XYZ tile URL}, one getMapId per distinct layer key."""
+    ee = initialize()
+    memo, unique = {}, {}
+    for layer in layers:
+        if layer.key() not in unique:
+            obj, vis = _displayable(ee, evaluate(layer.expr, ee, memo), layer.vis)
+            unique[layer.key()] = (obj, vis)
+
+    def fetch(item):
+        key, (obj, vis) = item
+        return key, obj.getMapId(vis)["tile_fetcher"].url_format
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(pool.map(fetch, unique.items()))
+
+
+def render(names=None, out_dir=".", open_browser=None, urls=None):
+    """
+    Write the HTML of the named maps. `urls` ({layer key: tile URL}) skips
+    Earth Engine, e.g. for pyramids pre-rendered by tiles.py.
+    """
+    import geemap.foliumap as geemap
+
+    names = list(names or MAPS)
+    if urls is None:
+        t0 = time.perf_counter()
+        layers = [layer for name in names for layer in MAPS[name].layers]
+        urls = tile_urls(layers)
+        print(f"🛰️ {len(layers)} layers in {len(names)} maps -> {len(urls)} tile sets "
+              f"({time.perf_counter() - t0:.1f} s)")
+
+    if open_browser is None:
+        open_browser = os.environ.get("ECO_OPEN_BROWSER") == "1"
+    written = []
+    for name in names:
+        spec = MAPS[name]
+        m = geemap.Map(center=list(spec.center), zoom=spec.zoom)
+        for layer in spec.layers:
+            m.add_tile_layer(urls[layer.key()], name=layer.name,
+                             attribution="Google Earth Engine")
+        map_file = os.path.join(out_dir, spec.file)
+        m.to_html(map_file, notebook_display=False)
+        print(f"✅ Map saved as {map_file}")
+        written.append(map_file)
+
+    # Open in the default browser only when asked (ECO_OPEN_BROWSER=1)
+    if open_browser:
+        import webbrowser
+        for map_file in written:
+            webbrowser.open(f"file://{os.path.abspath(map_file)}")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the Earth Engine HTML maps.")
+    parser.add_argument("maps", nargs="*", metavar="MAP",
+                        help=f"maps to build (default: all of {', '.join(MAPS)})")
+    parser.add_argument("-o", "--out-dir", default=".")
+    parser.add_argument("--open", action="store_true", help="open the maps in a browser")
+    parser.add_argument("--dashboard", action="store_true",
+                        help="write one dashboard with every map instead of one page per map")
+    args = parser.parse_args()
+    unknown = set(args.maps) - set(MAPS)
+    if unknown:
+        parser.error(f"unknown maps: {', '.join(sorted(unknown))}")
+    if args.dashboard:
+        from dashboard import export
+        export(args.maps, args.out_dir)
+    else:
+        render(args.maps, args.out_dir, args.open or None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+# temporal.py
+#
+# Streaming per-pixel reduction of a (time, y, x) stack with persisted,
+# resumable state.
+#
+# One pass over the stack accumulates count, mean, M2 (for the variance),
+# min and max with the Welford / Chan update, block of rows by block of
+# time steps, so memory stays at a few row blocks whatever the length of
+# the stack. The state lives on disk as .npy memmaps next to a meta.json
+# that records which time steps are folded in, as a hash of their
+# timestamps and, where the source has them (STAMP, e.g. the file times of
+# a directory of GeoTIFFs), of their modification times. Reducing the same
+# collection again only reads the time steps added since (new MODIS or
+# CHIRPS composites); a collection whose earlier steps changed (removed,
+# inserted or reprocessed), or a state left incomplete by an interrupted
+# run, is reduced from scratch.
+#
+# Grouped by a calendar key (month, season or 16-day bin), the same single
+# pass accumulates every group at once into a (group, y, x) cube, so a
+# seasonality cube costs one read of the stack instead of one per group and
+# any month, or the seasonal amplitude, is then a lookup.
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+REDUCTION_DIR = Path(os.environ.get(
+    "ECO_REDUCTION_DIR", Path.home() / ".cache" / "eco-climate" / "reductions"
+))
+
+STATS = ("count", "mean", "m2", "min", "max")
+STAMP = "source_mtime"   # optional per-time-step coordinate: when the step's file last changed
+
+# Calendar groupings: time index -> group number, and the group labels
+GROUPINGS = {
+    "month": (lambda t: t.month - 1, [f"{m:02d}" for m in range(1, 13)]),
+    "season": (lambda t: (t.month % 12) // 3, ["DJF", "MAM", "JJA", "SON"]),
+    "doy16": (lambda t: (t.dayofyear - 1) // 16, [f"{1 + 16 * i:03d}" for i in range(23)]),
+}
+
+
+def _combine(state, block):
+    """Fold a (time, rows, cols) block with NaN gaps into state (in place)."""
+    valid = ~np.isnan(block)
+    nb = valid.sum(axis=0)
+    if not nb.any():
+        return
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mb = np.where(nb > 0, np.nansum(block, axis=0) / np.maximum(nb, 1), 0.0)
+        m2b = np.nansum((block - mb) ** 2, axis=0)
+        bmin = np.where(nb > 0, np.nanmin(np.where(valid, block, np.inf), axis=0), np.nan)
+        bmax = np.where(nb > 0, np.nanmax(np.where(valid, block, -np.inf), axis=0), np.nan)
+
+    na = state["count"]
+    n = na + nb
+    delta = mb - state["mean"]
+    safe_n = np.maximum(n, 1)
+    state["mean"][:] = np.where(n > 0, state["mean"] + delta * nb / safe_n, 0.0)
+    state["m2"][:] = state["m2"] + m2b + delta ** 2 * na * nb / safe_n
+    state["min"][:] = np.fmin(state["min"], bmin)
+    state["max"][:] = np.fmax(state["max"], bmax)
+    state["count"][:] = n
+
+
+class Reduction:
+    """Persisted accumulator of one collection; see TemporalReducer."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        try:
+            with open(self.path / "meta.json") as f:
+                self.meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.meta = None
+
+    def array(self, stat, mode="r"):
+        return np.load(self.path / f"{stat}.npy", mmap_mode=mode)
+
+    @property
+    def groups(self):
+        """Group labels of a grouped reduction (index of the leading axis), else None."""
+        return self.meta.get("groups") if self.meta else None
+
+    def result(self, stat, group=None):
+        """
+        count, sum, mean, variance, std, min or max (NaN = no data): a 2-D
+        array, or (group, y, x) for a grouped reduction unless one group
+        label is given.
+        """
+        index = slice(None) if group is None else self.groups.index(group)
+        get = lambda name: self.array(name)[index]
+        count = get("count")
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if stat == "count":
+                return np.asarray(count, dtype=np.float32)
+            if stat == "sum":
+                out = get("mean") * count
+            elif stat == "variance":
+                out = get("m2") / (count - 1)   # sample variance, as ee.Reducer.variance
+            elif stat == "std":
+                out = np.sqrt(get("m2") / (count - 1))
+            else:
+                out = np.array(get(stat))
+        return np.where(count > 0, out, np.nan)
+
+    def amplitude(self):
+        """Largest minus smallest group mean per pixel (e.g. seasonal amplitude)."""
+        means = self.result("mean")
+        return np.fmax.reduce(means, axis=0) - np.fmin.reduce(means, axis=0)
+
+
+def steps_hash(data, n=None):
+    """Hash of the first n time steps of `data` (timestamps and STAMP)."""
+    times = np.asarray(data["time"].values, dtype="datetime64[ns]").view(np.int64)[:n]
+    h = hashlib.sha1(times.tobytes())
+    if STAMP in data.coords:
+        h.update(np.asarray(data[STAMP].values, dtype=np.float64)[:n].tobytes())
+    return h.hexdigest()
+
+
+def new_steps(meta, data):
+    """
+    Indices of the steps of `data` after those a complete state (meta)
+    holds, or None when the held steps are not an unchanged prefix.
+    """
+    if not (meta and meta.get("complete") and "steps" in meta):
+        return None
+    n = meta["n_times"]
+    if data.sizes["time"] < n or steps_hash(data, n) != meta["steps"]:
+        return None
+    return np.arange(n, data.sizes["time"])
+
+
+class TemporalReducer:
+    def __init__(self, store_dir=None, row_block=None, time_block=16):
+        # row_block defaults to the y chunk size, so each chunk is read once
+        self.store_dir = Path(store_dir or REDUCTION_DIR)
+        self.row_block = row_block
+        self.time_block = time_block
+
+    def key(self, lineage, data):
+        """Reduction key: what the collection is and the grid it is on."""
+        grid = [list(data.shape[1:]), float(data["y"][0]), float(data["y"][-1]),
+                float(data["x"][0]), float(data["x"][-1])]
+        text = json.dumps({"lineage": lineage, "grid": grid}, sort_keys=True, default=str)
+        return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+    def reduce(self, lineage, data, by=None):
+        """
+        data: DataArray (time, y, x), lazy or in memory, one band.
+        by: a GROUPINGS key to reduce every calendar group in the same pass.
+        Returns the up-to-date Reduction, folding in only new time steps.
+        """
+        if by is not None:
+            lineage = lineage + [["groupBy", by]]
+        reduction = Reduction(self.store_dir / self.key(lineage, data))
+        times = pd.DatetimeIndex(data["time"].values)
+
+        new = new_steps(reduction.meta, data)
+        if new is not None and reduction.meta["last_time"]:
+            if len(new):
+                self._fold(reduction, data, new, len(times), times[-1], by, fresh=False)
+            return reduction
+
+        self._fold(reduction, data, np.arange(len(times)), len(times),
+                   times[-1] if len(times) else None, by, fresh=True)
+        return reduction
+
+    def _fold(self, reduction, data, steps, n_times, last_time, by, fresh):
+        path = reduction.path
+        if fresh:
+            shutil.rmtree(path, ignore_errors=True)
+        path.mkdir(parents=True, exist_ok=True)
+        # Mark incomplete until every row block is folded in
+        meta = {"lineage_key": path.name, "complete": False}
+        with open(path / "meta.json", "w") as f:
+            json.dump(meta, f)
+
+        rows, cols = data.shape[1:]
+        row_block = self.row_block or (data.chunks[1][0] if data.chunks else 512)
+        # Grouped state has a leading group axis; ungrouped is one group
+        # without that axis
+        labels, shape = None, (rows, cols)
+        if by is not None:
+            number, groups = GROUPINGS[by]
+            labels = np.asarray(number(pd.DatetimeIndex(data["time"].values)))
+            shape = (len(groups), rows, cols)
+            meta["groups"] = groups
+        if fresh:
+            for stat in STATS:
+                dtype = np.int32 if stat == "count" else np.float64
+                arr = np.lib.format.open_memmap(path / f"{stat}.npy", mode="w+",
+                                                dtype=dtype, shape=shape)
+                arr[:] = np.nan if stat in ("min", "max") else 0
+                del arr
+        state = {stat: reduction.array(stat, "r+") for stat in STATS}
+        rows_of = (lambda r0, r1: (slice(None), slice(r0, r1))) if labels is not None \
+            else (lambda r0, r1: slice(r0, r1))
+
+        for r0 in range(0, rows, row_block):
+            r1 = min(r0 + row_block, rows)
+            block_state = {k: np.array(v[rows_of(r0, r1)]) for k, v in state.items()}
+            for t0 in range(0, len(steps), self.time_block):
+                idx = steps[t0:t0 + self.time_block]
+                block = np.asarray(data.isel(time=idx, y=slice(r0, r1)).values, dtype=np.float64)
+                if labels is None:
+                    _combine(block_state, block)
+                    continue
+                for g in np.unique(labels[idx]):
+                    _combine({k: v[g] for k, v in block_state.items()}, block[labels[idx] == g])
+            for k, v in state.items():
+                v[rows_of(r0, r1)] = block_state[k]
+        for v in state.values():
+            v.flush()
+        del state
+
+        meta.update(complete=True, n_times=int(n_times), steps=steps_hash(data),
+                    last_time=None if last_time is None else str(last_time))
+        tmp = path / "meta.json.tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path / "meta.json")
+        reduction.meta = meta
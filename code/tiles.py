@@ -0,0 +1,405 @@
+# tiles.py
+#
+# Pre-render map layers into static XYZ tile pyramids, so published maps
+# no longer depend on expiring Earth Engine tile URLs.
+#
+#   python tiles.py maps fire-watch --zoom 0-6 -o tiles            # {z}/{x}/{y}.png + HTML
+#   python tiles.py maps --zoom 0-5 -o tiles --mbtiles             # one .mbtiles per layer
+#   python tiles.py maps fire-watch --data-dir data -o tiles        # local rasters, no EE
+#   python tiles.py maps --data-dir data -o site --dashboard       # plus one dashboard page
+#   python tiles.py local grid.npy --bounds=-180,-90,180,90 --min 0 --max 1 \
+#       --palette white,green -o grid.mbtiles                      # no Earth Engine
+#
+# Tiles are rendered in a pool of workers (threads for Earth Engine,
+# processes for local rasters). Fully transparent tiles are not stored,
+# and a tile whose pixels and format hash to the same value as in the
+# previous export is neither re-encoded nor rewritten (so switching --format
+# rewrites every tile). Tile hashes are kept
+# in <dir>/hashes.json, or in the MBTiles `images` table (tile_id is the
+# hash, so identical tiles are stored once).
+
+import argparse
+import hashlib
+import io
+import json
+import math
+import os
+import sqlite3
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+TILE_SIZE = 256
+MAX_LAT = 85.0511287798
+WORLD = (-180.0, -MAX_LAT, 180.0, MAX_LAT)
+
+
+# -------------------------------------------
+# Tile math (Web Mercator XYZ)
+# -------------------------------------------
+def lonlat_to_tile(lon, lat, z):
+    n = 2 ** z
+    lat = max(-MAX_LAT, min(MAX_LAT, lat))
+    x = (lon + 180.0) / 360.0 * n
+    y = (1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n
+    return min(int(x), n - 1), min(int(y), n - 1)
+
+
+def tiles_for(bounds, zooms):
+    """Every (z, x, y) covering bounds = (west, south, east, north)."""
+    west, south, east, north = bounds
+    for z in zooms:
+        x0, y0 = lonlat_to_tile(west, north, z)
+        x1, y1 = lonlat_to_tile(east, south, z)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                yield z, x, y
+
+
+def pixel_lonlat(z, x, y, size=TILE_SIZE):
+    """Longitudes (size,) and latitudes (size,) of the pixel centres."""
+    n = 2 ** z
+    offsets = (np.arange(size) + 0.5) / size
+    lon = (x + offsets) / n * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + offsets) / n))))
+    return lon, lat
+
+
+# -------------------------------------------
+# Sources: render(z, x, y) -> RGBA uint8 (size, size, 4)
+# -------------------------------------------
+def _palette_lut(colors):
+    """256-entry RGB lookup table interpolated between the palette colours."""
+    from PIL import ImageColor
+    stops = np.array([ImageColor.getrgb(c)[:3] for c in colors], dtype=np.float64)
+    pos = np.linspace(0, len(stops) - 1, 256)
+    return np.stack([np.interp(pos, np.arange(len(stops)), stops[:, k]) for k in range(3)],
+                    axis=1).round().astype(np.uint8)
+
+
+class ArraySource:
+    """
+    A north-up lon/lat grid (rows from north to south) coloured like
+    Earth Engine vis params: values are stretched from min to max over the
+    palette. NaN and cells outside `bounds` are transparent.
+    """
+
+    def __init__(self, data, bounds, vis):
+        self.data = data
+        self.bounds = bounds
+        self.min = vis.get("min", 0.0)
+        self.max = vis.get("max", 1.0)
+        self.lut = _palette_lut(vis.get("palette", ["black", "white"]))
+
+    def render(self, z, x, y):
+        west, south, east, north = self.bounds
+        rows, cols = self.data.shape
+        lon, lat = pixel_lonlat(z, x, y)
+        c = np.floor((lon - west) / (east - west) * cols).astype(np.intp)
+        r = np.floor((north - lat) / (north - south) * rows).astype(np.intp)
+        c_in, r_in = (c >= 0) & (c < cols), (r >= 0) & (r < rows)
+        if not (c_in.any() and r_in.any()):
+            return None
+        # Gather rows, then columns: two 1-D takes instead of a 2-D fancy index
+        values = np.asarray(self.data[np.clip(r, 0, rows - 1)], dtype=np.float32)
+        values = values[:, np.clip(c, 0, cols - 1)]
+        valid = r_in[:, None] & c_in[None, :] & ~np.isnan(values)
+
+        scale = 255.0 / ((self.max - self.min) or 1.0)
+        index = np.clip((np.nan_to_num(values) - self.min) * scale, 0, 255).astype(np.uint8)
+        out = np.empty((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8)
+        out[..., :3] = self.lut[index]
+        out[..., 3] = np.where(valid, 255, 0)
+        return out
+
+
+class UrlSource:
+    """Tiles from an XYZ URL template, e.g. an Earth Engine getMapId URL."""
+
+    def __init__(self, url_format, session=None):
+        import requests
+        self.url_format = url_format
+        self.session = session or requests.Session()
+
+    def render(self, z, x, y):
+        from PIL import Image
+        response = self.session.get(self.url_format.format(z=z, x=x, y=y), timeout=60)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return np.asarray(Image.open(io.BytesIO(response.content)).convert("RGBA"))
+
+
+# -------------------------------------------
+# Writers
+# -------------------------------------------
+class DirectoryWriter:
+    """{root}/{z}/{x}/{y}.{fmt} plus hashes.json."""
+
+    def __init__(self, root, fmt="png"):
+        self.root = root
+        self.fmt = fmt
+        self._index = os.path.join(root, "hashes.json")
+        try:
+            with open(self._index) as f:
+                self.hashes = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.hashes = {}
+
+    def _path(self, z, x, y):
+        return os.path.join(self.root, str(z), str(x), f"{y}.{self.fmt}")
+
+    def put(self, z, x, y, digest, data):
+        path = self._path(z, x, y)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self.hashes[f"{z}/{x}/{y}"] = digest
+
+    def delete(self, z, x, y):
+        if self.hashes.pop(f"{z}/{x}/{y}", None) is not None:
+            try:
+                os.remove(self._path(z, x, y))
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self._index + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.hashes, f)
+        os.replace(tmp, self._index)
+
+
+class MBTilesWriter:
+    """MBTiles 1.3 with the deduplicating map/images schema."""
+
+    def __init__(self, path, fmt="png", name=None, bounds=WORLD, zooms=range(0, 1)):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS map (zoom_level INTEGER, tile_column INTEGER,
+                tile_row INTEGER, tile_id TEXT,
+                PRIMARY KEY (zoom_level, tile_column, tile_row));
+            CREATE TABLE IF NOT EXISTS images (tile_id TEXT PRIMARY KEY, tile_data BLOB);
+            CREATE VIEW IF NOT EXISTS tiles AS
+                SELECT map.zoom_level, map.tile_column, map.tile_row, images.tile_data
+                FROM map JOIN images ON images.tile_id = map.tile_id;
+        """)
+        meta = {
+            "name": name or os.path.splitext(os.path.basename(path))[0],
+            "format": fmt, "type": "overlay", "version": "1.3",
+            "bounds": ",".join(f"{b:g}" for b in bounds),
+            "minzoom": str(min(zooms)), "maxzoom": str(max(zooms)),
+        }
+        self.db.executemany("INSERT OR REPLACE INTO metadata VALUES (?, ?)", meta.items())
+        self.hashes = {
+            f"{z}/{x}/{(1 << z) - 1 - row}": tile_id
+            for z, x, row, tile_id in self.db.execute("SELECT * FROM map")
+        }
+
+    def put(self, z, x, y, digest, data):
+        row = (1 << z) - 1 - y     # MBTiles rows count from the south (TMS)
+        self.db.execute("INSERT OR IGNORE INTO images VALUES (?, ?)", (digest, data))
+        self.db.execute("INSERT OR REPLACE INTO map VALUES (?, ?, ?, ?)", (z, x, row, digest))
+        self.hashes[f"{z}/{x}/{y}"] = digest
+
+    def delete(self, z, x, y):
+        if self.hashes.pop(f"{z}/{x}/{y}", None) is not None:
+            self.db.execute("DELETE FROM map WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                            (z, x, (1 << z) - 1 - y))
+
+    def close(self):
+        self.db.execute("DELETE FROM images WHERE tile_id NOT IN (SELECT tile_id FROM map)")
+        self.db.commit()
+        self.db.close()
+
+
+# -------------------------------------------
+# Export
+# -------------------------------------------
+def _encode(rgba, fmt):
+    from PIL import Image
+    buffer = io.BytesIO()
+    image = Image.fromarray(rgba, "RGBA")
+    if fmt == "webp":
+        image.save(buffer, "WEBP", lossless=True)
+    else:
+        image.save(buffer, "PNG", optimize=False)
+    return buffer.getvalue()
+
+
+_job = {}
+
+
+def _init_job(source, previous, fmt):
+    _job.update(source=source, previous=previous, fmt=fmt)
+
+
+def _render_tile(tile):
+    rgba = _job["source"].render(*tile)
+    if rgba is None or not rgba[..., 3].any():
+        return tile, "empty", None, None
+    # The format is part of the digest: the same pixels in another format
+    # are another tile (and another MBTiles image)
+    digest = hashlib.sha1(_job["fmt"].encode() + rgba.tobytes()).hexdigest()
+    if _job["previous"].get("{}/{}/{}".format(*tile)) == digest:
+        return tile, "unchanged", digest, None
+    return tile, "written", digest, _encode(rgba, _job["fmt"])
+
+
+def export(source, out, zooms=range(0, 7), bounds=WORLD, fmt="png", workers=8, name=None,
+           processes=False):
+    """
+    Render every tile of `zooms` within `bounds` from `source` into `out`
+    (a directory, or a file ending in .mbtiles). Returns a Counter of
+    written / unchanged / empty tiles.
+
+    Threads suit sources that wait on the network; processes=True suits
+    CPU-bound local sources (the source is sent to each worker once).
+    """
+    zooms = list(zooms)
+    if out.endswith(".mbtiles"):
+        writer = MBTilesWriter(out, fmt, name, bounds, zooms)
+    else:
+        writer = DirectoryWriter(out, fmt)
+    initargs = (source, dict(writer.hashes), fmt)
+
+    counts = Counter()
+    try:
+        if processes:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_job,
+                                       initargs=initargs)
+        else:
+            _init_job(*initargs)
+            pool = ThreadPoolExecutor(max_workers=workers)
+        with pool:
+            tiles = tiles_for(bounds, zooms)
+            for tile, status, digest, data in pool.map(_render_tile, tiles, chunksize=16):
+                counts[status] += 1
+                if status == "written":
+                    writer.put(*tile, digest, data)
+                elif status == "empty":
+                    writer.delete(*tile)
+    finally:
+        writer.close()
+    return counts
+
+
+def _local_sources(layers, data_dir):
+    """Tile sources for layers computed by local_backend from data_dir."""
+    from align import ratio_source
+    from layers import evaluate
+    from local_backend import LocalBackend
+    from temporal import TemporalReducer
+
+    # Collection reductions resume from persisted accumulators (temporal.py)
+    backend, memo, sources = LocalBackend(data_dir, reducer=TemporalReducer()), {}, {}
+    for key, layer in layers.items():
+        try:
+            # Ratios of inputs on different grids are aligned first, with
+            # cached overviews per zoom level (align.py)
+            aligned = ratio_source(layer, backend, memo)
+            if aligned is None:
+                image = evaluate(layer.expr, backend, memo)
+                aligned = ArraySource(image.to_numpy(), image.bounds(), layer.vis), image.bounds()
+        except (FileNotFoundError, NotImplementedError) as exc:
+            print(f"⚠️ {layer.name}: skipped ({exc})")
+            continue
+        source, bounds = aligned
+        bounds = (max(bounds[0], WORLD[0]), max(bounds[1], WORLD[1]),
+                  min(bounds[2], WORLD[2]), min(bounds[3], WORLD[3]))
+        sources[key] = (source, bounds)
+    return sources
+
+
+def export_maps(names, out_dir, zooms=range(0, 7), fmt="png", mbtiles=False, workers=8,
+                data_dir=None, dashboard=False):
+    """
+    Export every layer of the named maps (see layers.py), one pyramid per
+    distinct layer under out_dir/<layer key>: from Earth Engine, or computed
+    from local rasters in data_dir (see local_backend.py). Directory
+    pyramids also get map HTML that reads the local tiles (one dashboard
+    for all maps with dashboard=True, see dashboard.py).
+    """
+    from layers import MAPS
+    from render_maps import render, tile_urls
+
+    layers = {layer.key(): layer for name in names for layer in MAPS[name].layers}
+    if data_dir:
+        sources = _local_sources(layers, data_dir)
+    else:
+        urls = tile_urls(list(layers.values()))
+        sources = {key: (UrlSource(url), WORLD) for key, url in urls.items()}
+    local = {}
+    for key, (source, bounds) in sources.items():
+        layer = layers[key]
+        out = os.path.join(out_dir, key + (".mbtiles" if mbtiles else ""))
+        counts = export(source, out, zooms, bounds, fmt, workers, layer.name,
+                        processes=data_dir is not None)
+        print(f"🧱 {layer.name}: {dict(counts)}")
+        local[key] = f"{key}/{{z}}/{{x}}/{{y}}.{fmt}"
+    if not mbtiles:
+        for name in names:
+            missing = [l.name for l in MAPS[name].layers if l.key() not in local]
+            if missing:
+                print(f"⚠️ {name}: no HTML, layers without tiles: {', '.join(missing)}")
+        complete = [n for n in names if all(l.key() in local for l in MAPS[n].layers)]
+        if complete and dashboard:
+            from dashboard import export as export_dashboard
+            export_dashboard(complete, out_dir, urls=local)
+        elif complete:
+            render(complete, out_dir, open_browser=False, urls=local)
+
+
+def _zoom_range(text):
+    lo, _, hi = text.partition("-")
+    return range(int(lo), int(hi or lo) + 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render map layers into XYZ tiles.")
+    parser.add_argument("--zoom", type=_zoom_range, default=range(0, 7), help="e.g. 0-6")
+    parser.add_argument("--format", choices=["png", "webp"], default="png")
+    parser.add_argument("--workers", type=int, default=8)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    maps = sub.add_parser("maps", help="layers of the maps in layers.py")
+    maps.add_argument("names", nargs="*", help="maps to export (default: all)")
+    maps.add_argument("-o", "--out-dir", default="tiles")
+    maps.add_argument("--mbtiles", action="store_true", help="one .mbtiles file per layer")
+    maps.add_argument("--data-dir", help="compute layers from local rasters (local_backend.py) "
+                                         "instead of Earth Engine")
+    maps.add_argument("--dashboard", action="store_true",
+                      help="one dashboard page for all maps (see dashboard.py)")
+
+    local = sub.add_parser("local", help="a lon/lat grid saved with numpy.save")
+    local.add_argument("raster", help=".npy file, rows from north to south")
+    local.add_argument("--bounds", default="-180,-90,180,90", help="west,south,east,north")
+    local.add_argument("--min", type=float, default=0.0)
+    local.add_argument("--max", type=float, default=1.0)
+    local.add_argument("--palette", default="black,white")
+    local.add_argument("-o", "--out", required=True, help="directory or .mbtiles file")
+    args = parser.parse_args()
+
+    if args.command == "maps":
+        from layers import MAPS
+        export_maps(args.names or list(MAPS), args.out_dir, args.zoom, args.format,
+                    args.mbtiles, args.workers, args.data_dir, args.dashboard)
+    else:
+        bounds = tuple(float(v) for v in args.bounds.split(","))
+        vis = {"min": args.min, "max": args.max, "palette": args.palette.split(",")}
+        source = ArraySource(np.load(args.raster), bounds, vis)
+        tile_bounds = (max(bounds[0], WORLD[0]), max(bounds[1], WORLD[1]),
+                       min(bounds[2], WORLD[2]), min(bounds[3], WORLD[3]))
+        counts = export(source, args.out, args.zoom, tile_bounds, args.format, args.workers,
+                        processes=True)
+        print(f"🧱 {args.out}: {dict(counts)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+# zonal.py
+#
+# Statistics per polygon (e.g. mean NDVI, LST and land-cover fractions per
+# protected area) over north-up lon/lat rasters, on local data.
+#
+#   python zonal.py wdpa_polygons.gpkg --id-field WDPAID --data-dir data -o pa_stats.csv
+#
+# The polygon set is rasterized once per raster grid into a zone-id grid
+# (int32, 0 = outside every polygon; later polygons win where they
+# overlap) and cached under <ECO_ZONAL_DIR>, keyed by the polygons and the
+# grid. Rasterizing goes chunk by chunk; an STR-tree over the polygon
+# bounding boxes finds the polygons touching a chunk, so empty chunks (most
+# of the globe, for protected areas) cost nothing. A pixel belongs to a
+# polygon when its centre is inside it, as in rasterio.features.rasterize.
+#
+# Statistics of every zone then come from one bincount pass per raster,
+# chunk by chunk over the non-empty chunks, in a pool of workers.
+
+import argparse
+import hashlib
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ZONAL_DIR = Path(os.environ.get(
+    "ECO_ZONAL_DIR", Path.home() / ".cache" / "eco-climate" / "zones"
+))
+CHUNK = 1024
+
+
+# -------------------------------------------
+# STR-tree
+# -------------------------------------------
+def _str_order(boxes, node_size):
+    """Sort-Tile-Recursive order: vertical slices by x centre, then by y centre."""
+    n = len(boxes)
+    slices = max(1, math.ceil(math.sqrt(math.ceil(n / node_size))))
+    per_slice = slices * node_size
+    cx = (boxes[:, 0] + boxes[:, 2]) / 2
+    cy = (boxes[:, 1] + boxes[:, 3]) / 2
+    by_x = np.argsort(cx, kind="stable")
+    slice_id = np.empty(n, dtype=np.intp)
+    slice_id[by_x] = np.arange(n) // per_slice
+    return np.lexsort((cy, slice_id))
+
+
+class STRTree:
+    """
+    Packed R-tree over bounding boxes (minx, miny, maxx, maxy), built
+    bottom-up with Sort-Tile-Recursive packing; query(box) returns the
+    indices of the boxes intersecting `box`.
+    """
+
+    def __init__(self, boxes, node_size=16):
+        self.node_size = node_size
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        # levels[0] holds the items, each level above one box per group of
+        # node_size consecutive entries below; every level is (boxes in
+        # packed order, item index or group number of each entry)
+        self.levels = []
+        index = np.arange(len(boxes))
+        while True:
+            order = _str_order(boxes, node_size)
+            boxes, index = boxes[order], index[order]
+            self.levels.append((boxes, index))
+            if len(boxes) <= node_size:
+                break
+            starts = np.arange(0, len(boxes), node_size)
+            boxes = np.stack([np.minimum.reduceat(boxes[:, 0], starts),
+                              np.minimum.reduceat(boxes[:, 1], starts),
+                              np.maximum.reduceat(boxes[:, 2], starts),
+                              np.maximum.reduceat(boxes[:, 3], starts)], axis=1)
+            index = np.arange(len(boxes))
+
+    @staticmethod
+    def _hits(boxes, box):
+        return ((boxes[:, 0] <= box[2]) & (boxes[:, 2] >= box[0])
+                & (boxes[:, 1] <= box[3]) & (boxes[:, 3] >= box[1]))
+
+    def query(self, box):
+        boxes, _ = self.levels[-1]
+        hit = np.flatnonzero(self._hits(boxes, box))
+        for level in range(len(self.levels) - 1, 0, -1):
+            # A node's children are the node_size consecutive entries of
+            # the level below, starting at its group number * node_size
+            groups = self.levels[level][1][hit]
+            children = (groups[:, None] * self.node_size + np.arange(self.node_size)).ravel()
+            lower, _ = self.levels[level - 1]
+            children = children[children < len(lower)]
+            hit = children[self._hits(lower[children], box)]
+        return np.sort(self.levels[0][1][hit])
+
+
+# -------------------------------------------
+# Rasterization
+# -------------------------------------------
+def _rings_of(geometry):
+    """Rings of a shapely Polygon or MultiPolygon as (n, 2) arrays."""
+    if geometry is None or geometry.is_empty:
+        return []
+    if geometry.geom_type == "MultiPolygon":
+        return [ring for part in geometry.geoms for ring in _rings_of(part)]
+    if geometry.geom_type != "Polygon":
+        return []
+    return [np.asarray(r.coords)[:, :2] for r in (geometry.exterior, *geometry.interiors)]
+
+
+def read_polygons(path, id_field=None):
+    """(ids, polygons) from a vector file; a polygon is a list of rings."""
+    import geopandas  # optional, only needed to read vector files
+
+    frame = geopandas.read_file(path)
+    if frame.crs is not None and not frame.crs.is_geographic:
+        frame = frame.to_crs(4326)
+    ids = frame[id_field].tolist() if id_field else list(frame.index)
+    return ids, [_rings_of(g) for g in frame.geometry]
+
+
+def _edges(polygons):
+    """
+    (x0, y0, x1, y1) of every ring edge of every polygon, rings closed
+    implicitly, and the offset of each polygon's first edge.
+    """
+    rings = [ring for rings in polygons for ring in rings if len(ring) > 2]
+    counts = np.array([sum(len(r) for r in rings if len(r) > 2) for rings in polygons],
+                      dtype=np.intp)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    if not rings:
+        return np.empty((0, 4)), offsets
+    points = np.concatenate(rings).astype(np.float64)
+    lengths = np.array([len(r) for r in rings])
+    following = np.arange(len(points)) + 1
+    ends = np.cumsum(lengths)
+    following[ends - 1] = ends - lengths      # last point closes back to the first
+    return np.hstack([points, points[following]]), offsets
+
+
+def _boxes(edges, offsets):
+    """Bounding box of each polygon; empty polygons get an inverted box."""
+    boxes = np.tile([np.inf, np.inf, -np.inf, -np.inf], (len(offsets) - 1, 1))
+    present = np.flatnonzero(offsets[1:] > offsets[:-1])
+    if len(present):
+        starts = offsets[present]
+        xs, ys = edges[:, [0, 2]].min(axis=1), edges[:, [1, 3]].min(axis=1)
+        boxes[present, 0] = np.minimum.reduceat(xs, starts)
+        boxes[present, 1] = np.minimum.reduceat(ys, starts)
+        boxes[present, 2] = np.maximum.reduceat(edges[:, [0, 2]].max(axis=1), starts)
+        boxes[present, 3] = np.maximum.reduceat(edges[:, [1, 3]].max(axis=1), starts)
+    return boxes
+
+
+def _burn(out, window, edges, box, zone, grid):
+    """
+    Set the pixels of `out` (the grid rows/cols given by `window`) whose
+    centre lies inside the polygon to `zone`, even-odd rule, scanline by
+    scanline: every edge crossing toggles the pixels to its right.
+    """
+    west, south, east, north, rows, cols = grid
+    dx, dy = (east - west) / cols, (north - south) / rows
+    (r0, r1), (c0, c1) = window
+    i0 = max(r0, math.ceil((north - box[3]) / dy - 0.5))
+    i1 = min(r1 - 1, math.floor((north - box[1]) / dy - 0.5))
+    j0 = max(c0, math.ceil((box[0] - west) / dx - 0.5))
+    j1 = min(c1 - 1, math.floor((box[2] - west) / dx - 0.5))
+    if i1 < i0 or j1 < j0:
+        return
+    height, width = i1 - i0 + 1, j1 - j0 + 1
+    yc = north - (np.arange(i0, i1 + 1) + 0.5) * dy
+    x0, y0, x1, y1 = edges.T
+    e, r = np.nonzero((y0[:, None] > yc) != (y1[:, None] > yc))
+    if not len(e):
+        return
+    x = x0[e] + (yc[r] - y0[e]) * (x1[e] - x0[e]) / (y1[e] - y0[e])
+    col = np.minimum(np.maximum(np.ceil((x - west) / dx - 0.5).astype(np.intp), j0), j1 + 1) - j0
+    toggles = np.bincount(r * (width + 1) + col, minlength=height * (width + 1))
+    inside = np.cumsum(toggles.reshape(height, width + 1), axis=1)[:, :width] % 2 == 1
+    out[i0 - r0:i1 - r0 + 1, j0 - c0:j1 - c0 + 1][inside] = zone
+
+
+class ZoneGrid:
+    """A cached zone-id grid; see rasterize()."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path / "meta.json") as f:
+            self.meta = json.load(f)
+
+    @property
+    def zones(self):
+        return np.load(self.path / "zones.npy", mmap_mode="r")
+
+    @property
+    def ids(self):
+        """Polygon id of zone 1, 2, ..."""
+        return self.meta["ids"]
+
+    def windows(self):
+        """(rows, cols) slices of the chunks that contain any zone."""
+        size, (rows, cols) = self.meta["chunk"], self.meta["grid"][4:]
+        return [((r0, min(r0 + size, rows)), (c0, min(c0 + size, cols)))
+                for r0, c0 in self.meta["chunks"]]
+
+    def stats(self, raster, workers=4, processes=False):
+        """count, mean and std of `raster` (same grid, NaN = no data) per zone."""
+        count, total, squares = _run(self, raster, "moments", None, workers, processes)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / count
+            std = np.sqrt(np.maximum(squares - count * mean ** 2, 0) / (count - 1))
+        return pd.DataFrame({"count": count, "mean": mean, "std": std},
+                            index=pd.Index(self.ids, name="id"))
+
+    def fractions(self, raster, classes, workers=4, processes=False):
+        """Share of each class value of a categorical `raster` per zone."""
+        classes = np.asarray(sorted(classes))
+        counts = _run(self, raster, "classes", classes, workers, processes)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            shares = counts / counts.sum(axis=1, keepdims=True)
+        return pd.DataFrame(shares, columns=[c.item() for c in classes],
+                            index=pd.Index(self.ids, name="id"))
+
+
+def grid_of(image):
+    """(west, south, east, north, rows, cols) of a local_backend Image."""
+    rows, cols = image.ds["y"].size, image.ds["x"].size
+    return (*(float(b) for b in image.bounds()), rows, cols)
+
+
+def rasterize(polygons, grid, ids=None, store_dir=None, chunk=CHUNK):
+    """
+    Zone-id grid of `polygons` (lists of lon/lat rings) on grid = (west,
+    south, east, north, rows, cols), rows from north to south. Zone i + 1 is
+    polygons[i]; the result is cached for these polygons on this grid.
+    """
+    ids = list(range(len(polygons))) if ids is None else [getattr(i, "item", lambda: i)() for i in ids]
+    digest = hashlib.sha1(json.dumps([list(grid), chunk, [str(i) for i in ids]]).encode())
+    for rings in polygons:
+        for ring in rings:
+            digest.update(np.ascontiguousarray(ring, dtype=np.float64).tobytes())
+        digest.update(b"|")
+    path = Path(store_dir or ZONAL_DIR) / digest.hexdigest()[:16]
+    if (path / "meta.json").exists():
+        return ZoneGrid(path)
+
+    edges, offsets = _edges(polygons)
+    boxes = _boxes(edges, offsets)
+    tree = STRTree(boxes)
+
+    west, south, east, north, rows, cols = grid
+    dx, dy = (east - west) / cols, (north - south) / rows
+    path.mkdir(parents=True, exist_ok=True)
+    zones = np.lib.format.open_memmap(path / "zones.npy.tmp", mode="w+", dtype=np.int32,
+                                      shape=(rows, cols))
+    filled = []
+    for r0 in range(0, rows, chunk):
+        r1 = min(r0 + chunk, rows)
+        for c0 in range(0, cols, chunk):
+            c1 = min(c0 + chunk, cols)
+            box = (west + c0 * dx, north - r1 * dy, west + c1 * dx, north - r0 * dy)
+            candidates = tree.query(box)
+            if not len(candidates):
+                continue
+            out = np.zeros((r1 - r0, c1 - c0), dtype=np.int32)
+            # Ascending order, so later polygons win where they overlap
+            for i in candidates:
+                _burn(out, ((r0, r1), (c0, c1)), edges[offsets[i]:offsets[i + 1]], boxes[i],
+                      i + 1, grid)
+            if out.any():
+                zones[r0:r1, c0:c1] = out
+                filled.append([r0, c0])
+    zones.flush()
+    del zones
+    os.replace(path / "zones.npy.tmp", path / "zones.npy")
+    meta = {"grid": list(grid), "chunk": chunk, "chunks": filled, "ids": ids}
+    with open(path / "meta.json", "w") as f:
+        json.dump(meta, f, default=str)
+    return ZoneGrid(path)
+
+
+# -------------------------------------------
+# Statistics
+# -------------------------------------------
+_job = {}
+
+
+def _init_job(zones_path, raster, kind, classes, n_zones):
+    _job.update(zones=np.load(zones_path, mmap_mode="r"), raster=raster, kind=kind,
+                classes=classes, n_zones=n_zones)
+
+
+def _chunk(window):
+    (r0, r1), (c0, c1) = window
+    zones = np.asarray(_job["zones"][r0:r1, c0:c1]).ravel()
+    values = np.asarray(_job["raster"][r0:r1, c0:c1], dtype=np.float64).ravel()
+    keep = (zones > 0) & ~np.isnan(values)
+    zones, values = zones[keep], values[keep]
+    n = _job["n_zones"] + 1
+    if _job["kind"] == "moments":
+        return np.stack([np.bincount(zones, minlength=n),
+                         np.bincount(zones, weights=values, minlength=n),
+                         np.bincount(zones, weights=values * values, minlength=n)])
+    classes = _job["classes"]
+    index = np.clip(np.searchsorted(classes, values), 0, len(classes) - 1)
+    known = classes[index] == values
+    return np.bincount(zones[known] * len(classes) + index[known],
+                       minlength=n * len(classes)).reshape(n, len(classes))
+
+
+def _run(grid, raster, kind, classes, workers, processes):
+    """
+    Sum of the per-chunk bincounts over every non-empty chunk, zone 0
+    dropped. A (lazy) DataArray raster is only read window by window.
+    """
+    if raster.shape != tuple(grid.meta["grid"][4:]):
+        raise ValueError(f"Raster shape {raster.shape} does not match the zone grid "
+                         f"{tuple(grid.meta['grid'][4:])}")
+    initargs = (grid.path / "zones.npy", raster, kind, classes, len(grid.ids))
+    if processes:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_job, initargs=initargs)
+    else:
+        _init_job(*initargs)
+        pool = ThreadPoolExecutor(max_workers=workers)
+    total = None
+    with pool:
+        for part in pool.map(_chunk, grid.windows()):
+            total = part if total is None else total + part
+    if total is None:   # no polygon covers the grid
+        n = len(grid.ids) + 1
+        total = np.zeros((3, n)) if kind == "moments" else np.zeros((n, len(classes)), np.int64)
+    return total[:, 1:] if kind == "moments" else total[1:]
+
+
+# -------------------------------------------
+# Protected areas
+# -------------------------------------------
+WORLDCOVER_CLASSES = (10, 20, 30, 40, 50, 60, 70, 80, 90, 95, 100)
+
+
+def protected_area_stats(ids, polygons, data_dir=None, workers=4):
+    """Mean NDVI, mean LST (°C) and WorldCover fractions per polygon."""
+    from layers import LST_DAY, NDVI, WORLDCOVER_2020, evaluate
+    from local_backend import LocalBackend
+    from temporal import TemporalReducer
+
+    backend, memo = LocalBackend(data_dir, reducer=TemporalReducer()), {}
+    columns = []
+    for name, expr in [("ndvi", NDVI.mean()),
+                       ("lst_c", LST_DAY.mean().multiply(0.02).subtract(273.15)),
+                       ("worldcover", WORLDCOVER_2020)]:
+        try:
+            image = evaluate(expr, backend, memo)
+        except (FileNotFoundError, NotImplementedError) as exc:
+            print(f"⚠️ {name}: skipped ({exc})")
+            continue
+        zones = rasterize(polygons, grid_of(image), ids)
+        values = image.north_up()   # lazy: read chunk by chunk in the pass below
+        if name == "worldcover":
+            fractions = zones.fractions(values, WORLDCOVER_CLASSES, workers)
+            columns.append(fractions.add_prefix("worldcover_"))
+        else:
+            stats = zones.stats(values, workers)
+            columns.append(stats[["mean", "std"]].add_prefix(f"{name}_"))
+            columns.append(stats[["count"]].rename(columns={"count": f"{name}_pixels"}))
+    return pd.concat(columns, axis=1) if columns else pd.DataFrame(index=pd.Index(ids, name="id"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NDVI, LST and land cover per protected area.")
+    parser.add_argument("polygons", help="vector file readable by geopandas, lon/lat")
+    parser.add_argument("--id-field", default=None, help="column identifying each polygon")
+    parser.add_argument("--data-dir", default=None)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("-o", "--output", default="protected_area_stats.csv")
+    args = parser.parse_args()
+
+    ids, polygons = read_polygons(args.polygons, args.id_field)
+    print(f"🧮 {len(polygons)} polygons from {args.polygons}")
+    table = protected_area_stats(ids, polygons, args.data_dir, args.workers)
+    table.to_csv(args.output)
+    print(f"✅ Statistics for {len(table)} zones saved as {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# conftest.py
+#
+# Puts the script folders on sys.path and provides `archive`, a local
+# stub of the Open-Meteo archive API (http.server on a free port).
+
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT / "Weather forecast"), str(ROOT / "code")]
+
+
+def stub_value(variable, latitude, time):
+    """What the stub returns for one variable, location and timestamp."""
+    if variable.startswith(("precipitation", "rain")) and time.day % 3:
+        return 0.0     # dry two days in three
+    seed = sum(map(ord, variable)) % 17
+    return round(seed + latitude + (time.dayofyear + time.hour / 24) / 10, 3)
+
+
+class ArchiveStub:
+    """
+    Answers archive requests like the real API: one object per coordinate
+    (a list for comma-separated coordinates), `lag` days of trailing nulls
+    before `today`, and nulls throughout for the variables in `empty`.
+    Every request's parsed query is kept in `requests`.
+    """
+
+    def __init__(self, today="2024-03-20", lag=2):
+        self.today, self.lag = pd.Timestamp(today), lag
+        self.empty = set()
+        self.requests = []
+
+    def payload(self, query):
+        frequency = "hourly" if "hourly" in query else "daily"
+        variables = query[frequency].split(",")
+        start, end = pd.Timestamp(query["start_date"]), pd.Timestamp(query["end_date"])
+        freq = "h" if frequency == "hourly" else "D"
+        times = pd.date_range(start, end + pd.Timedelta(days=1), freq=freq, inclusive="left")
+        last = self.today - pd.Timedelta(days=self.lag)
+        items = []
+        for lat, lon in zip(query["latitude"].split(","), query["longitude"].split(",")):
+            block = {"time": [t.strftime("%Y-%m-%dT%H:%M") for t in times]}
+            for var in variables:
+                block[var] = [None if var in self.empty or t >= last
+                              else stub_value(var, float(lat), t) for t in times]
+            items.append({"latitude": float(lat), "longitude": float(lon), frequency: block})
+        return items[0] if len(items) == 1 else items
+
+
+@pytest.fixture
+def archive():
+    """(ArchiveStub, url) of a stub archive running for one test."""
+    stub = ArchiveStub()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+            stub.requests.append(query)
+            body = json.dumps(stub.payload(query)).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield stub, f"http://127.0.0.1:{server.server_address[1]}/v1/archive"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,53 @@
+from dataclasses import replace
+
+import pandas as pd
+import pytest
+
+import model_store
+from fleet import run_fleet
+from pipelines import PIPELINES
+
+SITES = pd.DataFrame({"name": ["amsterdam", "utrecht", "groningen"],
+                      "latitude": [52.37, 52.09, 53.22],
+                      "longitude": [4.89, 5.12, 6.57]})
+
+
+@pytest.fixture
+def fleet(archive, tmp_path, monkeypatch):
+    _, url = archive
+    monkeypatch.setenv("ECO_MODEL_DIR", str(tmp_path / "models"))
+    monkeypatch.setattr(model_store, "MODEL_DIR", tmp_path / "models")
+    # Small forests; forked workers see the patched pipeline too
+    pipeline = PIPELINES["daily_precip"]
+    pipeline = replace(pipeline, rf_params={**pipeline.rf_params, "n_estimators": 10})
+    monkeypatch.setitem(PIPELINES, "daily_precip", pipeline)
+    return lambda sites=SITES: run_fleet(
+        sites, pipeline, "2024-02-29", workers=2, start_date="2023-09-01",
+        cache_dir=tmp_path / "open-meteo", url=url)
+
+
+def test_sites_are_fetched_in_one_batched_request(archive, fleet):
+    stub, _ = archive
+    fleet()
+    (query,) = stub.requests
+    assert query["latitude"].split(",") == [str(v) for v in SITES["latitude"]]
+    assert query["longitude"].split(",") == [str(v) for v in SITES["longitude"]]
+    assert query["timezone"] == "UTC" and "hourly" in query
+
+    fleet()
+    assert len(stub.requests) == 1     # the hourly store serves the rerun
+
+
+def test_one_row_per_site(fleet):
+    table = fleet()
+    pipeline = PIPELINES["daily_precip"]
+    assert list(table.index) == list(SITES["name"])
+    assert (table["time"] == pd.Timestamp("2024-03-01")).all()
+    assert table[["latitude", "longitude"]].to_numpy().tolist() == \
+        SITES[["latitude", "longitude"]].to_numpy().tolist()
+    for target in pipeline.targets:
+        column = f"{target}_prob" if target == "rain_flag" else f"{target}_pred"
+        assert table[column].notna().all()
+    assert table["rain_flag_prob"].between(0, 1).all()
+    assert (table["precip_sum_pred"] >= 0).all()
+
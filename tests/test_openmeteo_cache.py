@@ -0,0 +1,82 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import stub_value
+from openmeteo_cache import fetch_archive
+
+LAT, LON = 52.37, 4.89
+VARIABLES = ["temperature_2m_max", "precipitation_sum"]
+
+
+def _values(variable, days):
+    return np.array([stub_value(variable, LAT, t) for t in days])
+
+
+def _ranges(cache_dir):
+    (path,) = cache_dir.glob("*/daily/ranges.json")
+    return {k: tuple(v) for k, v in json.loads(path.read_text()).items()}
+
+
+@pytest.fixture
+def fetch(archive, tmp_path):
+    _, url = archive
+    return lambda start, end, variables=VARIABLES: fetch_archive(
+        LAT, LON, start, end, variables, cache_dir=tmp_path, url=url)
+
+
+def test_first_fetch_stores_month_files(archive, fetch, tmp_path):
+    stub, _ = archive
+    df = fetch("2024-01-01", "2024-02-29")
+    days = pd.date_range("2024-01-01", "2024-02-29")
+    assert len(stub.requests) == 1
+    assert stub.requests[0]["start_date"] == "2024-01-01"
+    assert list(df.columns) == VARIABLES
+    assert df.index.equals(pd.DatetimeIndex(days, name="time"))
+    np.testing.assert_allclose(df["precipitation_sum"], _values("precipitation_sum", days))
+    months = sorted(p.stem for p in tmp_path.glob("*/daily/precipitation_sum/*.parquet"))
+    assert months == ["2024-01", "2024-02"]
+
+    fetch("2024-01-01", "2024-02-29")
+    fetch("2024-01-15", "2024-02-10")
+    assert len(stub.requests) == 1     # served from disk
+
+
+def test_tail_refetch_merges_into_month(archive, fetch):
+    stub, _ = archive
+    fetch("2024-01-01", "2024-02-10")
+    df = fetch("2024-01-01", "2024-03-05")
+    assert len(stub.requests) == 2
+    assert (stub.requests[1]["start_date"], stub.requests[1]["end_date"]) == ("2024-02-11",
+                                                                              "2024-03-05")
+    days = pd.date_range("2024-01-01", "2024-03-05")
+    # February was written by both requests and merged
+    np.testing.assert_allclose(df["temperature_2m_max"], _values("temperature_2m_max", days))
+
+
+def test_trailing_nulls_are_fetched_again(archive, fetch, tmp_path):
+    stub, _ = archive          # data until 2024-03-17, nulls after
+    df = fetch("2024-03-01", "2024-03-20")
+    assert df.loc["2024-03-18":, "precipitation_sum"].isna().all()
+    assert df.loc[:"2024-03-17", "precipitation_sum"].notna().all()
+    assert _ranges(tmp_path)["precipitation_sum"][1].startswith("2024-03-17")
+
+    stub.today = pd.Timestamp("2024-03-30")
+    df = fetch("2024-03-01", "2024-03-20")
+    assert stub.requests[-1]["start_date"] == "2024-03-18"
+    days = pd.date_range("2024-03-01", "2024-03-20")
+    np.testing.assert_allclose(df["precipitation_sum"], _values("precipitation_sum", days))
+
+
+def test_variable_without_values_is_not_fetched_again(archive, fetch, tmp_path):
+    stub, _ = archive
+    stub.empty = {"snowfall_sum"}
+    variables = VARIABLES + ["snowfall_sum"]
+    df = fetch("2024-01-01", "2024-02-29", variables)
+    assert df["snowfall_sum"].isna().all()
+    assert _ranges(tmp_path)["snowfall_sum"] == _ranges(tmp_path)["precipitation_sum"]
+
+    fetch("2024-01-01", "2024-02-29", variables)
+    assert len(stub.requests) == 1
@@ -0,0 +1,114 @@
+import dask.array
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+from matplotlib.path import Path as MplPath
+
+from zonal import rasterize
+
+# Non-round pixel size, so pixel centres do not line up with vertices
+GRID = (-20.0, -15.0, 17.3, 21.1, 180, 200)
+
+
+def star(rng, cx, cy, radius, points):
+    """A star-shaped ring around (cx, cy): simple, but not convex."""
+    angles = np.sort(rng.uniform(0, 2 * np.pi, points))
+    radii = radius * rng.uniform(0.4, 1.0, points)
+    return np.column_stack([cx + radii * np.cos(angles), cy + radii * np.sin(angles)])
+
+
+def synthetic_polygons(n, seed=0):
+    """Overlapping polygons of 1-3 rings, some sticking out of GRID."""
+    west, south, east, north = GRID[:4]
+    rng = np.random.default_rng(seed)
+    polygons = []
+    for _ in range(n):
+        cx, cy = rng.uniform(west - 2, east + 2), rng.uniform(south - 2, north + 2)
+        radius = rng.uniform(0.2, 3)
+        rings = [star(rng, cx, cy, radius, rng.integers(3, 40))]
+        # Holes on opposite sides of the centre, inside the outer ring
+        angle = rng.uniform(0, 2 * np.pi)
+        for k in range(rng.integers(0, 3)):
+            a = angle + k * np.pi
+            hx, hy = cx + 0.2 * radius * np.cos(a), cy + 0.2 * radius * np.sin(a)
+            rings.append(star(rng, hx, hy, 0.15 * radius, rng.integers(3, 12))[::-1])
+        polygons.append(rings)
+    return polygons
+
+
+def reference_zones(polygons):
+    """Zone ids by even-odd point-in-ring tests at every pixel centre."""
+    west, south, east, north, rows, cols = GRID
+    dx, dy = (east - west) / cols, (north - south) / rows
+    yc, xc = np.meshgrid(north - (np.arange(rows) + 0.5) * dy,
+                         west + (np.arange(cols) + 0.5) * dx, indexing="ij")
+    centres = np.column_stack([xc.ravel(), yc.ravel()])
+    zones = np.zeros(rows * cols, dtype=np.int32)
+    for i, rings in enumerate(polygons):
+        inside = np.zeros(len(centres), dtype=bool)
+        for ring in rings:
+            inside ^= MplPath(ring).contains_points(centres)
+        zones[inside] = i + 1   # later polygons win
+    return zones.reshape(rows, cols)
+
+
+@pytest.fixture(scope="module")
+def polygons():
+    return synthetic_polygons(300)
+
+
+@pytest.fixture
+def zone_grid(polygons, tmp_path):
+    # Small chunks, so polygons cross chunk edges
+    return rasterize(polygons, GRID, store_dir=tmp_path, chunk=64)
+
+
+@pytest.mark.parametrize("seed", [0, 7])
+def test_rasterize_matches_point_in_polygon(seed, tmp_path):
+    polygons = synthetic_polygons(300, seed)
+    zones = np.asarray(rasterize(polygons, GRID, store_dir=tmp_path, chunk=64).zones)
+    expected = reference_zones(polygons)
+    assert expected.any() and (expected == 0).any()
+    np.testing.assert_array_equal(zones, expected)
+
+
+def test_rasterize_is_cached(polygons, zone_grid, tmp_path):
+    again = rasterize(polygons, GRID, store_dir=tmp_path, chunk=64)
+    assert again.path == zone_grid.path
+
+
+def _brute_force_stats(zones, raster, n):
+    rows = []
+    for zone in range(1, n + 1):
+        values = raster[(zones == zone) & ~np.isnan(raster)]
+        rows.append((len(values), values.mean() if len(values) else np.nan,
+                     values.std(ddof=1) if len(values) > 1 else np.nan))
+    return pd.DataFrame(rows, columns=["count", "mean", "std"])
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_stats_match_brute_force(polygons, zone_grid, lazy):
+    rng = np.random.default_rng(1)
+    raster = rng.normal(20, 5, GRID[4:])
+    raster[rng.random(raster.shape) < 0.1] = np.nan
+    source = raster
+    if lazy:
+        source = xr.DataArray(dask.array.from_array(raster, chunks=50), dims=("y", "x"))
+    stats = zone_grid.stats(source, workers=2)
+    expected = _brute_force_stats(reference_zones(polygons), raster, len(polygons))
+    np.testing.assert_array_equal(stats["count"].to_numpy(), expected["count"].to_numpy())
+    np.testing.assert_allclose(stats["mean"].to_numpy(), expected["mean"].to_numpy(), rtol=1e-9)
+    np.testing.assert_allclose(stats["std"].to_numpy(), expected["std"].to_numpy(), rtol=1e-6)
+
+
+def test_fractions_match_brute_force(polygons, zone_grid):
+    classes = (10, 20, 30)
+    raster = np.random.default_rng(2).choice([10, 20, 30, 99], GRID[4:]).astype(float)
+    fractions = zone_grid.fractions(raster, classes, workers=2)
+    zones = reference_zones(polygons)
+    for zone in np.unique(zones[zones > 0])[:50]:
+        values = raster[zones == zone]
+        known = values[np.isin(values, classes)]
+        for c in classes:
+            assert fractions.iloc[zone - 1][c] == pytest.approx(np.mean(known == c))
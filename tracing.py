@@ -0,0 +1,329 @@
+# tracing.py
+#
+# Stage timings and memory for the forecast and map pipelines, written as
+# a Chrome trace (chrome://tracing or https://ui.perfetto.dev) plus a
+# summary table. Tracing is off unless ECO_TRACE is set:
+#
+#   ECO_TRACE=trace.json python climate_cli.py forecast daily-temp
+#   ECO_TRACE=trace.json ECO_TRACE_MEMORY=1 python climate_cli.py map fire-watch
+#   python tracing.py -o trace.json "Weather forecast/Amsterdam_forecast_daily.py"
+#   python tracing.py --summary trace.json        # the table of an existing trace
+#
+# The pipeline modules do not import this file. When tracing is enabled,
+# the stages listed in STAGES (the Open-Meteo fetch, feature construction,
+# forest fitting and prediction, the recursive forecast loop, reductions,
+# tile URLs and map HTML) are wrapped in spans as their modules are
+# imported; when it is not, nothing is wrapped and the only cost is the
+# ECO_TRACE lookup in climate_cli.py. span() can also be used directly and
+# is a shared no-op context manager while tracing is off.
+#
+# Every span records wall and CPU time (process CPU, so threads started by
+# the stage count), the growth of the process' peak RSS and, with
+# ECO_TRACE_MEMORY=1 (tracemalloc, which slows Python code down noticeably),
+# the peak of Python allocations above what was allocated when the span
+# began, plus row/byte counts where
+# the stage has them. Spans in worker processes are not collected.
+
+import argparse
+import atexit
+import contextlib
+import functools
+import importlib.abc
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:   # Windows: no peak RSS
+    resource = None
+
+_state = {"enabled": False, "memory": False, "path": None, "origin": 0.0}
+_events = []
+_local = threading.local()
+_NOOP = contextlib.nullcontext()
+
+
+# -------------------------------------------
+# Spans
+# -------------------------------------------
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)   # bytes on macOS
+
+
+class _Span:
+    def __init__(self, name, args):
+        self.name, self.args = name, args
+
+    def __enter__(self):
+        stack = _local.__dict__.setdefault("stack", [])
+        stack.append(self)
+        self.rss = _peak_rss_mb()
+        if _state["memory"]:
+            # tracemalloc keeps one global peak: remember the enclosing
+            # span's peak so far, then restart the peak at the current traced
+            # size, which this span's peak is measured from
+            current, peak = tracemalloc.get_traced_memory()
+            if len(stack) > 1:
+                parent = stack[-2]
+                parent.py_peak = max(parent.py_peak, peak)
+            tracemalloc.reset_peak()
+            self.py_start = self.py_peak = current
+        self.cpu = time.process_time()
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.t0
+        cpu = time.process_time() - self.cpu
+        stack = _local.stack
+        stack.pop()
+        args = {k: v for k, v in self.args.items() if v is not None}
+        args["cpu_ms"] = round(1000 * cpu, 3)
+        rss = _peak_rss_mb()
+        if rss is not None:
+            args["peak_rss_mb"] = round(rss, 1)
+            args["rss_growth_mb"] = round(rss - self.rss, 1)
+        if _state["memory"]:
+            self.py_peak = max(self.py_peak, tracemalloc.get_traced_memory()[1])
+            args["py_peak_mb"] = round((self.py_peak - self.py_start) / 2 ** 20, 2)
+            if stack:
+                stack[-1].py_peak = max(stack[-1].py_peak, self.py_peak)
+        if exc[0] is not None:
+            args["error"] = exc[0].__name__
+        _events.append({
+            "name": self.name, "cat": self.name.split(".")[0], "ph": "X",
+            "ts": round(1e6 * (self.t0 - _state["origin"]), 1), "dur": round(1e6 * wall, 1),
+            "pid": os.getpid(), "tid": threading.get_native_id(), "args": args,
+        })
+        return False
+
+    def count(self, **counts):
+        """Add row/byte counts known only inside the span."""
+        self.args.update(counts)
+
+
+def span(name, **args):
+    """Context manager timing `name`; a no-op while tracing is off."""
+    if not _state["enabled"]:
+        return _NOOP
+    return _Span(name, args)
+
+
+def traced(fn, name, counts=None):
+    """fn wrapped in a span; counts(args, kwargs, result) -> {name: number}."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _state["enabled"]:
+            return fn(*args, **kwargs)
+        with _Span(name, {}) as s:
+            result = fn(*args, **kwargs)
+            if counts is not None:
+                try:
+                    s.count(**counts(args, kwargs, result))
+                except Exception:   # a count must never break the stage
+                    pass
+            return result
+    wrapper.__traced__ = True
+    return wrapper
+
+
+# -------------------------------------------
+# Pipeline stages
+# -------------------------------------------
+def _len(obj):
+    try:
+        return len(obj)
+    except TypeError:
+        return None
+
+
+def _result_rows(args, kwargs, result):
+    return {"rows": _len(result)}
+
+
+def _input_rows(args, kwargs, result):
+    X = args[1] if len(args) > 1 else kwargs.get("X")
+    return {"rows": _len(X), "bytes": getattr(X, "nbytes", None)}
+
+
+def _response_bytes(args, kwargs, result):
+    if kwargs.get("stream"):
+        return {"bytes": int(result.headers.get("Content-Length", 0)) or None}
+    return {"bytes": len(result.content), "status": result.status_code}
+
+
+def _data_bytes(args, kwargs, result):
+    data = args[2] if len(args) > 2 else kwargs.get("data")
+    return {"bytes": getattr(data, "nbytes", None)}
+
+
+# module: [(attribute, span name, counts)], wrapped when the module is imported
+STAGES = {
+    "requests.sessions": [("Session.send", "fetch.http", _response_bytes)],
+    "openmeteo_cache": [("fetch_archive", "fetch.archive", _result_rows)],
+    "pipelines": [("Pipeline.load", "fetch.load", _result_rows),
+                  ("Pipeline.features", "features", _result_rows)],
+    "model_store": [("fit_or_load", "fit.fit_or_load", None)],
+    "sklearn.ensemble._forest": [("BaseForest.fit", "fit.forest", _input_rows),
+                                 ("ForestRegressor.predict", "predict.forest", _input_rows),
+                                 ("ForestClassifier.predict_proba", "predict.forest",
+                                  _input_rows)],
+    "flat_forest": [("FlatForest.predict", "predict.flat", _input_rows)],
+    "recursive": [("RecursiveForecaster.forecast", "forecast.recursive", _result_rows)],
+    "temporal": [("TemporalReducer.reduce", "reduce.temporal", _data_bytes)],
+    "fire": [("FireReducer.reduce", "reduce.fire", _data_bytes)],
+    "ee.image": [("Image.getMapId", "maps.getMapId", None)],
+    "render_maps": [("tile_urls", "maps.tile_urls", None), ("render", "maps.render", None)],
+    "geemap.foliumap": [("Map.to_html", "maps.to_html", None)],
+    "tiles": [("export", "maps.tiles", None)],
+    "dashboard": [("export", "maps.dashboard", None)],
+}
+
+
+def _wrap_stages(module):
+    for attribute, name, counts in STAGES.get(module.__name__, ()):
+        owner_name, _, attr = attribute.rpartition(".")
+        owner = getattr(module, owner_name) if owner_name else module
+        fn = owner.__dict__.get(attr) if owner_name else getattr(module, attr, None)
+        if fn is None or getattr(fn, "__traced__", False):
+            continue
+        setattr(owner, attr, traced(fn, name, counts))
+
+
+class _StageFinder(importlib.abc.MetaPathFinder):
+    """Wraps the stages of a STAGES module right after it is executed."""
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname not in STAGES:
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is None or not hasattr(spec.loader, "exec_module"):
+            return spec
+        exec_module = spec.loader.exec_module
+
+        def exec_and_wrap(module):
+            exec_module(module)
+            _wrap_stages(module)
+
+        spec.loader.exec_module = exec_and_wrap
+        return spec
+
+
+def enable(path=None, memory=False):
+    """Start tracing; the trace is written to `path` (if given) at exit."""
+    if _state["enabled"]:
+        return
+    _state.update(enabled=True, memory=memory, path=path, origin=time.perf_counter())
+    if memory:
+        tracemalloc.start()
+    for name in STAGES:
+        if name in sys.modules:
+            _wrap_stages(sys.modules[name])
+    sys.meta_path.insert(0, _StageFinder())
+    if path:
+        atexit.register(finish)
+
+
+def enable_from_env():
+    """enable() when ECO_TRACE names an output file."""
+    path = os.environ.get("ECO_TRACE", "")
+    if path not in ("", "0"):
+        enable(path, memory=os.environ.get("ECO_TRACE_MEMORY") == "1")
+
+
+# -------------------------------------------
+# Output
+# -------------------------------------------
+def write(path, events=None):
+    events = _events if events is None else events
+    with open(f"{path}.tmp", "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def summary(events=None):
+    """Per span name: calls, wall, CPU, memory and counts, slowest first."""
+    rows = {}
+    for e in _events if events is None else events:
+        args = e.get("args", {})
+        row = rows.setdefault(e["name"], {"calls": 0, "wall_ms": 0.0, "max_ms": 0.0,
+                                          "cpu_ms": 0.0, "rss_growth_mb": 0.0,
+                                          "py_peak_mb": None, "rows": 0, "bytes": 0})
+        ms = e["dur"] / 1000
+        row["calls"] += 1
+        row["wall_ms"] += ms
+        row["max_ms"] = max(row["max_ms"], ms)
+        row["cpu_ms"] += args.get("cpu_ms", 0.0)
+        row["rss_growth_mb"] += args.get("rss_growth_mb", 0.0)
+        if "py_peak_mb" in args:
+            row["py_peak_mb"] = max(row["py_peak_mb"] or 0.0, args["py_peak_mb"])
+        row["rows"] += args.get("rows") or 0
+        row["bytes"] += args.get("bytes") or 0
+    return dict(sorted(rows.items(), key=lambda kv: -kv[1]["wall_ms"]))
+
+
+def format_summary(rows):
+    lines = [f"{'span':26s} {'calls':>6s} {'wall ms':>10s} {'max ms':>9s} {'cpu ms':>10s} "
+             f"{'+rss MB':>8s} {'py MB':>7s} {'rows':>9s} {'MB in/out':>9s}"]
+    for name, r in rows.items():
+        py = "" if r["py_peak_mb"] is None else f"{r['py_peak_mb']:.1f}"
+        mb = f"{r['bytes'] / 2 ** 20:.1f}" if r["bytes"] else ""
+        lines.append(f"{name:26s} {r['calls']:6d} {r['wall_ms']:10.1f} {r['max_ms']:9.1f} "
+                     f"{r['cpu_ms']:10.1f} {r['rss_growth_mb']:8.1f} {py:>7s} "
+                     f"{r['rows'] or '':>9} {mb:>9s}")
+    return "\n".join(lines)
+
+
+def finish():
+    """Write the trace (if a path was given) and print the summary."""
+    if not _state["enabled"] or not _events:
+        return
+    if _state["path"]:
+        write(_state["path"])
+    print(f"\n⏱️ Trace of {len(_events)} spans"
+          f"{' saved as ' + _state['path'] if _state['path'] else ''}", file=sys.stderr)
+    print(format_summary(summary()), file=sys.stderr)
+    _events.clear()
+
+
+def main():
+    import runpy
+
+    parser = argparse.ArgumentParser(description="Trace the stages of a pipeline script.")
+    parser.add_argument("-o", "--output", default="trace.json", help="Chrome trace file")
+    parser.add_argument("--memory", action="store_true", help="tracemalloc peaks (slower)")
+    parser.add_argument("--summary", metavar="TRACE", help="print the table of a saved trace")
+    parser.add_argument("script", nargs="?")
+    parser.add_argument("args", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+    if args.summary:
+        with open(args.summary) as f:
+            print(format_summary(summary(json.load(f)["traceEvents"])))
+        return
+    if not args.script:
+        parser.error("a script to run is required")
+
+    script = os.path.abspath(args.script)
+    sys.path.insert(0, os.path.dirname(script))
+    sys.argv = [script, *args.args]
+    enable(args.output, memory=args.memory)
+    with span("script", file=os.path.basename(script)):
+        runpy.run_path(script, run_name="__main__")
+
+
+if __name__ == "__main__":
+    main()